@@ -0,0 +1,428 @@
+""" Benchmarks of the core operations of the game engine
+
+Each benchmark times one operation on a batch of prepared states, the states
+are built before the timer starts (they are copies of the states reached in
+random games) so only the operation is measured. The result of a benchmark is
+the best and the median number of operations per second of its repeats, and
+the memory allocated by the operation measured with tracemalloc in a
+separate run:
+
+- peak_bytes_per_op: peak of the memory traced while running the batch, divided by the batch size
+- net_blocks_per_op: memory blocks still allocated after the batch, divided by the batch size
+
+Usage, from the root of the repository:
+
+    python -m benchmarks.engine_benchmarks --output results.json
+    python -m benchmarks.engine_benchmarks --baseline benchmarks/baseline.json
+
+With --baseline the results are compared with a previous output and the
+command fails when an operation is slower than the baseline by more than
+the threshold.
+"""
+import argparse
+import copy
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from game_engine.src.compact_state import Compact_game_state
+from game_engine.src.game_logic import Count_game_logic, Game_logic, Game_viewer
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import run_simulation
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.10
+
+
+class Benchmark():
+    """ One operation to measure
+
+    Attributes
+    ----------
+    name : str
+        Name in the results
+    make_state : Callable
+        make_state(index) returns the state of one operation
+    operation : Callable
+        operation(state), the operation that is measured
+    batch_size : int
+        Number of states of each repeat
+    """
+    def __init__(self, name: str, make_state: Callable, operation: Callable, batch_size: int = 200):
+        self.name = name
+        self.make_state = make_state
+        self.operation = operation
+        self.batch_size = batch_size
+
+    def make_batch(self, repeat: int, batch_size: int) -> List:
+        return [self.make_state(repeat*batch_size + i) for i in range(batch_size)]
+
+    def run(self, repeats: int = 5, batch_scale: float = 1.0) -> dict:
+        """ Times the operation and measures its allocations
+
+        Parameters
+        ----------
+        repeats : int, optional
+            Number of timed batches, by default 5
+        batch_scale : float, optional
+            Multiplies the batch size, by default 1.0
+
+        Returns
+        -------
+        dict
+            ops_per_sec (best repeat), median_ops_per_sec, peak_bytes_per_op,
+            net_blocks_per_op, batch_size and repeats
+        """
+        batch_size = max(int(self.batch_size*batch_scale), 1)
+        operation = self.operation
+
+        ops_per_sec = []
+        for repeat in range(repeats):
+            states = self.make_batch(repeat, batch_size)
+            start_time = time.perf_counter()
+            for state in states:
+                operation(state)
+            elapsed_time = time.perf_counter() - start_time
+            ops_per_sec.append(batch_size / max(elapsed_time, 1e-9))
+
+        states = self.make_batch(repeats, batch_size)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        start_memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for state in states:
+            operation(state)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        net_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+        return {
+            "ops_per_sec": max(ops_per_sec),
+            "median_ops_per_sec": statistics.median(ops_per_sec),
+            "peak_bytes_per_op": (peak_memory - start_memory) / batch_size,
+            "net_blocks_per_op": net_blocks / batch_size,
+            "batch_size": batch_size,
+            "repeats": repeats,
+        }
+
+
+class Game_states():
+    """ Copies of the states reached in random games, the same index always gives the same state """
+    def __init__(self, number_players: int = 4, board_backend: str = "numpy", game_logic_class: type = Game_logic):
+        self.number_players = number_players
+        self.board_backend = board_backend
+        self.game_logic_class = game_logic_class
+        self.__cache = {}
+
+    def __play(self, index: int) -> dict:
+        """ States of the game index: round_start (empty factories), middle (some
+        moves of a round made), round_end (before the wall tiling) """
+        if index in self.__cache:
+            return self.__cache[index]
+
+        rng = np.random.default_rng(index)
+        game_logic = self.game_logic_class(number_players=self.number_players, seed=index, board_backend=self.board_backend)
+        rounds = int(rng.integers(1, 4))
+
+        states = {}
+        for round_num in range(rounds):
+            if round_num == rounds - 1:
+                states["round_start"] = copy.deepcopy(game_logic)
+            game_logic.fill_factories()
+
+            moves = 0
+            middle = int(rng.integers(0, 2*self.number_players))
+            while not game_logic.is_round_over():
+                if round_num == rounds - 1 and moves == middle:
+                    states["middle"] = copy.deepcopy(game_logic)
+                player_index = game_logic.side_to_move
+                legal_moves = game_logic.legal_moves(player_index)
+                game_logic.apply_move(player_index, *legal_moves[rng.integers(len(legal_moves))])
+                moves += 1
+
+            if round_num == rounds - 1:
+                states["round_end"] = copy.deepcopy(game_logic)
+                if "middle" not in states:
+                    states["middle"] = states["round_start"]
+            game_logic.finish_round()
+            if game_logic.game_end:
+                break
+
+        if "round_end" not in states:
+            states["round_end"] = copy.deepcopy(game_logic)
+
+        self.__cache[index] = states
+        return states
+
+    def get(self, phase: str, index: int, number: int = 64) -> Game_logic:
+        """ New copy of a state, there are number different games """
+        return copy.deepcopy(self.__play(index % number)[phase])
+
+
+def get_benchmarks() -> List[Benchmark]:
+    benchmarks = []
+
+    numpy_states = Game_states(4, "numpy")
+    bitboard_states = Game_states(4, "bitboard")
+    backends_states = {"numpy": numpy_states, "bitboard": bitboard_states}
+
+    def update_score_state(index):
+        game_logic = numpy_states.get("round_end", index)
+        board = game_logic.players_boards[index % 4]
+        rng = np.random.default_rng(index)
+        row, column = (int(value) for value in rng.integers(5, size=2))
+        board.set_wall_box(row, column, True)
+        return board, (row, column)
+
+    benchmarks.append(Benchmark(
+        "board_update_score",
+        update_score_state,
+        lambda state: state[0]._Board__update_score(state[1]),
+        batch_size=2000,
+    ))
+
+    for backend, states in backends_states.items():
+        benchmarks.append(Benchmark(
+            f"board_wall_tiling[{backend}]",
+            lambda index, states=states: states.get("round_end", index).players_boards[index % 4],
+            lambda board: board.wall_tiling(),
+            batch_size=400,
+        ))
+
+        def laying_tiles_state(index, states=states):
+            game_logic = states.get("middle", index)
+            player_index = game_logic.side_to_move
+            legal_moves = game_logic.legal_moves(player_index)
+            factory_index, tile_type, row_index = legal_moves[index % len(legal_moves)]
+            tiles = game_logic.get_tiles_from_factory(factory_index, tile_type)
+            return game_logic.players_boards[player_index], row_index, tiles
+
+        benchmarks.append(Benchmark(
+            f"board_laying_tiles[{backend}]",
+            laying_tiles_state,
+            lambda state: state[0].laying_tiles(state[1], state[2]),
+            batch_size=400,
+        ))
+
+    # The tile containers as lists (Game_logic) and as counts (Count_game_logic)
+    containers_states = {"": numpy_states, "[counts]": Game_states(4, "numpy", Count_game_logic)}
+    for suffix, states in containers_states.items():
+        benchmarks.append(Benchmark(
+            f"game_logic_fill_factories{suffix}",
+            lambda index, states=states: states.get("round_start", index),
+            lambda game_logic: game_logic.fill_factories(),
+            batch_size=400,
+        ))
+
+        def get_tiles_state(index, states=states):
+            game_logic = states.get("middle", index)
+            legal_moves = game_logic.legal_moves(game_logic.side_to_move)
+            factory_index, tile_type, _ = legal_moves[index % len(legal_moves)]
+            return game_logic, factory_index, tile_type
+
+        benchmarks.append(Benchmark(
+            f"game_logic_get_tiles_from_factory{suffix}",
+            get_tiles_state,
+            lambda state: state[0].get_tiles_from_factory(state[1], state[2]),
+            batch_size=400,
+        ))
+
+    # Cloning a game for a search, the compact state against a deep copy
+    counts_states = containers_states["[counts]"]
+    benchmarks.append(Benchmark(
+        "game_logic_deepcopy[counts]",
+        lambda index: counts_states.get("middle", index),
+        lambda game_logic: copy.deepcopy(game_logic),
+        batch_size=100,
+    ))
+    benchmarks.append(Benchmark(
+        "compact_state_snapshot",
+        lambda index: Compact_game_state.from_game_logic(counts_states.get("middle", index)),
+        lambda state: state.snapshot(),
+        batch_size=2000,
+    ))
+
+    def compact_restore_state(index):
+        game_logic = counts_states.get("middle", index)
+        return Compact_game_state.from_game_logic(game_logic), game_logic
+
+    benchmarks.append(Benchmark(
+        "compact_state_apply_to",
+        compact_restore_state,
+        lambda state: state[0].apply_to(state[1]),
+        batch_size=400,
+    ))
+
+    # Random moves like the ones tried by Dummy_player, most of them are invalid
+    def validate_state(index):
+        game_logic = numpy_states.get("middle", index, number=16)
+        rng = np.random.default_rng(index)
+        move = (
+            int(rng.integers(-1, game_logic.factories_num)),
+            int(rng.integers(1, 6)),
+            int(rng.integers(-1, 5)),
+        )
+        return Game_viewer(game_logic), game_logic.side_to_move, move
+
+    benchmarks.append(Benchmark(
+        "game_viewer_validate_player_move",
+        validate_state,
+        lambda state: state[0].validate_player_move(state[1], *state[2]),
+        batch_size=2000,
+    ))
+
+    def dummy_player_state(index):
+        game_logic = numpy_states.get("middle", index, number=16)
+        return Dummy_player(Game_viewer(game_logic), game_logic.side_to_move)
+
+    benchmarks.append(Benchmark(
+        "dummy_player_player_move",
+        dummy_player_state,
+        lambda player: player.player_move(),
+        batch_size=400,
+    ))
+
+    for number_players in (2, 3, 4):
+        benchmarks.append(Benchmark(
+            f"full_game[{number_players}p]",
+            lambda index: index,
+            lambda seed, number_players=number_players: run_simulation([Dummy_player]*number_players, seed=seed),
+            batch_size=10,
+        ))
+
+    benchmarks.append(Benchmark(
+        "full_game[4p,counts]",
+        lambda index: index,
+        lambda seed: run_simulation([Dummy_player]*4, seed=seed, game_logic_class=Count_game_logic),
+        batch_size=10,
+    ))
+
+    return benchmarks
+
+
+def run_benchmarks(names: List[str] = None, repeats: int = 5, batch_scale: float = 1.0, verbose: bool = False) -> dict:
+    """ Runs the benchmarks whose name contains one of names, all of them by default
+
+    Returns
+    -------
+    dict
+        {"metadata": {...}, "results": {name: result of Benchmark.run}}
+    """
+    results = {}
+    for benchmark in get_benchmarks():
+        if names and not any(name in benchmark.name for name in names):
+            continue
+        results[benchmark.name] = benchmark.run(repeats, batch_scale)
+        if verbose:
+            print(format_result(benchmark.name, results[benchmark.name]))
+
+    return {
+        "metadata": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def format_result(name: str, result: dict) -> str:
+    return (
+        f"{name:40s} {result['ops_per_sec']:14,.1f} ops/s  (median {result['median_ops_per_sec']:,.1f})"
+        f"  {result['peak_bytes_per_op']:10,.0f} peak B/op  {result['net_blocks_per_op']:8.2f} blocks/op"
+    )
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """ Compares the ops/s of two outputs of run_benchmarks
+
+    Parameters
+    ----------
+    current : dict
+        New results
+    baseline : dict
+        Results to compare with
+    threshold : float, optional
+        Relative change of ops/s considered a regression or an improvement,
+        by default DEFAULT_THRESHOLD
+
+    Returns
+    -------
+    List[Dict]
+        One row per benchmark with name, baseline, current (ops/s), ratio
+        (current / baseline) and status: "regression", "improvement", "same",
+        "new" (not in the baseline) or "missing" (not in the current results)
+    """
+    current_results = current["results"]
+    baseline_results = baseline["results"]
+
+    rows = []
+    for name in list(baseline_results) + [name for name in current_results if name not in baseline_results]:
+        baseline_ops = baseline_results[name]["ops_per_sec"] if name in baseline_results else None
+        current_ops = current_results[name]["ops_per_sec"] if name in current_results else None
+
+        ratio = None
+        if baseline_ops is None:
+            status = "new"
+        elif current_ops is None:
+            status = "missing"
+        else:
+            ratio = current_ops / baseline_ops
+            if ratio < 1 - threshold:
+                status = "regression"
+            elif ratio > 1 + threshold:
+                status = "improvement"
+            else:
+                status = "same"
+
+        rows.append({"name": name, "baseline": baseline_ops, "current": current_ops, "ratio": ratio, "status": status})
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the Azul game engine")
+    parser.add_argument("names", nargs="*", help="Only run the benchmarks whose name contains one of these")
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with the results saved in this JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Save the results to {BASELINE_PATH}")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="Smaller batches and fewer repeats")
+    args = parser.parse_args()
+
+    repeats = 2 if args.quick else args.repeats
+    batch_scale = 0.25 if args.quick else 1.0
+    current = run_benchmarks(args.names, repeats, batch_scale, verbose=True)
+
+    output_paths = [Path(args.output)] if args.output else []
+    if args.save_baseline:
+        output_paths.append(BASELINE_PATH)
+    for output_path in output_paths:
+        output_path.write_text(json.dumps(current, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        rows = compare(current, baseline, args.threshold)
+        print()
+        for row in rows:
+            ratio = "" if row["ratio"] is None else f"{row['ratio']:.2f}x"
+            print(f"{row['name']:40s} {ratio:>8s}  {row['status']}")
+
+        if any(row["status"] == "regression" for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,33 @@
 import pygame
 import sys
+import argparse
 from pathlib import Path
-from src.game_gui import Game_GUI
+from src.game_gui import Game_GUI, render_replay
 from src.settings import SCREEN_WIDTH, SCREEN_HEIGHT
 from src.run_simulation import run_simulation
+from src.game_replay import Game_replay
+from src.trajectory_recorder import Trajectory_reader
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Azul IA simulation")
+    parser.add_argument("--trajectory", help="Trajectory file of a game to render without a window")
+    parser.add_argument("--game-id", type=int, default=0, help="Game of the trajectory file, by default 0")
+    parser.add_argument("--output", default="frames", help="Directory of the rendered frames, by default frames")
+    args = parser.parse_args()
+
+    if args.trajectory is not None:
+        replay = Game_replay.from_trajectory(Trajectory_reader(args.trajectory), args.game_id)
+        frames = render_replay(replay, args.output)
+        print(f"{frames} frames saved in {args.output}")
+        return
+
     # run_simulation()
     pygame.init()
 
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Azul IA simulation")
-    
+
     game = Game_GUI(screen)
     game.run()
 
@@ -0,0 +1,280 @@
+""" Plays thousands of games at once on one asyncio event loop
+
+Async_game_driver keeps up to max_concurrent_games Game_state_machine
+running, each one in a runner task that takes the next seed when its game
+is over, so the games are created as they are needed. While a model awaits
+its async_player_move (a batch of an Inference_broker, another process, a
+human client...) the other games go on.
+
+Backpressure comes from both sides: no more than max_concurrent_games games
+are in play, and the finished games wait in a queue of max_pending_results
+results, the runners stop when it is full until the consumer of play takes
+them. A move that takes more than move_timeout seconds is replaced by a
+random move, and Driver_metrics counts it with the throughput and the
+latency of the moves.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+import numpy as np
+from typing import AsyncIterator, List
+from .game_logic import Game_logic, Game_viewer
+from .run_simulation import Game_state_machine, run_game_async
+from .tournament import Game_result, load_model, summarize
+
+
+class Driver_metrics():
+    """ Throughput and move latency of an Async_game_driver
+
+    Attributes
+    ----------
+    games_started : int
+        Number of games started
+    games_finished : int
+        Number of games over
+    moves : int
+        Number of moves played
+    timeouts : int
+        Number of moves replaced by a random move after move_timeout
+    peak_active_games : int
+        Highest number of games in play at the same time
+    latencies : List[float]
+        Seconds between the request of each move and the move
+    """
+    def __init__(self):
+        self.games_started = 0
+        self.games_finished = 0
+        self.moves = 0
+        self.timeouts = 0
+        self.peak_active_games = 0
+        self.latencies = []
+        self.start_time = None
+        self.end_time = None
+
+    @property
+    def active_games(self) -> int:
+        return self.games_started - self.games_finished
+
+    @property
+    def elapsed_time(self) -> float:
+        if self.start_time is None:
+            return 0.0
+        end_time = self.end_time if self.end_time is not None else time.perf_counter()
+        return end_time - self.start_time
+
+    @property
+    def moves_per_second(self) -> float:
+        elapsed_time = self.elapsed_time
+        return self.moves / elapsed_time if elapsed_time > 0 else 0.0
+
+    @property
+    def games_per_second(self) -> float:
+        elapsed_time = self.elapsed_time
+        return self.games_finished / elapsed_time if elapsed_time > 0 else 0.0
+
+    def start(self) -> None:
+        self.start_time = time.perf_counter()
+        self.end_time = None
+
+    def stop(self) -> None:
+        self.end_time = time.perf_counter()
+
+    def start_game(self) -> None:
+        self.games_started += 1
+        self.peak_active_games = max(self.peak_active_games, self.active_games)
+
+    def end_game(self) -> None:
+        self.games_finished += 1
+
+    def record_move(self, latency: float, timed_out: bool) -> None:
+        self.moves += 1
+        self.latencies.append(latency)
+        if timed_out:
+            self.timeouts += 1
+
+    def latency_percentiles(self, percentiles: tuple = (50, 90, 99)) -> dict:
+        """ Latency of the moves in seconds at each percentile, and the highest one as "max" """
+        if not self.latencies:
+            return {**{f"p{percentile}": 0.0 for percentile in percentiles}, "max": 0.0}
+
+        latencies = np.array(self.latencies)
+        values = np.percentile(latencies, percentiles)
+        return {
+            **{f"p{percentile}": float(value) for percentile, value in zip(percentiles, values)},
+            "max": float(latencies.max()),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "games_started": self.games_started,
+            "games_finished": self.games_finished,
+            "moves": self.moves,
+            "timeouts": self.timeouts,
+            "peak_active_games": self.peak_active_games,
+            "elapsed_time": self.elapsed_time,
+            "moves_per_second": self.moves_per_second,
+            "games_per_second": self.games_per_second,
+            "latency": self.latency_percentiles(),
+        }
+
+    def summary(self) -> str:
+        latency = self.latency_percentiles()
+        return (
+            f"games: {self.games_finished}, {self.games_per_second:.1f} games/s, "
+            f"{self.moves_per_second:.0f} moves/s, peak active games: {self.peak_active_games}\n"
+            f"move latency (ms): p50 {latency['p50']*1000:.3f}, p90 {latency['p90']*1000:.3f}, "
+            f"p99 {latency['p99']*1000:.3f}, max {latency['max']*1000:.3f}, timeouts: {self.timeouts}"
+        )
+
+
+class Async_game_driver():
+    """ Plays seeded games of the same models concurrently on one event loop
+
+    The game game_index is played with seeds[game_index], the players sit
+    in the order of players_models. The models with an async_player_move
+    are awaited, the others are called as usual and block the loop while
+    they think.
+
+    Attributes
+    ----------
+    metrics : Driver_metrics
+        Metrics of the last run
+    """
+    def __init__(
+            self,
+            players_models: List,
+            seeds: List[int],
+            max_concurrent_games: int = 1000,
+            move_timeout: float = None,
+            max_pending_results: int = 1000,
+            game_logic_class: type = Game_logic,
+        ):
+        """
+        Parameters
+        ----------
+        players_models : List
+            Player_model classes (or functions that make them), one for each player
+        seeds : List[int]
+            Seed of each game
+        max_concurrent_games : int, optional
+            Maximum number of games in play at the same time, by default 1000
+        move_timeout : float, optional
+            Seconds given to an async model for a move before a random move
+            is played instead, by default no limit
+        max_pending_results : int, optional
+            Maximum number of results waiting to be taken from play, by default 1000
+        game_logic_class : type, optional
+            Game_logic or Count_game_logic, by default Game_logic
+        """
+        if len(players_models) < 1 or len(players_models) > 4:
+            raise ValueError("The number of players should be between 1 and 4")
+        if max_concurrent_games < 1:
+            raise ValueError("There should be at least one game at a time")
+        if max_pending_results < 1:
+            raise ValueError("There should be room for at least one result")
+        if move_timeout is not None and move_timeout <= 0:
+            raise ValueError("The move timeout should be positive")
+
+        self.players_models = list(players_models)
+        self.seeds = list(seeds)
+        self.max_concurrent_games = max_concurrent_games
+        self.move_timeout = move_timeout
+        self.max_pending_results = max_pending_results
+        self.game_logic_class = game_logic_class
+
+        self.metrics = Driver_metrics()
+
+    async def play_game(self, game_index: int, seed: int) -> Game_result:
+        """ Plays one game until its end """
+        number_players = len(self.players_models)
+        game_logic = self.game_logic_class(number_players=number_players, seed=seed)
+        game_view = Game_viewer(game_logic)
+        players = [player_model(game_view, i) for i, player_model in enumerate(self.players_models)]
+        game_state = Game_state_machine(game_logic, players)
+
+        self.metrics.start_game()
+        scores = await run_game_async(game_state, self.move_timeout, self.metrics)
+        self.metrics.end_game()
+
+        return Game_result(game_index, seed, tuple(range(number_players)), tuple(scores))
+
+    async def play(self) -> AsyncIterator[Game_result]:
+        """ Plays every game, the results are yielded as the games finish
+
+        Yields
+        ------
+        Game_result
+            Result of each game, in order of completion
+        """
+        self.metrics = Driver_metrics()
+        self.metrics.start()
+        games = iter(enumerate(self.seeds))
+        results = asyncio.Queue(maxsize=self.max_pending_results)
+
+        async def runner():
+            for game_index, seed in games:
+                result = await self.play_game(game_index, seed)
+                await results.put(result)
+
+        runners = [asyncio.create_task(runner()) for _ in range(min(self.max_concurrent_games, len(self.seeds)))]
+
+        async def run_all():
+            try:
+                await asyncio.gather(*runners)
+            finally:
+                await results.put(None)
+
+        all_runners = asyncio.create_task(run_all())
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield result
+            # Raises the error of a runner
+            await all_runners
+        finally:
+            for task in runners + [all_runners]:
+                task.cancel()
+            self.metrics.stop()
+
+    async def run_async(self) -> List[Game_result]:
+        """ Plays every game and returns the results sorted by game index """
+        results = [result async for result in self.play()]
+        return sorted(results, key=lambda result: result.game_index)
+
+    def run(self) -> List[Game_result]:
+        """ run_async in a new event loop """
+        return asyncio.run(self.run_async())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays many games at once on an asyncio event loop")
+    parser.add_argument(
+        "models", nargs="+",
+        help="Player models, one per seat, as package.module:Class_name"
+    )
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--move-timeout", type=float, default=None)
+    args = parser.parse_args()
+
+    players_models = [load_model(model_path) for model_path in args.models]
+    driver = Async_game_driver(
+        players_models,
+        [args.seed + game_index for game_index in range(args.games)],
+        max_concurrent_games=args.concurrency,
+        move_timeout=args.move_timeout,
+    )
+    results = driver.run()
+
+    summary = summarize(results, len(players_models))
+    print(driver.metrics.summary())
+    for model_path, wins, mean_score in zip(args.models, summary["wins"], summary["mean_scores"]):
+        print(f"{model_path}: wins {wins}, mean score {mean_score:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,462 @@
+from __future__ import annotations
+import numpy as np
+from typing import List
+from .bitboard_tables import RUN_LENGTH, PLACEMENT_POINTS
+from .game_logic import game_seed_sequence
+
+RUN_LENGTH_ARRAY = np.array(RUN_LENGTH, dtype=np.int64)
+PLACEMENT_POINTS_ARRAY = np.array(PLACEMENT_POINTS, dtype=np.int64)
+LINE_BITS_WEIGHTS = np.array([1, 2, 4, 8, 16], dtype=np.int64)
+TILE_TYPES = np.arange(1, 6)
+ROWS_INDEX = np.arange(5)[:, None]
+ROWS_SIZE = np.arange(1, 6)[:, None]
+# WALL_COLUMNS[row, tile_type - 1] is the column of the type of tile on that row of the wall
+WALL_COLUMNS = (np.arange(5)[None, :] + np.arange(5)[:, None]) % 5
+
+# FLOOR_PENALTY[n] is the total of points lost with n tiles on the floor line
+FLOOR_PENALTY = np.concatenate(([0], np.cumsum([-1, -1, -2, -2, -2, -3, -3]))).astype(np.int64)
+
+
+class Batch_game_logic():
+    """ Many games of Azul stored as stacked numpy arrays and played in lockstep
+
+    Each call to apply_moves makes one move in every game that is not over,
+    and the round end (wall tiling and refill of the factories) is done
+    for all the games at once. Given the same seeds and the same moves,
+    every game follows exactly the same states as Game_logic driven
+    by Game_state_machine.
+
+    Tiles are numbers from 1 to 5 and zero means that the space is empty.
+
+    Attributes
+    ----------
+    number_games : int
+        Number of games (N)
+    number_players : int
+        Number of players of every game (P)
+    factories_num : int
+        Number of factories of every game (F)
+    factories : np.array
+        N x F x 4, tiles of each factory in the same order as Game_logic.factories
+    center_tiles : np.array
+        N x 5, number of tiles of each type in the center, type t in column t-1
+    walls : np.array
+        N x P x 5 x 5, same values as Board.wall
+    pattern_lines_colour : np.array
+        N x P x 5, type of tile of each pattern line row, zero if empty
+    pattern_lines_count : np.array
+        N x P x 5, number of tiles in each pattern line row
+    floor_lines : np.array
+        N x P x 7, same values as Board.floor_line
+    bag_tiles : np.array
+        N x 100, the bag of each game is bag_tiles[n, bag_begin[n]:bag_end[n]]
+    discarted_tiles : np.array
+        N x 100, the discard pile of each game is discarted_tiles[n, :discarted_len[n]]
+    scores : np.array
+        N x P, score of each player
+    current_player : np.array
+        N, index of the player that makes the next move
+    game_end : np.array
+        N, True for the games that are over
+    """
+    def __init__(self, number_players: int = 4, seeds: List[int] = (1,)):
+        """
+        Parameters
+        ----------
+        number_players : int, optional
+            Number of players of every game, from 2 to 4, by default 4
+        seeds : List[int], optional
+            Seed of each game, the same seed as Game_logic, by default (1,)
+
+        Raises
+        ------
+        ValueError
+            The number of players should be between 2 and 4
+        """
+        if number_players < 1 or number_players > 4:
+            raise ValueError("The number of players should be between 2 and 4")
+
+        seeds = list(seeds)
+        self.number_games = len(seeds)
+        self.number_players = number_players
+
+        if number_players == 2:
+            self.factories_num = 5
+        elif number_players == 3:
+            self.factories_num = 7
+        else:
+            self.factories_num = 9
+
+        n = self.number_games
+        self.games_index = np.arange(n)
+        self.rngs = [np.random.default_rng(game_seed_sequence(seed)) for seed in seeds]
+
+        self.bag_tiles = np.zeros((n, 100), dtype=np.int8)
+        for game_index, rng in enumerate(self.rngs):
+            tiles = [
+                i
+                for i in range(1,5+1)
+                for j in range(20)
+            ]
+            rng.shuffle(tiles)
+            self.bag_tiles[game_index] = tiles
+        self.bag_begin = np.zeros(n, dtype=np.int64)
+        self.bag_end = np.full(n, 100, dtype=np.int64)
+
+        self.discarted_tiles = np.zeros((n, 100), dtype=np.int8)
+        self.discarted_len = np.zeros(n, dtype=np.int64)
+
+        self.factories = np.zeros((n, self.factories_num, 4), dtype=np.int8)
+        self.center_tiles = np.zeros((n, 5), dtype=np.int64)
+
+        self.walls = np.zeros((n, number_players, 5, 5), dtype=np.int8)
+        self.pattern_lines_colour = np.zeros((n, number_players, 5), dtype=np.int8)
+        self.pattern_lines_count = np.zeros((n, number_players, 5), dtype=np.int64)
+        self.floor_lines = np.zeros((n, number_players, 7), dtype=np.int8)
+        self.scores = np.zeros((n, number_players), dtype=np.int64)
+
+        self.init_player = np.zeros((n, number_players), dtype=bool)
+        self.init_player[:, 0] = True
+        self.current_player = np.zeros(n, dtype=np.int64)
+        self.game_end = np.zeros(n, dtype=bool)
+
+        self.fill_factories(np.ones(n, dtype=bool))
+
+    def get_bag_tiles(self, game_index: int) -> List[int]:
+        """ Bag of one game as a list, in the same order as Game_logic.bag_tiles """
+        return self.bag_tiles[game_index, self.bag_begin[game_index]:self.bag_end[game_index]].tolist()
+
+    def get_discarted_tiles(self, game_index: int) -> List[int]:
+        """ Discard pile of one game as a list, in the same order as Game_logic.discarted_tiles """
+        return self.discarted_tiles[game_index, :self.discarted_len[game_index]].tolist()
+
+    def round_over(self) -> np.array:
+        """ Games where the factories and the center are empty
+
+        Returns
+        -------
+        np.array
+            Boolean array of size N
+        """
+        factories_empty = ~self.factories.reshape(self.number_games, -1).any(axis=1)
+        center_empty = ~self.center_tiles.any(axis=1)
+        return factories_empty & center_empty
+
+    def __taken_tiles_count(self, factory_index: np.array, tile_type: np.array) -> np.array:
+        games = self.games_index
+        factory_tiles = self.factories[games, np.clip(factory_index, 0, self.factories_num - 1)]
+        factory_count = np.count_nonzero(factory_tiles == tile_type[:, None], axis=1)
+        center_count = self.center_tiles[games, np.clip(tile_type, 1, 5) - 1]
+        return np.where(factory_index == -1, center_count, factory_count)
+
+    def validate_moves(self, factory_index: np.array, tile_type: np.array, row_index: np.array) -> np.array:
+        """ Validates the move of the current player of each game,
+        same rules as Game_viewer.validate_player_move
+
+        Parameters
+        ----------
+        factory_index : np.array
+            N, factory of each move, -1 for the center
+        tile_type : np.array
+            N, type of tile of each move, from 1 to 5
+        row_index : np.array
+            N, pattern line row of each move, -1 to break all tiles
+
+        Returns
+        -------
+        np.array
+            Boolean array of size N, True where the move is valid
+        """
+        games = self.games_index
+        factory_index = np.asarray(factory_index, dtype=np.int64)
+        tile_type = np.asarray(tile_type, dtype=np.int64)
+        row_index = np.asarray(row_index, dtype=np.int64)
+
+        valid = (factory_index >= -1) & (factory_index < self.factories_num)
+        valid &= (tile_type >= 1) & (tile_type <= 5)
+        valid &= (row_index >= -1) & (row_index <= 4)
+        valid &= self.__taken_tiles_count(factory_index, tile_type) > 0
+
+        player = self.current_player
+        row = np.clip(row_index, 0, 4)
+        row_count = self.pattern_lines_count[games, player, row]
+        row_colour = self.pattern_lines_colour[games, player, row]
+        wall_column = (tile_type - 1 + row) % 5
+        on_wall = self.walls[games, player, row, wall_column] != 0
+
+        row_valid = ((row_count == 0) | (row_colour == tile_type)) & ~on_wall
+        valid &= (row_index == -1) | row_valid
+
+        return valid
+
+    def legal_moves_mask(self, restrict_floor: bool = False) -> np.array:
+        """ Every valid move of the current player of each game, same moves as Game_logic.legal_moves
+
+        Parameters
+        ----------
+        restrict_floor : bool, optional
+            Only the moves of Game_logic.floor_restricted_moves, a type of tile
+            can be broken on the floor line only if it cannot be laid on a row
+            that is not full, by default False
+
+        Returns
+        -------
+        np.array
+            N x (F + 1) x 5 x 6 boolean array, mask[n, factory_index + 1, tile_type - 1, row]
+            where the row 5 is the floor line (row_index -1), see moves_from_index
+        """
+        games = self.games_index
+        player = self.current_player
+
+        factory_colours = (self.factories[:, :, :, None] == TILE_TYPES).any(axis=2)
+        available = np.concatenate((self.center_tiles[:, None, :] > 0, factory_colours), axis=1)
+
+        rows_colour = self.pattern_lines_colour[games, player][:, :, None]
+        rows_count = self.pattern_lines_count[games, player][:, :, None]
+        on_wall = self.walls[games, player][:, ROWS_INDEX, WALL_COLUMNS] != 0
+        rows_allowed = ((rows_count == 0) | (rows_colour == TILE_TYPES)) & ~on_wall
+
+        if restrict_floor:
+            rows_open = rows_allowed & (rows_count < ROWS_SIZE)
+            floor_allowed = ~rows_open.any(axis=1)
+        else:
+            floor_allowed = np.ones((self.number_games, 5), dtype=bool)
+
+        # N x 5 (type of tile) x 6 (row)
+        rows_moves = np.concatenate((rows_allowed.transpose(0, 2, 1), floor_allowed[:, :, None]), axis=2)
+        return available[:, :, :, None] & rows_moves[:, None, :, :]
+
+    def moves_from_index(self, index: np.array) -> tuple:
+        """ Moves of the flat indices of legal_moves_mask(...).reshape(N, -1)
+
+        Returns
+        -------
+        tuple
+            factory_index, tile_type and row_index arrays
+        """
+        factory_index, tile_index, row = np.unravel_index(index, (self.factories_num + 1, 5, 6))
+        return factory_index - 1, tile_index + 1, np.where(row == 5, -1, row)
+
+    def apply_moves(self, factory_index: np.array, tile_type: np.array, row_index: np.array) -> None:
+        """ Makes the move of the current player of every game that is not over
+
+        After the move the turn passes to the next player, and the games
+        whose round is over go through the wall tiling and, if they are
+        not over, the factories are filled again.
+
+        Parameters
+        ----------
+        factory_index : np.array
+            N, factory of each move, -1 for the center
+        tile_type : np.array
+            N, type of tile of each move, from 1 to 5
+        row_index : np.array
+            N, pattern line row of each move, -1 to break all tiles,
+            the values of the games that are over are ignored
+
+        Raises
+        ------
+        RuntimeError
+            Some of the moves of the games that are not over are invalid
+        """
+        factory_index = np.asarray(factory_index, dtype=np.int64)
+        tile_type = np.asarray(tile_type, dtype=np.int64)
+        row_index = np.asarray(row_index, dtype=np.int64)
+
+        active = ~self.game_end
+        if not np.all(self.validate_moves(factory_index, tile_type, row_index)[active]):
+            raise RuntimeError("It is not possible to make such a move")
+
+        games = self.games_index[active]
+        factory_index = factory_index[active]
+        tile_type = tile_type[active]
+        row_index = row_index[active]
+        player = self.current_player[active]
+
+        # Take the tiles
+        from_factory = factory_index != -1
+        factory_tiles = self.factories[games, np.maximum(factory_index, 0)]
+        factory_counts = np.count_nonzero(factory_tiles[:, :, None] == np.arange(1, 6), axis=1)
+        center_count = self.center_tiles[games, tile_type - 1]
+        taken = np.where(from_factory, factory_counts[np.arange(len(games)), tile_type - 1], center_count)
+
+        # The rest of the factory goes to the center
+        factory_counts[np.arange(len(games)), tile_type - 1] = 0
+        self.center_tiles[games] += factory_counts * from_factory[:, None]
+        self.center_tiles[games[~from_factory], tile_type[~from_factory] - 1] = 0
+        self.factories[games[from_factory], factory_index[from_factory]] = 0
+
+        # Lay the tiles in the pattern lines
+        to_row = row_index != -1
+        row = np.maximum(row_index, 0)
+        row_count = self.pattern_lines_count[games, player, row]
+        placed = np.where(to_row, np.minimum(taken, row + 1 - row_count), 0)
+        self.pattern_lines_count[games[to_row], player[to_row], row[to_row]] += placed[to_row]
+        self.pattern_lines_colour[games[to_row], player[to_row], row[to_row]] = tile_type[to_row]
+
+        # The leftover goes to the floor line and what doesn't fit to the discard pile
+        leftover = taken - placed
+        floor_lines = self.floor_lines[games, player]
+        floor_len = np.count_nonzero(floor_lines, axis=1)
+        floor_positions = np.arange(7)
+        new_floor = (floor_positions >= floor_len[:, None]) & (floor_positions < (floor_len + leftover)[:, None])
+        self.floor_lines[games, player] = np.where(new_floor, tile_type[:, None], floor_lines)
+
+        floor_overflow = np.maximum(floor_len + leftover - 7, 0)
+        self.__append_discarted(games, tile_type, floor_overflow)
+
+        # Next turn
+        round_over = self.round_over()[games]
+        next_games = games[~round_over]
+        self.current_player[next_games] = (self.current_player[next_games] + 1) % self.number_players
+
+        round_over_mask = np.zeros(self.number_games, dtype=bool)
+        round_over_mask[games[round_over]] = True
+        if round_over_mask.any():
+            self.wall_tiling(round_over_mask)
+
+            new_round_mask = round_over_mask & ~self.game_end
+            new_round_games = self.games_index[new_round_mask]
+            init_player = self.init_player[new_round_games]
+            self.current_player[new_round_games] = np.where(init_player.any(axis=1), init_player.argmax(axis=1), 0)
+            self.fill_factories(new_round_mask)
+
+    def __append_discarted(self, games: np.array, tile_type: np.array, count: np.array) -> None:
+        discarted_len = self.discarted_len[games]
+        positions = np.arange(100)
+        new_tiles = (positions >= discarted_len[:, None]) & (positions < (discarted_len + count)[:, None])
+        self.discarted_tiles[games] = np.where(new_tiles, tile_type[:, None], self.discarted_tiles[games])
+        self.discarted_len[games] += count
+
+    def wall_tiling(self, games_mask: np.array) -> None:
+        """ Wall tiling phase of every player for the selected games,
+        same rules as Board.wall_tiling
+
+        Parameters
+        ----------
+        games_mask : np.array
+            Boolean array of size N with the games to tile
+        """
+        games = self.games_index[games_mask]
+        players = np.arange(self.number_players)
+
+        # Colour of the full rows, the leftover of each full row goes to the discard pile
+        rows_discard_colour = np.zeros((len(games), self.number_players, 5), dtype=np.int64)
+
+        for row in range(5):
+            full = self.pattern_lines_count[games][:, :, row] == row + 1
+            full_games_index, full_players = np.nonzero(full)
+            if len(full_games_index) == 0:
+                continue
+
+            full_games = games[full_games_index]
+            tile_type = self.pattern_lines_colour[full_games, full_players, row].astype(np.int64)
+            column = (tile_type - 1 + row) % 5
+
+            self.walls[full_games, full_players, row, column] = tile_type
+            walls = self.walls[full_games, full_players]
+
+            row_line = (walls[:, row, :] != 0) @ LINE_BITS_WEIGHTS
+            column_line = (walls[np.arange(len(full_games)), :, column] != 0) @ LINE_BITS_WEIGHTS
+
+            points = PLACEMENT_POINTS_ARRAY[
+                RUN_LENGTH_ARRAY[row_line, column],
+                RUN_LENGTH_ARRAY[column_line, row]
+            ]
+            row_complete = row_line == 0b11111
+            points += 2*row_complete
+            points += 7*(column_line == 0b11111)
+            colour_complete = np.count_nonzero(walls == tile_type[:, None, None], axis=(1, 2)) == 5
+            points += 10*colour_complete
+
+            self.scores[full_games, full_players] += points
+            self.game_end[full_games[row_complete]] = True
+
+            rows_discard_colour[full_games_index, full_players, row] = tile_type
+            self.pattern_lines_count[full_games, full_players, row] = 0
+            self.pattern_lines_colour[full_games, full_players, row] = 0
+
+        floor_lines = self.floor_lines[games]
+        floor_len = np.count_nonzero(floor_lines, axis=2)
+        scores = np.maximum(self.scores[games] + FLOOR_PENALTY[floor_len], 0)
+        self.scores[games] = scores
+        self.game_end[games] |= (scores >= 100).any(axis=1)
+        self.init_player[games] = (floor_lines == -1).any(axis=2)
+
+        # The discard pile is filled player by player, first the floor line
+        # and then the leftover of the full rows, as Board.wall_tiling does
+        one_tile = np.ones(len(games), dtype=np.int64)
+        for player in players:
+            for position in range(7):
+                tile_type = floor_lines[:, player, position].astype(np.int64)
+                has_tile = tile_type > 0
+                self.__append_discarted(games[has_tile], tile_type[has_tile], one_tile[has_tile])
+
+            for row in range(1, 5):
+                tile_type = rows_discard_colour[:, player, row]
+                has_tile = tile_type > 0
+                self.__append_discarted(games[has_tile], tile_type[has_tile], one_tile[has_tile]*row)
+
+        self.floor_lines[games] = 0
+
+    def fill_factories(self, games_mask: np.array) -> None:
+        """ Fills the factories of the selected games from the bag,
+        same rules as Game_logic.fill_factories
+
+        Parameters
+        ----------
+        games_mask : np.array
+            Boolean array of size N with the games to fill
+
+        Raises
+        ------
+        RuntimeError
+            The factories or the center of some of the games are not empty
+        """
+        games = self.games_index[games_mask]
+        if self.factories[games].any() or self.center_tiles[games].any():
+            raise RuntimeError("It is not possible to fill the factories because they are not empty")
+
+        tiles_needed = self.factories_num*4
+        bag_len = self.bag_end[games] - self.bag_begin[games]
+
+        enough_tiles = bag_len >= tiles_needed
+        fast_games = games[enough_tiles]
+        tiles_index = self.bag_begin[fast_games, None] + np.arange(tiles_needed)
+        tiles = np.take_along_axis(self.bag_tiles[fast_games], tiles_index, axis=1)
+        self.factories[fast_games] = tiles.reshape(len(fast_games), self.factories_num, 4)
+        self.bag_begin[fast_games] += tiles_needed
+
+        # When the bag runs out the discard pile is shuffled into the bag,
+        # this is done game by game to use the same random sequence as Game_logic
+        for game_index in games[~enough_tiles]:
+            self.__refill_with_discarted(game_index)
+
+    def __refill_with_discarted(self, game_index: int) -> None:
+        bag_tiles = self.get_bag_tiles(game_index)
+        factories = [[] for _ in range(self.factories_num)]
+
+        full_tiles_num = len(bag_tiles)//4
+        for expositor_num in range(full_tiles_num):
+            factories[expositor_num] = bag_tiles[expositor_num*4:expositor_num*4 + 4]
+        factories[full_tiles_num] = bag_tiles[full_tiles_num*4:]
+
+        bag_tiles = self.get_discarted_tiles(game_index)
+        self.rngs[game_index].shuffle(bag_tiles)
+        self.discarted_len[game_index] = 0
+
+        for _ in range(len(factories[full_tiles_num]), 4):
+            factories[full_tiles_num].append(bag_tiles.pop())
+
+        for factory_num in range(full_tiles_num+1, self.factories_num):
+            factories[factory_num] = bag_tiles[:4]
+            bag_tiles = bag_tiles[4:]
+
+        self.factories[game_index] = 0
+        for factory_num, factory_tiles in enumerate(factories):
+            self.factories[game_index, factory_num, :len(factory_tiles)] = factory_tiles
+
+        self.bag_tiles[game_index] = 0
+        self.bag_tiles[game_index, :len(bag_tiles)] = bag_tiles
+        self.bag_begin[game_index] = 0
+        self.bag_end[game_index] = len(bag_tiles)
@@ -0,0 +1,83 @@
+""" Precomputed tables used by the bitboard backend of the player's board
+
+The wall is stored as a 25-bit integer where the bit ``row*5 + column``
+is set when the box of the wall is filled. Because the colour of each box
+is fixed by the default pattern, one mask is enough to know the whole wall.
+A transposed mask (bit ``column*5 + row``) is kept next to it so that a
+column can be read with one shift, just like a row.
+"""
+from collections import deque
+
+
+def _get_wall_default_pattern() -> tuple:
+    circular_list = deque([1, 2, 3, 4, 5])
+    wall_default_pattern = []
+
+    for _ in range(5):
+        wall_default_pattern.append(tuple(circular_list))
+        circular_list.rotate(1)
+
+    return tuple(wall_default_pattern)
+
+
+WALL_PATTERN = _get_wall_default_pattern()
+
+# WALL_COLUMN[row][tile_type] is the column where the tile type goes in that row
+WALL_COLUMN = tuple(
+    tuple([-1] + [WALL_PATTERN[row].index(tile_type) for tile_type in range(1, 6)])
+    for row in range(5)
+)
+
+FULL_LINE = 0b11111
+
+ROW_MASKS = tuple(FULL_LINE << (row*5) for row in range(5))
+
+# COLOUR_MASKS[tile_type] has a bit for every box of that colour
+COLOUR_MASKS = tuple(
+    [0] + [
+        sum(1 << (row*5 + WALL_COLUMN[row][tile_type]) for row in range(5))
+        for tile_type in range(1, 6)
+    ]
+)
+
+
+def _get_run_length_table() -> tuple:
+    """ RUN_LENGTH[line][position] is the number of contiguous filled boxes
+    of a 5 bits line that pass through position, 0 if position is empty
+    """
+    table = []
+    for line in range(32):
+        line_runs = []
+        for position in range(5):
+            if not (line >> position) & 1:
+                line_runs.append(0)
+                continue
+
+            count = 1
+            i = position - 1
+            while i >= 0 and (line >> i) & 1:
+                count += 1
+                i -= 1
+
+            i = position + 1
+            while i < 5 and (line >> i) & 1:
+                count += 1
+                i += 1
+
+            line_runs.append(count)
+        table.append(tuple(line_runs))
+
+    return tuple(table)
+
+
+RUN_LENGTH = _get_run_length_table()
+
+# PLACEMENT_POINTS[row_run][column_run], a tile only counts twice if
+# it connects with other tiles horizontally and vertically
+PLACEMENT_POINTS = tuple(
+    tuple(
+        row_run + column_run if row_run > 1 and column_run > 1 else max(row_run, column_run)
+        for column_run in range(6)
+    )
+    for row_run in range(6)
+)
@@ -0,0 +1,297 @@
+""" Whole state of a game in one small contiguous uint8 buffer
+
+Compact_game_state keeps everything needed to go on with a game of
+Count_game_logic, for all the players, in about 200 bytes: the counts of the
+factories, the center, the bag and the discard pile, one byte per wall row
+(a mask of the filled columns, the colour of each box is given by the wall
+pattern), the pattern lines as (type of tile, number of tiles), the floor
+lines, the scores, the first player, the side to move, the end of the game,
+the seed and the state of the random generator.
+
+snapshot returns the buffer as bytes and restore copies bytes into it, so
+cloning for a search, sending a game to another process or keeping a
+checkpoint is one copy of the buffer. capture writes a game into the state
+and apply_to writes the state back into a game.
+
+Game_logic keeps the order of the tiles of the bag, which is not in the
+compact state, so a state can only be applied to a Count_game_logic.
+"""
+from __future__ import annotations
+import numpy as np
+from .game_logic import Game_logic, Count_game_logic, WALL_PATTERN_ARRAY
+
+HEADER_SIZE = 2
+RNG_STATE_SIZE = 16 + 16 + 1 + 4
+COLUMNS_BITS = (1 << np.arange(5)).astype(np.uint8)
+
+
+def get_compact_layout(number_players: int, factories_num: int) -> dict:
+    """ Position of each part of the state in the buffer of Compact_game_state
+
+    The parts are, in this order:
+
+    - header: 2, number of players and number of factories
+    - scores: number_players x int16
+    - seed: 1 x uint64
+    - factories: factories_num x 5, number of tiles of each type in each factory
+    - center, bag, discarted: 5 each, number of tiles of each type
+    - walls: number_players x 5, bit c of each row is set when the column c is filled
+    - pattern_lines: number_players x 5 x 2, (type of tile, number of tiles) of each row
+    - floor_lines: number_players x 7 x int8, same values as Board.floor_line
+    - init_player: number_players, 1 for the first player
+    - side_to_move: 1
+    - game_end: 1
+    - rng: state of the PCG64 generator (state, increment, has_uint32, uinteger)
+
+    Parameters
+    ----------
+    number_players : int
+        Number of players
+    factories_num : int
+        Number of factories
+
+    Returns
+    -------
+    dict
+        Name of each part: (slice of the buffer, numpy type, shape), and the size of the buffer
+    """
+    parts = [
+        ("header", np.uint8, (HEADER_SIZE,)),
+        ("scores", np.int16, (number_players,)),
+        ("seed", np.uint64, (1,)),
+        ("factories", np.uint8, (factories_num, 5)),
+        ("center", np.uint8, (5,)),
+        ("bag", np.uint8, (5,)),
+        ("discarted", np.uint8, (5,)),
+        ("walls", np.uint8, (number_players, 5)),
+        ("pattern_lines", np.uint8, (number_players, 5, 2)),
+        ("floor_lines", np.int8, (number_players, 7)),
+        ("init_player", np.uint8, (number_players,)),
+        ("side_to_move", np.uint8, (1,)),
+        ("game_end", np.uint8, (1,)),
+        ("rng", np.uint8, (RNG_STATE_SIZE,)),
+    ]
+
+    layout = {}
+    offset = 0
+    for name, dtype, shape in parts:
+        size = int(np.prod(shape))*np.dtype(dtype).itemsize
+        layout[name] = (slice(offset, offset + size), dtype, shape)
+        offset += size
+    layout["size"] = offset
+
+    return layout
+
+
+class Compact_game_state():
+    """ State of a game in one bytearray, with a numpy view of each part
+
+    Attributes
+    ----------
+    number_players : int
+        Number of players
+    factories_num : int
+        Number of factories
+    buffer : bytearray or memoryview
+        The whole state, see get_compact_layout
+    """
+    __slots__ = (
+        "number_players", "factories_num", "buffer",
+        "scores", "seed", "factories", "center", "bag", "discarted", "walls",
+        "pattern_lines", "floor_lines", "init_player", "side_to_move", "game_end", "rng",
+    )
+
+    def __init__(self, number_players: int, factories_num: int, data: bytes = None, buffer: memoryview = None):
+        """
+        Parameters
+        ----------
+        number_players : int
+            Number of players
+        factories_num : int
+            Number of factories
+        data : bytes, optional
+            Snapshot to restore, by default an empty state
+        buffer : memoryview, optional
+            Writable memory of the size of the state where the state is kept
+            instead of a new bytearray, for example a slot of a Shared_game_arena
+
+        Raises
+        ------
+        ValueError
+            The size of data or buffer is not the size of the state
+        """
+        self.number_players = number_players
+        self.factories_num = factories_num
+
+        layout = get_compact_layout(number_players, factories_num)
+        if buffer is None:
+            buffer = bytearray(layout["size"])
+        elif len(buffer) != layout["size"]:
+            raise ValueError(f"The buffer has {len(buffer)} bytes, the state needs {layout['size']}")
+        self.buffer = buffer
+        self.buffer[:HEADER_SIZE] = bytes((number_players, factories_num))
+
+        array = np.frombuffer(self.buffer, dtype=np.uint8)
+        for name in self.__slots__[3:]:
+            part_slice, dtype, shape = layout[name]
+            setattr(self, name, array[part_slice].view(dtype).reshape(shape))
+
+        if data is not None:
+            self.restore(data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Compact_game_state:
+        """ State from a snapshot, the size of the game is read from its header """
+        return cls(data[0], data[1], data)
+
+    @classmethod
+    def from_game_logic(cls, game_logic: Game_logic) -> Compact_game_state:
+        state = cls(game_logic.number_players, game_logic.factories_num)
+        state.capture(game_logic)
+        return state
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __reduce__(self):
+        # The parts are views of the buffer, only the buffer is pickled
+        return (Compact_game_state.from_bytes, (self.snapshot(),))
+
+    def snapshot(self) -> bytes:
+        """ Copy of the whole state """
+        return bytes(self.buffer)
+
+    def restore(self, data: bytes) -> None:
+        """ Replaces the whole state with a snapshot of a game of the same size
+
+        Raises
+        ------
+        ValueError
+            The snapshot is from a game of another size
+        """
+        if len(data) != len(self.buffer) or bytes(data[:HEADER_SIZE]) != bytes(self.buffer[:HEADER_SIZE]):
+            raise ValueError(
+                f"The snapshot is not from a game of {self.number_players} players and {self.factories_num} factories"
+            )
+        self.buffer[:] = data
+
+    def copy(self) -> Compact_game_state:
+        """ Copy of the state in a new bytearray, also for a state kept in a shared buffer """
+        return Compact_game_state(self.number_players, self.factories_num, self.buffer)
+
+    def capture(self, game_logic: Game_logic) -> None:
+        """ Writes the state of a game (Game_logic or Count_game_logic) in the buffer,
+        the order of the bag of Game_logic is not kept
+
+        Raises
+        ------
+        ValueError
+            The game is not of the size of the state, or its seed does not fit in 64 bits
+        """
+        if game_logic.number_players != self.number_players or game_logic.factories_num != self.factories_num:
+            raise ValueError("The game is not of the size of the state")
+        if not 0 <= game_logic.seed < 2**64:
+            raise ValueError(f"The seed {game_logic.seed} does not fit in 64 bits")
+
+        self.seed[0] = game_logic.seed
+        self.factories[:] = game_logic.factories_counts
+        self.center[:] = game_logic.center_counts
+        self.bag[:] = game_logic.bag_counts
+        self.discarted[:] = game_logic.discarted_counts
+
+        for player_index, board in enumerate(game_logic.players_boards):
+            self.walls[player_index] = (board.wall != 0) @ COLUMNS_BITS
+            for row, actual_row in enumerate(board.pattern_lines):
+                self.pattern_lines[player_index, row, 0] = actual_row[0]
+                self.pattern_lines[player_index, row, 1] = np.count_nonzero(actual_row)
+            self.floor_lines[player_index] = board.floor_line
+            self.scores[player_index] = board.score
+            self.init_player[player_index] = board.init_player
+
+        self.side_to_move[0] = game_logic.side_to_move
+        self.game_end[0] = game_logic.game_end
+
+        rng_state = game_logic.rng.bit_generator.state
+        self.rng[:16] = np.frombuffer(rng_state["state"]["state"].to_bytes(16, "little"), dtype=np.uint8)
+        self.rng[16:32] = np.frombuffer(rng_state["state"]["inc"].to_bytes(16, "little"), dtype=np.uint8)
+        self.rng[32] = rng_state["has_uint32"]
+        self.rng[33:] = np.frombuffer(int(rng_state["uinteger"]).to_bytes(4, "little"), dtype=np.uint8)
+
+    def apply_to(self, game_logic: Count_game_logic) -> None:
+        """ Writes the state into a game of the same size, the caches,
+        the tile counters and the Zobrist hash are updated
+
+        Raises
+        ------
+        ValueError
+            The game is not a Count_game_logic or it is not of the size of the state
+        """
+        if not isinstance(game_logic, Count_game_logic):
+            raise ValueError("The state can only be applied to a Count_game_logic, the order of the bag is not kept")
+        if game_logic.number_players != self.number_players or game_logic.factories_num != self.factories_num:
+            raise ValueError("The game is not of the size of the state")
+
+        game_logic.seed = int(self.seed[0])
+        for factory_num, factory_counts in enumerate(self.factories.tolist()):
+            for i, count in enumerate(factory_counts):
+                game_logic.set_factory_count(factory_num, i + 1, count)
+        for i, count in enumerate(self.center.tolist()):
+            game_logic.set_center_count(i + 1, count)
+        game_logic.bag_counts = self.bag.tolist()
+        game_logic.discarted_counts = self.discarted.tolist()
+
+        boards_counts = [0]*5
+        for player_index, board in enumerate(game_logic.players_boards):
+            wall_rows = self.walls[player_index]
+            wall = WALL_PATTERN_ARRAY*((wall_rows[:, None] & COLUMNS_BITS) != 0)
+            board.wall = wall
+
+            for row, (tile_type, count) in enumerate(self.pattern_lines[player_index].tolist()):
+                actual_row = board.pattern_lines[row]
+                actual_row[:] = 0
+                actual_row[:count] = tile_type
+                board.update_row_cache(row)
+                if count:
+                    boards_counts[tile_type - 1] += count
+
+            board.floor_line[:] = self.floor_lines[player_index]
+            board.update_floor_cache()
+
+            previous_score = board.score
+            board.score = int(self.scores[player_index])
+            board.update_score_cache(previous_score)
+            board.init_player = bool(self.init_player[player_index])
+
+            for row in range(5):
+                for tile_type in range(1, 6):
+                    if board.wall_rows_colours[row] >> (tile_type - 1) & 1:
+                        boards_counts[tile_type - 1] += 1
+            for tile in board.floor_line.tolist():
+                if tile > 0:
+                    boards_counts[tile - 1] += 1
+
+        game_logic.boards_counts = boards_counts
+        game_logic.set_side_to_move(int(self.side_to_move[0]))
+        game_logic.game_end = bool(self.game_end[0])
+
+        rng_bytes = self.rng.tobytes()
+        game_logic.rng.bit_generator.state = {
+            "bit_generator": "PCG64",
+            "state": {
+                "state": int.from_bytes(rng_bytes[:16], "little"),
+                "inc": int.from_bytes(rng_bytes[16:32], "little"),
+            },
+            "has_uint32": rng_bytes[32],
+            "uinteger": int.from_bytes(rng_bytes[33:], "little"),
+        }
+
+        game_logic.zobrist_hash = game_logic.compute_zobrist_hash()
+        game_logic.state_version += 1
+        if game_logic.check_invariants:
+            game_logic.check_tile_conservation()
+
+    def to_game_logic(self, board_backend: str = "numpy") -> Count_game_logic:
+        """ New game in this state """
+        game_logic = Count_game_logic(self.number_players, seed=int(self.seed[0]), board_backend=board_backend)
+        self.apply_to(game_logic)
+        return game_logic
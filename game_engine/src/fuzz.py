@@ -0,0 +1,486 @@
+""" Randomized soak test of the game engine
+
+Each fuzz game is defined by its seed alone: the seed chooses the number of
+players, the board backend and the models of the seats (FUZZ_MODELS), and it
+is the seed of the Game_logic. The game is played by Game_state_machine and
+after every step Game_checker verifies:
+
+- tile_conservation: 20 tiles of each type, O(1) with the counters of Game_logic
+  after every step and a full recount (validate_game_logic) after every round
+- score: the scores and the walls only change in the wall tiling, the scores
+  are never negative, they lose at most 14 points (a full floor line) in a
+  round, and the tiles of the walls are never removed
+- game_end: the game ends when a wall row is full or a score reaches 100
+- termination: the game ends in at most max_plies moves
+- exception: the engine raised an exception
+
+A failing game is shrunk by replaying its moves with Scripted_player: moves
+are removed and replaced by the first legal move while the same check fails,
+the result is a short (seed, moves) that reproduces the failure.
+
+Usage: python -m game_engine.src.fuzz --games 10000
+"""
+import argparse
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterator, List, Optional, Tuple
+from .game_logic import Game_logic, Game_viewer, Player_model, BOARD_BACKENDS
+from .run_simulation import Game_state_machine, Game_states
+from .models.fuzz_models import FUZZ_MODELS, Random_legal_player
+
+MAX_PLIES = 3000
+# Points lost with a full floor line
+MAX_FLOOR_PENALTY = 14
+
+
+class Script_exhausted(Exception):
+    """ A Scripted_player was asked for a move after the last move of its script """
+
+
+class Move_script():
+    """ Moves shared by the Scripted_player of a game, in the order they are played """
+    def __init__(self, moves: List[Tuple[int, int, int]]):
+        self.moves = list(moves)
+        self.index = 0
+
+
+class Scripted_player(Player_model):
+    """ Plays the next move of a Move_script, whatever seat it is """
+    def __init__(self, game_viewer: Game_viewer, player_index: int, script: Move_script):
+        super().__init__(game_viewer, player_index)
+        self.script = script
+
+    def player_move(self) -> Tuple[int, int, int]:
+        if self.script.index == len(self.script.moves):
+            raise Script_exhausted()
+        move = self.script.moves[self.script.index]
+        self.script.index += 1
+        return move
+
+
+class Game_checker():
+    """ Invariants checked after every step of a game, see the module docstring
+
+    Extra checks are functions of the Game_state_machine that return
+    a message when they fail and None otherwise.
+    """
+    def __init__(self, game_state: Game_state_machine, extra_checks: List[Callable] = ()):
+        self.game_state = game_state
+        self.extra_checks = list(extra_checks)
+        self.scores, self.walls_tiles = self.__boards_state()
+
+    def __boards_state(self) -> Tuple[List[int], List[int]]:
+        boards = self.game_state.game_logic.players_boards
+        return [int(board.score) for board in boards], [int(np.count_nonzero(board.wall)) for board in boards]
+
+    def check(self) -> Optional[Tuple[str, str]]:
+        """ Checks the state reached by the last step
+
+        Returns
+        -------
+        Optional[Tuple[str, str]]
+            (check, message) of the first check that fails, None if every check passes
+        """
+        game_logic = self.game_state.game_logic
+        state = self.game_state.state
+
+        try:
+            game_logic.check_tile_conservation()
+            if state == Game_states.WALL_TILING:
+                game_logic.validate_game_logic()
+        except RuntimeError as error:
+            return ("tile_conservation", str(error))
+
+        scores, walls_tiles = self.__boards_state()
+        tiling = state in (Game_states.ROUND_END, Game_states.WALL_TILING)
+        for player_index, (score, previous_score, wall_tiles, previous_wall_tiles) in enumerate(
+            zip(scores, self.scores, walls_tiles, self.walls_tiles)
+        ):
+            if score < 0:
+                return ("score", f"Player {player_index} has a negative score {score}")
+            if wall_tiles < previous_wall_tiles:
+                return ("score", f"Player {player_index} lost wall tiles, {previous_wall_tiles} -> {wall_tiles}")
+            if not tiling and (score != previous_score or wall_tiles != previous_wall_tiles):
+                return ("score", f"Player {player_index} changed its score or wall in the state {state.name}")
+            if score < previous_score - MAX_FLOOR_PENALTY:
+                return ("score", f"Player {player_index} lost more than {MAX_FLOOR_PENALTY} points, {previous_score} -> {score}")
+        self.scores, self.walls_tiles = scores, walls_tiles
+
+        if state == Game_states.WALL_TILING:
+            full_row = any(
+                np.count_nonzero(board.wall, axis=1).max() == 5
+                for board in game_logic.players_boards
+            )
+            expected_game_end = full_row or max(scores) >= 100
+            if game_logic.game_end != expected_game_end:
+                return ("game_end", f"game_end is {game_logic.game_end}, full wall row {full_row}, scores {scores}")
+
+        for extra_check in self.extra_checks:
+            message = extra_check(self.game_state)
+            if message is not None:
+                return (extra_check.__name__, message)
+
+        return None
+
+
+class Fuzz_result():
+    """ Result of one fuzz game
+
+    Attributes
+    ----------
+    seed : int
+        Seed of the game
+    number_players : int
+        Number of players
+    board_backend : str
+        Board implementation
+    models : Tuple[str, ...]
+        Name of the model of each seat, "Scripted_player" for replays
+    plies : int
+        Number of moves played
+    check : str
+        Name of the failed check, None if the game passed every check
+    message : str
+        Description of the failure
+    moves : List[Tuple[int, int, int]]
+        Moves until the failure, empty if the game passed every check
+    """
+    def __init__(
+            self,
+            seed: int,
+            number_players: int,
+            board_backend: str,
+            models: Tuple[str, ...],
+            plies: int,
+            check: str = None,
+            message: str = None,
+            moves: List[Tuple[int, int, int]] = (),
+        ):
+        self.seed = seed
+        self.number_players = number_players
+        self.board_backend = board_backend
+        self.models = models
+        self.plies = plies
+        self.check = check
+        self.message = message
+        self.moves = list(moves)
+
+    @property
+    def failed(self) -> bool:
+        return self.check is not None
+
+    def __repr__(self) -> str:
+        text = (
+            f"Fuzz_result(seed={self.seed}, number_players={self.number_players}, "
+            f"board_backend={self.board_backend!r}, models={self.models}, plies={self.plies}"
+        )
+        if self.failed:
+            text += f", check={self.check!r}, message={self.message!r}, moves={self.moves}"
+        return text + ")"
+
+
+def get_game_setup(seed: int) -> Tuple[int, str, Tuple[type, ...]]:
+    """ Number of players, board backend and models of the seats of a fuzz game,
+    at least one model places tiles on the pattern lines so the game can end """
+    rng = np.random.default_rng(seed)
+    number_players = int(rng.integers(1, 5))
+    board_backend = list(BOARD_BACKENDS)[rng.integers(len(BOARD_BACKENDS))]
+    models = [FUZZ_MODELS[i] for i in rng.integers(len(FUZZ_MODELS), size=number_players)]
+    if not any(model.makes_progress for model in models):
+        models[0] = Random_legal_player
+    return number_players, board_backend, tuple(models)
+
+
+def check_game(
+        seed: int,
+        number_players: int,
+        board_backend: str,
+        players_models: Tuple[type, ...] = None,
+        moves: List[Tuple[int, int, int]] = None,
+        max_plies: int = MAX_PLIES,
+        extra_checks: List[Callable] = (),
+    ) -> Fuzz_result:
+    """ Plays one game checking the invariants after every step
+
+    Parameters
+    ----------
+    seed : int
+        Seed of the Game_logic
+    number_players : int
+        Number of players
+    board_backend : str
+        Board implementation
+    players_models : Tuple[type, ...], optional
+        Player_model class of each seat
+    moves : List[Tuple[int, int, int]], optional
+        Moves to replay instead of the models, the game stops without
+        failure when the moves run out
+    max_plies : int, optional
+        Moves after which the game is considered endless, by default MAX_PLIES
+    extra_checks : List[Callable], optional
+        More checks, see Game_checker
+
+    Returns
+    -------
+    Fuzz_result
+        The moves are only kept when a check fails
+    """
+    game_logic = Game_logic(number_players=number_players, seed=seed, board_backend=board_backend, check_invariants=True)
+    game_viewer = Game_viewer(game_logic)
+
+    if moves is not None:
+        script = Move_script(moves)
+        players = [Scripted_player(game_viewer, i, script) for i in range(number_players)]
+        models_names = ("Scripted_player",)*number_players
+    else:
+        players = [model(game_viewer, i) for i, model in enumerate(players_models)]
+        models_names = tuple(model.__name__ for model in players_models)
+
+    # Every move asked to the players, also the one that raised an exception
+    played_moves = []
+    players = [Logged_player(player, played_moves) for player in players]
+
+    failure = None
+    try:
+        game_state = Game_state_machine(game_logic, players)
+        checker = Game_checker(game_state, extra_checks)
+        while game_state.state != Game_states.GAME_END:
+            game_state.next()
+
+            failure = checker.check()
+            if failure is None and len(played_moves) > max_plies:
+                failure = ("termination", f"The game did not end after {max_plies} moves")
+            if failure is not None:
+                break
+    except Script_exhausted:
+        pass
+    except Exception as error:
+        failure = ("exception", repr(error))
+
+    if failure is None:
+        return Fuzz_result(seed, number_players, board_backend, models_names, len(played_moves))
+
+    check, message = failure
+    return Fuzz_result(seed, number_players, board_backend, models_names, len(played_moves), check, message, played_moves)
+
+
+class Logged_player(Player_model):
+    """ Plays the moves of another model and appends them to a list """
+    def __init__(self, player: Player_model, moves_log: List[Tuple[int, int, int]]):
+        self.game_viewer = player.game_viewer
+        self.player_index = player.player_index
+        self.player = player
+        self.moves_log = moves_log
+
+    def player_move(self) -> Tuple[int, int, int]:
+        move = self.player.player_move()
+        self.moves_log.append(tuple(int(value) for value in move))
+        return move
+
+
+def first_legal_move(result: Fuzz_result, moves: List[Tuple[int, int, int]]) -> Optional[Tuple[int, int, int]]:
+    """ First legal move after replaying moves in the game of result, None if the game ended """
+    game_logic = Game_logic(number_players=result.number_players, seed=result.seed, board_backend=result.board_backend)
+    game_viewer = Game_viewer(game_logic)
+    script = Move_script(moves)
+    game_state = Game_state_machine(game_logic, [Scripted_player(game_viewer, i, script) for i in range(result.number_players)])
+    try:
+        while game_state.state != Game_states.GAME_END:
+            game_state.next()
+    except Script_exhausted:
+        return game_logic.legal_moves(game_logic.side_to_move)[0]
+    except Exception:
+        return None
+    return None
+
+
+def shrink(result: Fuzz_result, max_plies: int = MAX_PLIES, extra_checks: List[Callable] = ()) -> Fuzz_result:
+    """ Shortest and simplest moves found that fail the same check with the same seed
+
+    1.- Removes groups of moves, from half of the moves down to single moves
+    2.- Replaces each move by the first legal move
+
+    A candidate is kept when its replay fails the same check. If the replay of
+    the original moves does not fail (the failure depends on the models and not
+    only on the moves) the result is returned as it is.
+    """
+    def replay(moves):
+        return check_game(
+            result.seed, result.number_players, result.board_backend,
+            moves=moves, max_plies=max_plies, extra_checks=extra_checks,
+        )
+
+    best = replay(result.moves)
+    if best.check != result.check:
+        return result
+
+    chunk_size = max(len(best.moves)//2, 1)
+    while True:
+        start = 0
+        while start < len(best.moves):
+            candidate = replay(best.moves[:start] + best.moves[start + chunk_size:])
+            if candidate.check == result.check and len(candidate.moves) < len(best.moves):
+                best = candidate
+            else:
+                start += chunk_size
+        if chunk_size == 1:
+            break
+        chunk_size = max(chunk_size//2, 1)
+
+    for ply in range(len(best.moves)):
+        first_move = first_legal_move(result, best.moves[:ply])
+        if first_move is None or first_move == best.moves[ply]:
+            continue
+        candidate = replay(best.moves[:ply] + [first_move] + best.moves[ply + 1:])
+        if candidate.check == result.check and len(candidate.moves) <= len(best.moves):
+            best = candidate
+
+    return best
+
+
+def fuzz_games(seeds: List[int], max_plies: int = MAX_PLIES, shrink_failures: bool = True, extra_checks: List[Callable] = ()) -> List[Fuzz_result]:
+    """ Plays a group of fuzz games in the current process, the failures are shrunk """
+    results = []
+    for seed in seeds:
+        number_players, board_backend, players_models = get_game_setup(seed)
+        result = check_game(
+            seed, number_players, board_backend, players_models,
+            max_plies=max_plies, extra_checks=extra_checks,
+        )
+        if result.failed and shrink_failures:
+            result = shrink(result, max_plies, extra_checks)
+        results.append(result)
+    return results
+
+
+class Fuzzer():
+    """ Plays many fuzz games using all the cores, like Tournament
+
+    Attributes
+    ----------
+    games_played : int
+        Number of games finished in the last run
+    elapsed_time : float
+        Seconds since the start of the last run
+    failures : List[Fuzz_result]
+        Failed games of the last run
+    """
+    def __init__(
+            self,
+            number_games: int,
+            seed: int = 0,
+            max_workers: int = None,
+            chunk_size: int = 64,
+            max_plies: int = MAX_PLIES,
+            shrink_failures: bool = True,
+            extra_checks: List[Callable] = (),
+        ):
+        """
+        Parameters
+        ----------
+        number_games : int
+            Number of games to play
+        seed : int, optional
+            Seed of the first game, the game i uses seed + i, by default 0
+        max_workers : int, optional
+            Number of worker processes, by default the number of cores,
+            with 1 the games are played in the current process
+        chunk_size : int, optional
+            Number of games sent to a worker at once, by default 64
+        max_plies : int, optional
+            Moves after which a game is considered endless, by default MAX_PLIES
+        shrink_failures : bool, optional
+            Shrink the moves of the failed games, by default True
+        extra_checks : List[Callable], optional
+            More checks, see Game_checker, they must be importable from
+            the worker processes (defined at module level)
+        """
+        if chunk_size < 1:
+            raise ValueError("The chunk size should be at least 1")
+
+        self.number_games = number_games
+        self.seed = seed
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.chunk_size = chunk_size
+        self.max_plies = max_plies
+        self.shrink_failures = shrink_failures
+        self.extra_checks = list(extra_checks)
+
+        self.games_played = 0
+        self.plies_played = 0
+        self.elapsed_time = 0.0
+        self.failures = []
+
+    @property
+    def games_per_second(self) -> float:
+        if self.elapsed_time == 0:
+            return 0.0
+        return self.games_played / self.elapsed_time
+
+    def run(self) -> Iterator[Fuzz_result]:
+        """ Plays the games, the results are yielded as the games finish """
+        seeds = list(range(self.seed, self.seed + self.number_games))
+        chunks = [seeds[i:i + self.chunk_size] for i in range(0, len(seeds), self.chunk_size)]
+        arguments = (self.max_plies, self.shrink_failures, self.extra_checks)
+
+        self.games_played = 0
+        self.plies_played = 0
+        self.failures = []
+        start_time = time.perf_counter()
+
+        def results_of(chunk_results):
+            for result in chunk_results:
+                self.games_played += 1
+                self.plies_played += result.plies
+                self.elapsed_time = time.perf_counter() - start_time
+                if result.failed:
+                    self.failures.append(result)
+                yield result
+
+        if self.max_workers == 1:
+            for chunk in chunks:
+                yield from results_of(fuzz_games(chunk, *arguments))
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(fuzz_games, chunk, *arguments) for chunk in chunks]
+            for future in as_completed(futures):
+                yield from results_of(future.result())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Randomized soak test of the Azul game engine")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES)
+    parser.add_argument("--no-shrink", action="store_true")
+    args = parser.parse_args()
+
+    fuzzer = Fuzzer(
+        args.games,
+        seed=args.seed,
+        max_workers=args.workers,
+        chunk_size=args.chunk_size,
+        max_plies=args.max_plies,
+        shrink_failures=not args.no_shrink,
+    )
+
+    report_every = max(args.games//20, 1)
+    for result in fuzzer.run():
+        if result.failed:
+            print(result)
+        if fuzzer.games_played % report_every == 0:
+            print(f"{fuzzer.games_played}/{args.games} games, {fuzzer.games_per_second:.1f} games/s, {len(fuzzer.failures)} failures")
+
+    print(
+        f"games: {fuzzer.games_played}, plies: {fuzzer.plies_played}, failures: {len(fuzzer.failures)}, "
+        f"{fuzzer.games_per_second:.1f} games/s, {fuzzer.plies_played/max(fuzzer.elapsed_time, 1e-9):.0f} plies/s"
+    )
+
+
+if __name__ == '__main__':
+    main()
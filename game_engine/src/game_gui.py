@@ -1,89 +1,197 @@
+import os
 import pygame
 from pathlib import Path
+from typing import List
 from .settings import SCREEN_WIDTH, SCREEN_HEIGHT, NUMBER_PLAYERS
 from .game_logic import Game_logic, Game_viewer
 import math
 from .models.dummy_model import Dummy_player
 from .run_simulation import Game_state_machine
+from .game_replay import Game_replay
+from .simulation_thread import Simulation_thread
 import numpy as np
 ROOT = Path(__file__).parent
 
+BOARD_IMAGE_PATH = Path(ROOT, "assets", "azul-board-500px.jpg")
+
+BACKGROUND_COLOR = (255, 255, 255)
+CIRCLE_COLOR = (238,229,222)
+CIRCLE_RADIUS = 70
+RADIUS_BIG_CIRCLE = 245
+
+TILES_COLORS_DICT = {
+    -1: (245,245,245),
+    1: (87,161,196),
+    2: (238,194,114),
+    3: (235,65,74),
+    4:  (3,3,2),
+    5: (99,209,223),
+}
+
+
+def create_headless_screen(width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT) -> pygame.Surface:
+    """ Screen of SDL's dummy video driver, to render without a window
+
+    The driver must be chosen before the display is initialized, so this
+    must be called before any other pygame.display function.
+    """
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pygame.display.init()
+    return pygame.display.set_mode((width, height))
+
 
 class Game_GUI():
-    def __init__(self, screen):
+    """ Draws a game with pygame
+
+    run plays the game in a Simulation_thread and draws its latest snapshot
+    at the frame rate of the GUI. Keys: space play/pause, right arrow one step,
+    up/down arrows double/halve the ply rate, f fast-forward on/off.
+
+    Everything that does not change during the game (the background, the boards
+    and the factories circles) is drawn once in a background surface, and each
+    tile type is a pre-rendered surface. The screen is divided in regions, one
+    for each factory, one for the center and one for each board, and render only
+    redraws the regions whose state changed since the previous frame.
+
+    Attributes
+    ----------
+    screen : pygame.Surface
+        Surface where the game is drawn
+    game_viewer : Game_viewer
+        View of the game that is drawn, or a Game_snapshot
+    game_state : Game_state_machine
+        Game played by run, None when the GUI only draws a game_viewer
+    regions : dict
+        Region key: pygame.Rect, keys are ("factory", i), ("center",) and ("board", i)
+    """
+    def __init__(
+            self,
+            screen: pygame.Surface,
+            game_state: Game_state_machine = None,
+            game_viewer: Game_viewer = None,
+            fps: int = 60,
+            ply_rate: float = 1.0,
+    ):
+        """
+        Parameters
+        ----------
+        screen : pygame.Surface
+            Surface where the game is drawn
+        game_state : Game_state_machine, optional
+            Game to play with run, by default a game of Dummy_player
+            if game_viewer is not given either
+        game_viewer : Game_viewer, optional
+            Game to draw, by default a read only view of the game of game_state
+        fps : int, optional
+            Frames per second of run, by default 60
+        ply_rate : float, optional
+            Steps of the game per second of run, by default 1.0
+        """
         self.screen = screen
 
         # simulation logic
-        game_logic = Game_logic(number_players=NUMBER_PLAYERS)
-        self.game_viewer = Game_viewer(game_logic)
+        if game_state is None and game_viewer is None:
+            game_logic = Game_logic(number_players=NUMBER_PLAYERS)
+            players_viewer = Game_viewer(game_logic)
 
-        players = []
-        for i in range(NUMBER_PLAYERS):
-            players.append(Dummy_player(self.game_viewer, i))
-        self.game_state = Game_state_machine(game_logic, players)
-        
+            players = []
+            for i in range(NUMBER_PLAYERS):
+                players.append(Dummy_player(players_viewer, i))
+            game_state = Game_state_machine(game_logic, players)
 
-        self.clock = pygame.time.Clock()
-        self.running = True
-
-        self.factories_positions = []
+        if game_viewer is None:
+            game_viewer = Game_viewer(game_state.game_logic, read_only=True)
 
-        self.factories_center_position = (0,0)
-        self.board_size = None
-        self.__init_screen_setup()
+        self.game_state = game_state
+        self.game_viewer = game_viewer
 
-        self.tiles_colors_dict = {
-            1: (87,161,196),
-            2: (238,194,114),
-            3: (235,65,74),
-            4:  (3,3,2),
-            5: (99,209,223),
-        }
+        self.clock = pygame.time.Clock()
+        self.fps = fps
+        self.ply_rate = ply_rate
+        self.running = True
 
+        self.tiles_colors_dict = TILES_COLORS_DICT
         self.tile_size = 40
-        
-        
-
-        self.draw_tiles()
+        self.separation = 5
 
-    def draw_player_boards(self):
-        board_image_path = Path(ROOT, "assets", "azul-board-500px.jpg")
-        board_image = pygame.image.load(board_image_path)
-        botton_position = SCREEN_HEIGHT - board_image.get_height()
-
-        # Draw players boards
-        for i in range(self.game_viewer.get_number_of_players()):
-            self.screen.blit(board_image, (board_image.get_width()*i, botton_position))
+        # Assets are loaded and converted to the format of the screen only once
+        self.board_image = pygame.image.load(BOARD_IMAGE_PATH)
+        if pygame.display.get_surface() is not None:
+            self.board_image = self.board_image.convert()
+        self.board_size = (self.board_image.get_width(), self.board_image.get_height())
 
-    def __init_screen_setup(self):
-        board_image_path = Path(ROOT, "assets", "azul-board-500px.jpg")
-        board_image = pygame.image.load(board_image_path)
-        botton_position = SCREEN_HEIGHT - board_image.get_height()
-        self.board_size = (board_image.get_width(), board_image.get_height())
+        self.tile_surfaces = {}
+        for tile_type, tile_color in self.tiles_colors_dict.items():
+            tile_surface = pygame.Surface((self.tile_size, self.tile_size))
+            tile_surface.fill(tile_color)
+            self.tile_surfaces[tile_type] = tile_surface
 
-        self.screen.fill((255, 255, 255)) 
+        self.factories_positions = []
+        self.factories_center_position = (0,0)
+        self.center_positions = []
+        self.regions = {}
+        self.__init_screen_setup()
 
-        self.draw_player_boards()
+        self.last_render_state = {}
+        self.full_redraw = True
 
-        # Draw factories circles
-        circle_color = (238,229,222)
-        circle_radius = 70
+    def __init_screen_setup(self):
+        screen_width, screen_height = self.screen.get_size()
+        botton_position = screen_height - self.board_size[1]
 
-        radius_big_circle = 245
+        for i in range(self.game_viewer.get_number_of_players()):
+            self.regions[("board", i)] = pygame.Rect((self.board_size[0]*i, botton_position), self.board_size)
 
-        cx = SCREEN_WIDTH//2
-        cy = radius_big_circle + circle_radius + 10
+        cx = screen_width//2
+        cy = RADIUS_BIG_CIRCLE + CIRCLE_RADIUS + 10
         self.factories_center_position = (cx, cy)
 
         factories_num = len(self.game_viewer.get_factories())
         for i in range(factories_num):
             angle = 2 * math.pi * i / factories_num + 3*math.pi/2
-            x = int(cx + radius_big_circle * math.cos(angle))
-            y = int(cy + radius_big_circle * math.sin(angle))
+            x = int(cx + RADIUS_BIG_CIRCLE * math.cos(angle))
+            y = int(cy + RADIUS_BIG_CIRCLE * math.sin(angle))
             self.factories_positions.append((x,y))
-            
-            pygame.draw.circle(self.screen, circle_color, (x, y), circle_radius)
-    
+            self.regions[("factory", i)] = pygame.Rect(x - CIRCLE_RADIUS, y - CIRCLE_RADIUS, 2*CIRCLE_RADIUS, 2*CIRCLE_RADIUS)
+
+        # If the square increase by 2 every time
+        # 2x2=4
+        # 4x4=16
+        # 6x6=36
+        # The sequence formula is f(x)=4n^2
+        # To find the minimum value g(n)=sqrt(x/4) the inverse function
+        # But if we want the square size (2n)(2n) size = 2n
+        # where n = ceil(sqrt(x/4))
+        needed_spaces = 6*6
+        square_size = 2*math.ceil(math.sqrt(needed_spaces / 4))
+        relative_positions = []
+
+        for i in range(square_size):
+            for j in range(square_size):
+                position_relative = np.array([j,i]) + np.array([-square_size//2,-square_size//2])
+                relative_positions.append(position_relative)
+
+        relative_positions = self.__create_spiral_order(relative_positions)
+        cell_size = self.tile_size + self.separation
+        self.center_positions = [
+            (cx + relative_position[0]*cell_size, cy + relative_position[1]*cell_size)
+            for relative_position in relative_positions
+        ]
+        self.regions[("center",)] = pygame.Rect(
+            cx - square_size//2*cell_size, cy - square_size//2*cell_size,
+            square_size*cell_size, square_size*cell_size
+        )
+
+        self.background = pygame.Surface(self.screen.get_size())
+        self.background.fill(BACKGROUND_COLOR)
+        self.draw_player_boards()
+        for position in self.factories_positions:
+            pygame.draw.circle(self.background, CIRCLE_COLOR, position, CIRCLE_RADIUS)
+
+    def draw_player_boards(self):
+        for i in range(self.game_viewer.get_number_of_players()):
+            self.background.blit(self.board_image, self.regions[("board", i)])
+
     def __create_spiral_order(self, array):
         n = math.ceil(math.sqrt(len(array)))
         # n = 4
@@ -91,10 +199,10 @@ class Game_GUI():
         spiral_matrix = [[0] * n for _ in range(n)]
         num = 1
         x, y = n // 2 - 1, n // 2 - 1
-        
+
         directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]  # right, down, left, up
         dir_idx = 0
-        
+
         steps = 1  # Number of steps in the current direction
         while num <= n * n:
             for _ in range(2):  # Repeat for the same number of steps in two directions
@@ -116,174 +224,216 @@ class Game_GUI():
 
         return reorder_arr
 
-    def draw_tiles(self):
-
-        circle_color = (238,229,222)
-        separation = 5
-
-        factories = self.game_viewer.get_factories()
-        for i in range(len(factories)):
-            factory_tiles = factories[i]
-            factory_position = self.factories_positions[i]
-
-            tile_1_position = (
-                factory_position[0] + separation,
-                factory_position[1] + separation,
-                self.tile_size,
-                self.tile_size
-            )
-            tile_2_position  = (
-                factory_position[0] - self.tile_size - separation,
-                factory_position[1] - self.tile_size - separation,
-                self.tile_size,
-                self.tile_size
-            )
-            tile_3_position  = (
-                factory_position[0] - self.tile_size - separation,
-                factory_position[1] + separation,
-                self.tile_size,
-                self.tile_size
-            )
-            tile_4_position  = (
-                factory_position[0] + separation,
-                factory_position[1] - self.tile_size - separation,
-                self.tile_size,
-                self.tile_size
+    def set_game_viewer(self, game_viewer: Game_viewer) -> None:
+        """ Draws another game or a Game_snapshot with the same number of players,
+        only the regions that are different from the previous game are redrawn """
+        self.game_viewer = game_viewer
+
+    def render_state(self) -> dict:
+        """ State of every region, a region is redrawn when its state changes
+
+        Returns
+        -------
+        dict
+            Region key: tuple with everything drawn in the region
+        """
+        state = {}
+        for i, factory_tiles in enumerate(self.game_viewer.get_factories()):
+            state[("factory", i)] = tuple(factory_tiles)
+        state[("center",)] = tuple(self.game_viewer.get_center_tiles())
+
+        for player_num in range(self.game_viewer.get_number_of_players()):
+            wall_tiles = self.game_viewer.get_player_wall(player_num)
+            pattern_lines = self.game_viewer.get_player_pattern_lines(player_num)
+            floor_tiles = self.game_viewer.get_player_floor_lines(player_num)
+            state[("board", player_num)] = (
+                np.asarray(wall_tiles).tobytes(),
+                tuple(np.asarray(pattern_line).tobytes() for pattern_line in pattern_lines),
+                np.asarray(floor_tiles).tobytes(),
             )
-            tiles_positions = [
-                tile_1_position,
-                tile_2_position,
-                tile_3_position,
-                tile_4_position
+        return state
+
+    def invalidate(self) -> None:
+        """ The next render draws the whole screen """
+        self.full_redraw = True
+
+    def render(self) -> List[pygame.Rect]:
+        """ Draws the regions that changed since the previous frame
+
+        Returns
+        -------
+        List[pygame.Rect]
+            Areas of the screen that changed, for pygame.display.update
+        """
+        render_state = self.render_state()
+
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+            changed_regions = list(render_state)
+        else:
+            changed_regions = [
+                region
+                for region, region_state in render_state.items()
+                if self.last_render_state.get(region) != region_state
             ]
 
-            if len(factory_tiles) == 0:
-                for i in range(4):
-                    tile_color = circle_color
-                    pygame.draw.rect(self.screen, tile_color, tiles_positions[i])
-            else:
-                for i, tile_type in enumerate(factory_tiles):
-                    tile_color = self.tiles_colors_dict[tile_type]
-                    pygame.draw.rect(self.screen, tile_color, tiles_positions[i])
-
-        cx, cy = self.factories_center_position
+        dirty_rects = []
+        for region in changed_regions:
+            rect = self.regions[region]
+            if not self.full_redraw:
+                self.screen.blit(self.background, rect, rect)
 
-        center_tiles = self.game_viewer.get_center_tiles()
+            if region[0] == "factory":
+                self.draw_factory_tiles(region[1])
+            elif region[0] == "center":
+                self.draw_center_tiles()
+            else:
+                self.draw_player_tiles(region[1])
+            dirty_rects.append(rect)
 
-        # center_tiles = [1,2,3,4,5]
+        if self.full_redraw:
+            dirty_rects = [self.screen.get_rect()]
+            self.full_redraw = False
 
-        # If the square increase by 2 every time
-        # 2x2=4
-        # 4x4=16
-        # 6x6=36
-        # The sequence formula is f(x)=4n^2
-        # To find the minimum value g(n)=sqrt(x/4) the inverse function
-        # But if we want the square size (2n)(2n) size = 2n
-        # where n = ceil(sqrt(x/4))
-        needed_spaces = len(center_tiles)
-        needed_spaces = 6*6
-        square_size = 2*math.ceil(math.sqrt(needed_spaces / 4))
-        relative_positions = []
+        self.last_render_state = render_state
+        return dirty_rects
 
-        for i in range(square_size):
-            for j in range(square_size):
-                position_relative = np.array([j,i]) + np.array([-square_size//2,-square_size//2])
-                relative_positions.append(position_relative)
+    def draw_factory_tiles(self, factory_num: int):
+        factory_tiles = self.game_viewer.get_factories()[factory_num]
+        factory_position = self.factories_positions[factory_num]
+        separation = self.separation
 
+        tiles_positions = [
+            (factory_position[0] + separation, factory_position[1] + separation),
+            (factory_position[0] - self.tile_size - separation, factory_position[1] - self.tile_size - separation),
+            (factory_position[0] - self.tile_size - separation, factory_position[1] + separation),
+            (factory_position[0] + separation, factory_position[1] - self.tile_size - separation),
+        ]
 
-        relative_positions = self.__create_spiral_order(relative_positions)
-                
-        for i, relative_position in enumerate(relative_positions):
-            tile_position = (
-                cx + relative_position[0]*(self.tile_size+separation),
-                cy + relative_position[1]*(self.tile_size+separation),
-                self.tile_size, 
-                self.tile_size
-            )
+        # The empty spaces are the circle of the background
+        for i, tile_type in enumerate(factory_tiles):
+            self.screen.blit(self.tile_surfaces[tile_type], tiles_positions[i])
 
-            if len(center_tiles) > i:
-                tile_type = center_tiles[i]
-                tile_color = self.tiles_colors_dict[tile_type]
-            else:
-                tile_color = (255,255,255)
-            pygame.draw.rect(self.screen, tile_color, tile_position)
+    def draw_center_tiles(self):
+        center_tiles = self.game_viewer.get_center_tiles()
+        for tile_type, tile_position in zip(center_tiles, self.center_positions):
+            self.screen.blit(self.tile_surfaces[tile_type], tile_position)
 
-    def draw_players_tiles(self):
+    def draw_player_tiles(self, player_num: int):
+        board_x, board_y = self.regions[("board", player_num)].topleft
 
-        self.draw_player_boards()
         tile_separation = 4
-        for player_num in range(NUMBER_PLAYERS):
-            wall_tiles = self.game_viewer.get_player_wall(player_num)
-            for i in range(len(wall_tiles)):
-                for j in range(len(wall_tiles)):
-                    x = 262 + (self.board_size[0])*player_num + (self.tile_size+tile_separation)*j
-                    y = 14 + (SCREEN_HEIGHT - self.board_size[1]) + (self.tile_size+tile_separation)*i
-                    tile_position = (
-                        x,
-                        y,
-                        self.tile_size,
-                        self.tile_size
-
-                    )
-                    tile_type = wall_tiles[i, j]
-                    if tile_type != 0:
-                        
-                        tile_color = self.tiles_colors_dict[tile_type]
-                        pygame.draw.rect(self.screen, tile_color, tile_position)
-        
-
-        for player_num in range(NUMBER_PLAYERS):
-            pattern_lines = self.game_viewer.get_player_pattern_lines(player_num)
-            for i, pattern_line in enumerate(pattern_lines):
-                for j, tile_type in enumerate(pattern_line):
-                    
-                    x = 20 + (self.board_size[0])*player_num + (self.tile_size+tile_separation)*(4-j)
-                    y = 14 + (SCREEN_HEIGHT - self.board_size[1]) + (self.tile_size+tile_separation)*i
-                    tile_position = (
-                            x,
-                            y,
-                            self.tile_size,
-                            self.tile_size
-                    )
-                    if tile_type != 0:
-                        tile_color = self.tiles_colors_dict[tile_type]
-
-                        pygame.draw.rect(self.screen, tile_color, tile_position)
-        
-        tile_separation = 8
-        for player_num in range(NUMBER_PLAYERS):
-            floor_tiles = self.game_viewer.get_player_floor_lines(player_num)
-            print(floor_tiles)
-            for i in range(len(floor_tiles)):
-                x = 18 + (self.board_size[0])*player_num + (self.tile_size+tile_separation)*i
-                y = 220 + (SCREEN_HEIGHT - self.board_size[1]) + (self.tile_size+tile_separation)
-                tile_position = (
-                        x,
-                        y,
-                        self.tile_size,
-                        self.tile_size
-                )
-                tile_type = floor_tiles[i]
+        wall_tiles = self.game_viewer.get_player_wall(player_num)
+        for i in range(len(wall_tiles)):
+            for j in range(len(wall_tiles)):
+                tile_type = wall_tiles[i][j]
+                if tile_type != 0:
+                    x = 262 + board_x + (self.tile_size+tile_separation)*j
+                    y = 14 + board_y + (self.tile_size+tile_separation)*i
+                    self.screen.blit(self.tile_surfaces[tile_type], (x, y))
+
+        pattern_lines = self.game_viewer.get_player_pattern_lines(player_num)
+        for i, pattern_line in enumerate(pattern_lines):
+            for j, tile_type in enumerate(pattern_line):
                 if tile_type != 0:
-                    tile_color = self.tiles_colors_dict[tile_type]
-                    pygame.draw.rect(self.screen, tile_color, tile_position)
+                    x = 20 + board_x + (self.tile_size+tile_separation)*(4-j)
+                    y = 14 + board_y + (self.tile_size+tile_separation)*i
+                    self.screen.blit(self.tile_surfaces[tile_type], (x, y))
 
+        tile_separation = 8
+        floor_tiles = self.game_viewer.get_player_floor_lines(player_num)
+        for i, tile_type in enumerate(floor_tiles):
+            if tile_type != 0:
+                x = 18 + board_x + (self.tile_size+tile_separation)*i
+                y = 220 + board_y + (self.tile_size+tile_separation)
+                self.screen.blit(self.tile_surfaces[tile_type], (x, y))
+
+    def save_frame(self, path: str) -> None:
+        """ Saves the screen to an image file, the format is given by the extension """
+        pygame.image.save(self.screen, str(path))
+
+    def handle_key(self, key: int, simulation: Simulation_thread) -> None:
+        if key == pygame.K_SPACE:
+            if simulation.paused:
+                simulation.play()
+            else:
+                simulation.pause()
+        elif key == pygame.K_RIGHT:
+            simulation.step()
+        elif key == pygame.K_UP:
+            self.ply_rate *= 2
+            if simulation.ply_rate is not None:
+                simulation.set_ply_rate(self.ply_rate)
+        elif key == pygame.K_DOWN:
+            self.ply_rate /= 2
+            if simulation.ply_rate is not None:
+                simulation.set_ply_rate(self.ply_rate)
+        elif key == pygame.K_f:
+            simulation.set_ply_rate(self.ply_rate if simulation.ply_rate is None else None)
 
     def run(self):
-        # for _ in range(47):
-        #     self.game_state.next()
+        if self.game_state is None:
+            raise RuntimeError("There is no game to play, the GUI was created with only a game viewer")
+
+        simulation = Simulation_thread(self.game_state, self.ply_rate)
+        simulation.start()
 
         while self.running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
-
-            
-            pygame.display.flip()  
-            self.clock.tick(1)
-            self.game_state.next()
-
-            self.draw_tiles()
-            self.draw_players_tiles()
-
-        pygame.quit()
\ No newline at end of file
+                elif event.type == pygame.KEYDOWN:
+                    self.handle_key(event.key, simulation)
+
+            snapshot = simulation.latest_snapshot()
+            if snapshot is not None:
+                self.set_game_viewer(snapshot)
+                rate = "max" if simulation.ply_rate is None else f"{simulation.ply_rate:g}"
+                status = "paused" if simulation.paused else f"{rate} plies/s"
+                pygame.display.set_caption(f"Azul IA simulation - ply {snapshot.ply} - {status}")
+
+            dirty_rects = self.render()
+            pygame.display.update(dirty_rects)
+            self.clock.tick(self.fps)
+
+        simulation.stop()
+        simulation.join()
+        pygame.quit()
+
+
+def render_replay(replay: Game_replay, output_dir: str, screen: pygame.Surface = None, image_format: str = "png") -> int:
+    """ Saves one frame for the state before each move of a replay and
+    one for the end of the game, frame_00000.png, frame_00001.png, ...
+
+    Parameters
+    ----------
+    replay : Game_replay
+        Game to render
+    output_dir : str
+        Directory of the frames, created if it doesn't exist
+    screen : pygame.Surface, optional
+        Surface to draw, by default a headless screen (create_headless_screen)
+    image_format : str, optional
+        Extension of the frames, by default "png"
+
+    Returns
+    -------
+    int
+        Number of frames
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if screen is None:
+        screen = create_headless_screen()
+
+    game_gui = Game_GUI(screen, game_viewer=Game_viewer(replay.seek(0), read_only=True))
+    for ply in range(len(replay) + 1):
+        game_logic = replay.seek(ply)
+        if game_logic is not game_gui.game_viewer.game_logic:
+            game_gui.set_game_viewer(Game_viewer(game_logic, read_only=True))
+
+        game_gui.render()
+        game_gui.save_frame(output_dir / f"frame_{ply:05d}.{image_format}")
+
+    return len(replay) + 1
\ No newline at end of file
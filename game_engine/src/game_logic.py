@@ -1,56 +1,179 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
 import numpy as np
-import random
 from typing import List
-import warnings
-from collections import deque
-from enum import Enum, auto
+from enum import Enum, IntEnum, auto
 from itertools import cycle
 # from .model_abstract_class import Player_model
-from icecream import ic
-from collections import Counter
+from .bitboard_tables import (
+    WALL_PATTERN, WALL_COLUMN, FULL_LINE, COLOUR_MASKS, RUN_LENGTH, PLACEMENT_POINTS
+)
+from .zobrist import ZOBRIST_KEYS
+
+WALL_PATTERN_ARRAY = np.array(WALL_PATTERN, dtype=int)
+WALL_PATTERN_ARRAY.setflags(write=False)
+WALL_BITS_INDEX = np.arange(25, dtype=np.int64).reshape(5, 5)
+
+
+def game_seed_sequence(seed: int) -> np.random.SeedSequence:
+    """ Seed sequence of the bag of a game, the child 0 of SeedSequence(seed) """
+    return np.random.SeedSequence(seed, spawn_key=(0,))
+
+
+def count_tiles(tiles: List[int]) -> List[int]:
+    """ Number of tiles of each type, type t at index t-1 """
+    counts = [0]*5
+    for tile in tiles:
+        if tile > 0:
+            counts[tile - 1] += 1
+    return counts
+
+
+def player_seed_sequence(seed: int, player_index: int) -> np.random.SeedSequence:
+    """ Seed sequence of a player of a game, the child player_index + 1 of SeedSequence(seed) """
+    return np.random.SeedSequence(seed, spawn_key=(player_index + 1,))
+
+
+def fallback_seed_sequence(seed: int) -> np.random.SeedSequence:
+    """ Seed sequence of the moves played for the models that run out of time,
+    the child 5 of SeedSequence(seed), after the players """
+    return np.random.SeedSequence(seed, spawn_key=(5,))
+
+
+class Move_rejection(IntEnum):
+    """ Why a move is not valid, NONE if it is valid
+
+    The validations return these codes, the message of a rejection
+    is only built when it is asked for, with describe_rejection
+    """
+    NONE = 0
+    MIXED_TILES = auto()
+    ROW_HAS_OTHER_TILE = auto()
+    TILE_ON_WALL_ROW = auto()
+    INVALID_FACTORY = auto()
+    INVALID_TILE = auto()
+    TILE_NOT_IN_FACTORY = auto()
+
+
+REJECTION_MESSAGES = {
+    Move_rejection.NONE: "Valid move",
+    Move_rejection.MIXED_TILES: "All tiles to be taken must be identical {tiles}",
+    Move_rejection.ROW_HAS_OTHER_TILE: "These type of tiles '{tile_type}' cannot be placed, there is already another type of tile {actual_row}",
+    Move_rejection.TILE_ON_WALL_ROW: "This type of tile '{tile_type}' is already completed in this row",
+    Move_rejection.INVALID_FACTORY: "Invalid factory num {factory_index}",
+    Move_rejection.INVALID_TILE: "Invalid type of tile {tile_type}",
+    Move_rejection.TILE_NOT_IN_FACTORY: "The required tile is not in that factory {factory_tiles}, required tile {tile_type}",
+}
+
+
+def describe_rejection(rejection: Move_rejection, **context) -> str:
+    """ Message of a rejection, the context gives the values of the message fields
+    (tiles, tile_type, actual_row, factory_index, factory_tiles), missing fields are shown as '?' """
+    fields = {"tiles": "?", "tile_type": "?", "actual_row": "?", "factory_index": "?", "factory_tiles": "?"}
+    fields.update(context)
+    return REJECTION_MESSAGES[rejection].format(**fields)
+
 
 class Board():
-    def __init__(self, game_logic: Game_logic):
+    # Type of tile of each box of the wall, the same read only array for every board
+    wall_default_pattern = WALL_PATTERN_ARRAY
+
+    def __init__(self, game_logic: Game_logic, player_index: int = 0):
         self.game_logic = game_logic
+        self.player_index = player_index
 
         self.score = 0
 
         # Zero means that the space is empty
         # from 1 to 6 are the types of tiles
-        self.wall = np.zeros((5,5), dtype=int)
+        self.__wall = np.zeros((5,5), dtype=int)
         self.pattern_lines = [np.zeros(i+1, dtype=int) for i in range(5)]
         self.floor_line = np.zeros(7, dtype=int)
-        
-        self.wall_default_pattern = self.__get_wall_default_patter()
 
         self.floor_line_minus_points = np.array([-1, -1, -2, -2, -2, -3, -3], dtype=int)
 
         self.init_player = False
 
-    def __get_wall_default_patter(self) -> np.array:
-        """ Creates the default pattern that has the player's board
+        # Bit t-1 is set when the type of tile t is already on that row of the wall
+        self.wall_rows_colours = [0]*5
+        # Bit t-1 is set when the type of tile t can be laid in that row of the pattern lines
+        self.rows_allowed_colours = [FULL_LINE]*5
+        # Same as rows_allowed_colours but zero when the row is full
+        self.rows_open_colours = [FULL_LINE]*5
 
-        This creates a 5x5 array where each number is the type of 
-        tile that should go in each box
+        # Zobrist keys of the current pattern lines rows and floor line
+        self.rows_hash_keys = [0]*5
+        self.floor_hash_key = 0
 
-        Returns
-        -------
-        np.array
-            Array of integers with dimension 5x5 with the default pattern
+    @property
+    def wall(self) -> np.array:
+        """ 5x5 array with the type of tile of each filled box, zero when empty
+
+        It is a read only view, board.wall[row, column] = tile raises. The wall
+        is changed by assigning a whole array (board.wall = wall) or with
+        place_tile_on_wall and remove_tile_from_wall, they all go through set_wall_box
         """
+        wall = self.__wall.view()
+        wall.setflags(write=False)
+        return wall
 
-        circular_list = deque([1, 2, 3, 4, 5])
-        wall_default_pattern = []
+    @wall.setter
+    def wall(self, wall: np.array) -> None:
+        self.set_wall(wall)
 
-        for _ in range(5):
-            row = list(circular_list)
-            circular_list.rotate(1)
-            wall_default_pattern.append(row)
+    def set_wall(self, wall: np.array) -> None:
+        """ Replaces the whole wall, the boxes that are not zero are filled
 
-        wall_default_pattern = np.array(wall_default_pattern)
-        return wall_default_pattern
+        Parameters
+        ----------
+        wall : np.array
+            5x5 array, only the boxes that are zero or not matter
+        """
+        for row in range(5):
+            for column in range(5):
+                self.set_wall_box(row, column, bool(wall[row][column] != 0))
+
+    def set_wall_box(self, row: int, column: int, filled: bool) -> None:
+        """ Fills or empties a box of the wall, every change of the wall goes through it
+
+        It keeps up to date the types of tiles of the wall row (self.wall_rows_colours[row]),
+        the Zobrist hash, the row cache (update_row_cache) and the state version of the game
+
+        Parameters
+        ----------
+        row : int
+            Row of the wall, from 0 to 4
+        column : int
+            Column of the wall, from 0 to 4
+        filled : bool
+            True to place the tile of the box, False to remove it
+        """
+        colour_bit = 1 << (WALL_PATTERN[row][column] - 1)
+        if (self.wall_rows_colours[row] & colour_bit != 0) == filled:
+            return
+
+        self.write_wall_box(row, column, filled)
+        self.wall_rows_colours[row] ^= colour_bit
+        self.game_logic.zobrist_hash ^= ZOBRIST_KEYS.walls[self.player_index][row*5 + column]
+        self.update_row_cache(row)
+
+    def write_wall_box(self, row: int, column: int, filled: bool) -> None:
+        """ Writes a box in the storage of the wall, only called by set_wall_box """
+        self.__wall[row, column] = WALL_PATTERN[row][column] if filled else 0
+
+    def place_tile_on_wall(self, row: int, tile_type: int) -> None:
+        """ Places a tile on the wall and adds the points it scores
+
+        Parameters
+        ----------
+        row : int
+            Row of the wall, from 0 to 4
+        tile_type : int
+            Type of tile, from 1 to 5
+        """
+        column = WALL_COLUMN[row][tile_type]
+        self.set_wall_box(row, column, True)
+        self.__update_score((row, column))
 
     def __update_score(self, new_tiles_index: tuple[int, int]) -> None:
         """ Updates the player's score during each tiling phase
@@ -154,23 +277,18 @@ class Board():
         excess tiles at the completion of a row (self.floor_line[row]) to the discard pile
         """
 
+        previous_score = self.score
         discard_tiles = []
         for row in range(5):
             actual_row = self.pattern_lines[row]
             if np.count_nonzero(actual_row) != len(actual_row):
                 continue
 
-            tile_type = actual_row[0]
-            row_default_pattern = self.wall_default_pattern[row]
-            wall_tile_index = np.where(row_default_pattern == tile_type)[0][0]
-
-            self.wall[row, wall_tile_index] = tile_type
-            self.__update_score((row, wall_tile_index))
-            
-            row_discard_tiles = actual_row.copy()
-            row_discard_tiles[0] = 0
-            discard_tiles += list(row_discard_tiles[1:])
-            actual_row[:] = 0 
+            tile_type = int(actual_row[0])
+            discard_tiles += list(actual_row[1:])
+            actual_row[:] = 0
+            # Also updates the row cache of the now empty row
+            self.place_tile_on_wall(row, tile_type)
         
         
         floor_tiles_discart = self.floor_line[:np.count_nonzero(self.floor_line)]
@@ -196,10 +314,12 @@ class Board():
             self.init_player = False
 
 
-        self.game_logic.discarted_tiles += floor_tiles_discart
+        self.game_logic.discard_tiles(floor_tiles_discart)
         self.floor_line[:] = 0
+        self.update_floor_cache()
+        self.update_score_cache(previous_score)
 
-        self.game_logic.discarted_tiles += discard_tiles
+        self.game_logic.discard_tiles(discard_tiles)
             
     def laying_tiles(self, row: int, tiles: List[int]) -> None:
         """ Place the tiles taken from the factory to one of the rows of the pattern lines (self.pattern_lines)
@@ -221,7 +341,9 @@ class Board():
 
         if not self.validate_laying_tiles(row, tiles):
             raise RuntimeError("It is not possible to make such a move")
-        
+
+        self.game_logic.boards_counts[tiles[0] - 1] += len(tiles)
+
         # Breaks tiles right away, straight to the floor
         if row == -1:
             floor_index = np.count_nonzero(self.floor_line)
@@ -235,8 +357,9 @@ class Board():
                 self.floor_line[floor_index:] = floor_useful_tiles
 
                 # We place the remaining tiles in the discarted_tiles
-                self.game_logic.discarted_tiles += floor_leftover_tiles
+                self.game_logic.discard_tiles(floor_leftover_tiles)
 
+            self.update_floor_cache()
             return
 
         
@@ -270,7 +393,65 @@ class Board():
                 self.floor_line[floor_index:] = floor_useful_tiles
 
                 # We place the remaining tiles in the discarted_tiles
-                self.game_logic.discarted_tiles += floor_leftover_tiles
+                self.game_logic.discard_tiles(floor_leftover_tiles)
+
+            self.update_floor_cache()
+
+        self.update_row_cache(row)
+
+    def update_row_cache(self, row: int) -> None:
+        """ Updates the information kept about a row of the pattern lines,
+        it must be called every time the row or the same row of the wall changes
+
+        1.- The types of tiles that can be laid in the row (self.rows_allowed_colours[row]),
+        a type of tile can be laid if the row is empty or already contains that
+        type, and the type is not on the wall row, the same rules as validate_laying_tiles,
+        and the same types if the row is not full (self.rows_open_colours[row])
+
+        2.- The Zobrist key of the row in the game hash (self.game_logic.zobrist_hash)
+
+        Parameters
+        ----------
+        row : int
+            Row of the pattern lines, from 0 to 4
+        """
+        actual_row = self.pattern_lines[row]
+        row_tile_type = int(actual_row[0])
+        if row_tile_type == 0:
+            allowed_colours = FULL_LINE
+        else:
+            allowed_colours = 1 << (row_tile_type - 1)
+
+        self.rows_allowed_colours[row] = allowed_colours & ~self.wall_rows_colours[row]
+        self.rows_open_colours[row] = 0 if actual_row[-1] != 0 else self.rows_allowed_colours[row]
+
+        row_hash_key = ZOBRIST_KEYS.pattern_lines[self.player_index][row][row_tile_type][np.count_nonzero(actual_row)]
+        self.game_logic.zobrist_hash ^= self.rows_hash_keys[row] ^ row_hash_key
+        self.rows_hash_keys[row] = row_hash_key
+
+        self.game_logic.state_version += 1
+
+    def update_floor_cache(self) -> None:
+        """ Updates the Zobrist key of the floor line in the game hash,
+        it must be called every time the floor line changes
+        """
+        floor_hash_key = ZOBRIST_KEYS.floor_line_key(self.player_index, self.floor_line)
+        self.game_logic.zobrist_hash ^= self.floor_hash_key ^ floor_hash_key
+        self.floor_hash_key = floor_hash_key
+
+    def update_score_cache(self, previous_score: int) -> None:
+        """ Updates the Zobrist key of the score in the game hash,
+        it must be called every time the score changes
+
+        Parameters
+        ----------
+        previous_score : int
+            Score before the change
+        """
+        self.game_logic.zobrist_hash ^= (
+            ZOBRIST_KEYS.score_key(self.player_index, previous_score)
+            ^ ZOBRIST_KEYS.score_key(self.player_index, self.score)
+        )
 
     def validate_laying_tiles(self, row: int, tiles: List[int]) -> bool:
         """ Validates if the movement to be made to place 
@@ -289,36 +470,187 @@ class Board():
         bool
             True if the movement is valid otherwise False
         """
+        return self.laying_tiles_rejection(row, tiles) == Move_rejection.NONE
+
+    def laying_tiles_rejection(self, row: int, tiles: List[int]) -> Move_rejection:
+        """ Same as validate_laying_tiles but returns why the movement is not valid
+
+        Returns
+        -------
+        Move_rejection
+            Move_rejection.NONE if the movement is valid
+        """
         if row == -1:
-            return True
-        
-        tiles_set = set(tiles)
+            return Move_rejection.NONE
 
+        if not tiles:
+            return Move_rejection.MIXED_TILES
 
-        if len(tiles_set) != 1:
-            warnings.warn(f"All tiles to be taken must be identical {tiles}")
-            return False
-        
-        
         tile_type = tiles[0]
-        
-        actual_row = self.pattern_lines[row]
-        
-        if np.count_nonzero(actual_row) != 0 and tile_type not in actual_row:
-            warnings.warn(f"These type of tiles '{tile_type}' cannot be placed, there is already another type of tile {actual_row}")
-            return False
+        for tile in tiles:
+            if tile != tile_type:
+                return Move_rejection.MIXED_TILES
 
-        wall_row = self.wall[row]
-        if tile_type in wall_row:
-            warnings.warn(f"This type of tile '{tile_type}' is already completed in this row")
-            return False
+        # The pattern lines are filled from the left, the first tile gives the type of the row
+        row_tile_type = self.pattern_lines[row][0]
+        if row_tile_type != 0 and row_tile_type != tile_type:
+            return Move_rejection.ROW_HAS_OTHER_TILE
 
-        return True
+        if self.is_tile_on_wall_row(row, tile_type):
+            return Move_rejection.TILE_ON_WALL_ROW
 
+        return Move_rejection.NONE
 
+    def is_tile_on_wall_row(self, row: int, tile_type: int) -> bool:
+        """ Checks if the type of tile is already placed in that row of the wall
+
+        Parameters
+        ----------
+        row : int
+            Row of the wall, from 0 to 4
+        tile_type : int
+            Type of tile, from 1 to 5
+
+        Returns
+        -------
+        bool
+            True if the tile is already on the wall row
+        """
+        return tile_type in self.wall[row]
+
+    def remove_tile_from_wall(self, row: int, tile_type: int) -> None:
+        """ Removes a tile from the wall, only used to undo the wall tiling,
+        the score is not changed
+
+        Parameters
+        ----------
+        row : int
+            Row of the wall, from 0 to 4
+        tile_type : int
+            Type of tile, from 1 to 5
+        """
+        self.set_wall_box(row, WALL_COLUMN[row][tile_type], False)
+
+
+class Bitboard_board(Board):
+    """ Player's board that stores the wall as a 25-bit integer mask
+
+    The pattern lines and the floor line are the same as in Board,
+    only the wall and the scoring change. The score of each new tile is
+    read from the precomputed tables of bitboard_tables instead of
+    walking the wall, the results are exactly the same as Board.
+
+    Attributes
+    ----------
+    wall_mask : int
+        Bit row*5 + column is set when that box of the wall is filled
+    wall_mask_transposed : int
+        Same wall with bit column*5 + row, used to read the columns
+    """
+    def __init__(self, game_logic: Game_logic, player_index: int = 0):
+        self.wall_mask = 0
+        self.wall_mask_transposed = 0
+        super().__init__(game_logic, player_index)
+
+    @property
+    def wall(self) -> np.array:
+        """ 5x5 array with the type of tile of each filled box, zero when empty
+
+        It is built from the wall mask, so it is a copy and it is read only,
+        board.wall[row, column] = tile raises. The wall is changed by assigning
+        a whole array (board.wall = wall) or with place_tile_on_wall and
+        remove_tile_from_wall, they all go through set_wall_box
+        """
+        filled_boxes = (self.wall_mask >> WALL_BITS_INDEX) & 1
+        wall = WALL_PATTERN_ARRAY * filled_boxes
+        wall.setflags(write=False)
+        return wall
+
+    @wall.setter
+    def wall(self, wall: np.array) -> None:
+        self.set_wall(wall)
+
+    def write_wall_box(self, row: int, column: int, filled: bool) -> None:
+        if filled:
+            self.wall_mask |= 1 << (row*5 + column)
+            self.wall_mask_transposed |= 1 << (column*5 + row)
+        else:
+            self.wall_mask &= ~(1 << (row*5 + column))
+            self.wall_mask_transposed &= ~(1 << (column*5 + row))
+
+    def is_tile_on_wall_row(self, row: int, tile_type: int) -> bool:
+        return (self.wall_mask >> (row*5 + WALL_COLUMN[row][tile_type])) & 1 == 1
+
+    def place_tile_on_wall(self, row: int, tile_type: int) -> None:
+        column = WALL_COLUMN[row][tile_type]
+        self.set_wall_box(row, column, True)
+
+        row_line = (self.wall_mask >> (row*5)) & FULL_LINE
+        column_line = (self.wall_mask_transposed >> (column*5)) & FULL_LINE
+
+        self.score += PLACEMENT_POINTS[RUN_LENGTH[row_line][column]][RUN_LENGTH[column_line][row]]
+
+        # Add points if fill row
+        if row_line == FULL_LINE:
+            self.game_logic.game_end = True
+            self.score += 2
+
+        # Add points if fill column
+        if column_line == FULL_LINE:
+            self.score += 7
+
+        # Add points if fill all colors
+        colour_mask = COLOUR_MASKS[tile_type]
+        if self.wall_mask & colour_mask == colour_mask:
+            self.score += 10
+
+    def wall_tiling(self):
+        """ Same as Board.wall_tiling but using the wall mask """
+
+        previous_score = self.score
+        discard_tiles = []
+        for row in range(5):
+            actual_row = self.pattern_lines[row]
+            if np.count_nonzero(actual_row) != len(actual_row):
+                continue
+
+            tile_type = int(actual_row[0])
+            discard_tiles += list(actual_row[1:])
+            actual_row[:] = 0
+            # Also updates the row cache of the now empty row
+            self.place_tile_on_wall(row, tile_type)
+
+        floor_tiles_discart = list(self.floor_line[:np.count_nonzero(self.floor_line)])
+
+        # subtract the floor line tiles to the final score
+        self.score += self.floor_line_minus_points[:len(floor_tiles_discart)].sum()
+
+        if self.score < 0:
+            self.score = 0
+
+        if self.score >= 100:
+            self.game_logic.game_end = True
+
+        if -1 in floor_tiles_discart:
+            floor_tiles_discart.remove(-1)
+            self.init_player = True
+        else:
+            self.init_player = False
+
+        self.game_logic.discard_tiles(floor_tiles_discart)
+        self.floor_line[:] = 0
+        self.update_floor_cache()
+        self.update_score_cache(previous_score)
+
+        self.game_logic.discard_tiles(discard_tiles)
+
+
+BOARD_BACKENDS = {
+    "numpy": Board,
+    "bitboard": Bitboard_board,
+}
 
 
-        
 class Game_logic():
     """ This class contains the main logic of the game
 
@@ -343,9 +675,42 @@ class Game_logic():
     game_end : bool
         Indicates if the game is over, True for when some of the players 
         reach the end game condition
+    board_backend : str
+        Name of the player's board implementation, one of BOARD_BACKENDS
+    factories_counts : List[List[int]]
+        Number of tiles of each type in each factory, type t at index t-1
+    center_counts : List[int]
+        Number of tiles of each type in the center, type t at index t-1
+    state_version : int
+        Increases every time the factories, the center or the pattern lines change,
+        it is used to know when the cached legal moves are outdated
+    side_to_move : int
+        Index of the player that makes the next move
+    zobrist_hash : int
+        64-bit Zobrist hash of the factories, center, walls, pattern lines,
+        floor lines, scores and side to move, updated with every change
+    seed : int
+        Seed of the game
+    rng : np.random.Generator
+        Random generator of the game (game_seed_sequence), every shuffle of the
+        bag uses it so the game only depends on its seed and the moves of the players
+    bag_counts : List[int]
+        Number of tiles of each type in the bag, type t at index t-1
+    discarted_counts : List[int]
+        Number of tiles of each type in the discard pile
+    factories_total_counts : List[int]
+        Number of tiles of each type in all the factories
+    boards_counts : List[int]
+        Number of tiles of each type on all the boards (walls, pattern lines and floor lines)
+    check_invariants : bool
+        Checks the conservation of the tiles (check_tile_conservation) after
+        every move, fill of the factories and discard, for debug runs
+    rejection_counts : List[int]
+        Number of moves validated by Game_viewer.validate_player_move for each
+        Move_rejection, at index int(rejection), None if they are not counted
 
     """
-    def __init__(self, number_players: int = 4, seed: int = 1):
+    def __init__(self, number_players: int = 4, seed: int = 1, board_backend: str = "numpy", check_invariants: bool = False, count_rejections: bool = False):
         """ 
         Parameters
         ----------
@@ -353,31 +718,57 @@ class Game_logic():
             Number of players, from 2 to 4, by default 4
         seed : int, optional
             Set a seed for the randomization
+        board_backend : str, optional
+            Board implementation, "numpy" (Board) or "bitboard" (Bitboard_board),
+            by default "numpy"
+        check_invariants : bool, optional
+            Check the conservation of the tiles after every change, by default False
+        count_rejections : bool, optional
+            Count the validated moves by Move_rejection in rejection_counts, by default False
 
         Raises
         ------
         ValueError
             The number of players should be between 2 and 4
+        ValueError
+            Unknown board backend
         """
 
-        random.seed(seed)
-        np.random.seed(seed)
+        self.rng = np.random.default_rng(game_seed_sequence(seed))
 
         if number_players < 1 or number_players > 4:
             raise ValueError("The number of players should be between 2 and 4")
+
+        if board_backend not in BOARD_BACKENDS:
+            raise ValueError(f"Unknown board backend '{board_backend}', options: {list(BOARD_BACKENDS)}")
         
         self.number_players = number_players
+        self.seed = seed
+        self.board_backend = board_backend
+        self.state_version = 0
+
+        self.side_to_move = 0
+        self.zobrist_hash = ZOBRIST_KEYS.side_to_move[0]
 
         tiles = [
             i
             for i in range(1,5+1)
             for j in range(20)
         ]
-        random.shuffle(tiles)
+        self.rng.shuffle(tiles)
         self.bag_tiles = tiles
 
         self.discarted_tiles = []
 
+        # Where the 20 tiles of each type are, the sum of the five lists
+        # and center_counts is always 20 for every type
+        self.check_invariants = check_invariants
+        self.bag_counts = [20]*5
+        self.discarted_counts = [0]*5
+        self.factories_total_counts = [0]*5
+        self.boards_counts = [0]*5
+
+        self.rejection_counts = [0]*len(Move_rejection) if count_rejections else None
 
         factories_num = 0
         if number_players == 2:
@@ -388,9 +779,14 @@ class Game_logic():
             factories_num = 9
         self.factories_num = factories_num
 
+        self.factories_counts = [[0]*5 for _ in range(self.factories_num)]
+        self.center_counts = [0]*5
         self.factories = [[] for _ in range(self.factories_num)]
         self.center_tiles = []
-        self.players_boards = [Board(self) for _ in range(number_players)]
+        self.__legal_moves_cache = {}
+        self.__floor_restricted_moves_cache = {}
+        board_class = BOARD_BACKENDS[board_backend]
+        self.players_boards = [board_class(self, i) for i in range(number_players)]
 
         self.game_end = False
     
@@ -430,6 +826,19 @@ class Game_logic():
             self.center_tiles += factory_tiles
             factory_tiles.clear()
 
+            factory_counts = self.factories_counts[factory_num]
+            for i in range(5):
+                if factory_counts[i] == 0:
+                    continue
+
+                if i != tile - 1:
+                    self.set_center_count(i + 1, self.center_counts[i] + factory_counts[i])
+                self.set_factory_count(factory_num, i + 1, 0)
+        else:
+            self.set_center_count(tile, 0)
+
+        self.state_version += 1
+
         return delete_items
 
     def validate_get_tiles_from_factory(self, factory_num: int, tile: int) -> bool:
@@ -451,25 +860,31 @@ class Game_logic():
             if movement is not possible, False will be sent
             if the movement is valid True
         """
+        return self.get_tiles_rejection(factory_num, tile) == Move_rejection.NONE
+
+    def get_tiles_rejection(self, factory_num: int, tile: int) -> Move_rejection:
+        """ Same as validate_get_tiles_from_factory but returns why the tiles cannot be taken
+
+        Returns
+        -------
+        Move_rejection
+            Move_rejection.NONE if the movement is valid
+        """
+        if factory_num < -1 or factory_num >= self.factories_num:
+            return Move_rejection.INVALID_FACTORY
 
-        if factory_num < -1 or factory_num > self.factories_num:
-            warnings.warn(f"Invalid factory num {factory_num}")
-            return False
-        
         if tile < 1 or tile > 5:
-            warnings.warn(f"Invalid type of tile {tile}")
-            return False
+            return Move_rejection.INVALID_TILE
 
         if factory_num == -1:
-            factory_tiles = self.center_tiles
+            tile_count = self.center_counts[tile - 1]
         else:
-            factory_tiles = self.factories[factory_num]
+            tile_count = self.factories_counts[factory_num][tile - 1]
 
-        if tile not in factory_tiles:
-            warnings.warn(f"The required tile is not in that factory {factory_tiles}, required tile {tile}")
-            return False
-        
-        return True
+        if tile_count == 0:
+            return Move_rejection.TILE_NOT_IN_FACTORY
+
+        return Move_rejection.NONE
 
     def fill_factories(self) -> None:
         """ Empty the tiles from the bag (self.bag_tiles) 
@@ -510,8 +925,11 @@ class Game_logic():
 
             # Pour the discarded tiles back into the bag
             self.bag_tiles = self.discarted_tiles
-            random.shuffle(self.bag_tiles)
+            self.rng.shuffle(self.bag_tiles)
             self.discarted_tiles = []
+            for i in range(5):
+                self.bag_counts[i] += self.discarted_counts[i]
+                self.discarted_counts[i] = 0
 
 
             # Fill in the remaining factories
@@ -525,122 +943,932 @@ class Game_logic():
                 self.bag_tiles = self.bag_tiles[4:]
 
                 self.factories[factory_num] = tiles
+
+        for factory_num, factory_tiles in enumerate(self.factories):
+            for tile in factory_tiles:
+                self.set_factory_count(factory_num, tile, self.factories_counts[factory_num][tile - 1] + 1)
+                self.bag_counts[tile - 1] -= 1
+
+        self.state_version += 1
+        if self.check_invariants:
+            self.check_tile_conservation()
+
+    def discard_tiles(self, tiles: List[int]) -> None:
+        """ Moves tiles from a board to the discard pile (self.discarted_tiles)
+
+        Parameters
+        ----------
+        tiles : List[int]
+            Tiles from 1 to 5
+        """
+        self.discarted_tiles += tiles
+        for tile in tiles:
+            self.discarted_counts[tile - 1] += 1
+            self.boards_counts[tile - 1] -= 1
+
+        if self.check_invariants:
+            self.check_tile_conservation()
+
+    def discard_mark(self):
+        """ State of the discard pile kept in the undo records, the length of the pile """
+        return len(self.discarted_tiles)
+
+    def undo_discard(self, discard_mark) -> None:
+        """ Returns the tiles discarded after discard_mark (discard_mark) to the boards """
+        for tile in self.discarted_tiles[discard_mark:]:
+            self.discarted_counts[tile - 1] -= 1
+            self.boards_counts[tile - 1] += 1
+        del self.discarted_tiles[discard_mark:]
+
+    def determinize(self, seed: int) -> None:
+        """ Forgets the hidden order of the tiles, for a copy of the game used
+        by a search: the game gets a new random generator from seed and the
+        bag is shuffled with it, so the draws are not the ones of the real game """
+        self.rng = np.random.default_rng(seed)
+        self.rng.shuffle(self.bag_tiles)
+
+    def check_tile_conservation(self) -> None:
+        """ Checks with the counters that there are 20 tiles of each type
+        between the bag, the discard pile, the factories, the center and the boards,
+        it doesn't depend on the size of the game
+
+        Raises
+        ------
+        RuntimeError
+            Some tiles were lost or duplicated
+        """
+        for i in range(5):
+            total = (
+                self.bag_counts[i] + self.discarted_counts[i] + self.factories_total_counts[i]
+                + self.center_counts[i] + self.boards_counts[i]
+            )
+            if total != 20:
+                raise RuntimeError(
+                    f"The number of tiles of type {i + 1} is not equal to 20, total: {total}, "
+                    f"bag {self.bag_counts[i]}, discard pile {self.discarted_counts[i]}, "
+                    f"factories {self.factories_total_counts[i]}, center {self.center_counts[i]}, "
+                    f"boards {self.boards_counts[i]}"
+                )
+
+    def set_factory_count(self, factory_num: int, tile: int, count: int) -> None:
+        """ Changes the number of tiles of a type in self.factories_counts
+        and updates the Zobrist hash """
+        tile_keys = ZOBRIST_KEYS.factories[factory_num][tile - 1]
+        factory_counts = self.factories_counts[factory_num]
+        self.zobrist_hash ^= tile_keys[factory_counts[tile - 1]] ^ tile_keys[count]
+        self.factories_total_counts[tile - 1] += count - factory_counts[tile - 1]
+        factory_counts[tile - 1] = count
+
+    def set_center_count(self, tile: int, count: int) -> None:
+        """ Changes the number of tiles of a type in self.center_counts
+        and updates the Zobrist hash """
+        tile_keys = ZOBRIST_KEYS.center[tile - 1]
+        self.zobrist_hash ^= tile_keys[self.center_counts[tile - 1]] ^ tile_keys[count]
+        self.center_counts[tile - 1] = count
+
+    def set_side_to_move(self, player_index: int) -> None:
+        """ Changes the player that makes the next move and updates the Zobrist hash """
+        self.zobrist_hash ^= ZOBRIST_KEYS.side_to_move[self.side_to_move] ^ ZOBRIST_KEYS.side_to_move[player_index]
+        self.side_to_move = player_index
+
+    def compute_zobrist_hash(self) -> int:
+        """ Computes the Zobrist hash from scratch, self.zobrist_hash
+        must always have the same value
+
+        Returns
+        -------
+        int
+            64-bit hash of the state
+        """
+        zobrist_hash = ZOBRIST_KEYS.side_to_move[self.side_to_move]
+
+        for factory_num, factory_counts in enumerate(self.factories_counts):
+            for i, count in enumerate(factory_counts):
+                zobrist_hash ^= ZOBRIST_KEYS.factories[factory_num][i][count]
+
+        for i, count in enumerate(self.center_counts):
+            zobrist_hash ^= ZOBRIST_KEYS.center[i][count]
+
+        for player_index, board in enumerate(self.players_boards):
+            for row, column in zip(*np.nonzero(board.wall)):
+                zobrist_hash ^= ZOBRIST_KEYS.walls[player_index][row*5 + column]
+
+            for row, actual_row in enumerate(board.pattern_lines):
+                zobrist_hash ^= ZOBRIST_KEYS.pattern_lines[player_index][row][int(actual_row[0])][np.count_nonzero(actual_row)]
+
+            zobrist_hash ^= ZOBRIST_KEYS.floor_line_key(player_index, board.floor_line)
+            zobrist_hash ^= ZOBRIST_KEYS.score_key(player_index, board.score)
+
+        return zobrist_hash
+
+    def same_state(self, other: Game_logic) -> bool:
+        """ Cheap comparison of the visible state of two games through their Zobrist hash,
+        different states can collide but with a probability of about 2^-64 """
+        return self.zobrist_hash == other.zobrist_hash
+
+    def legal_moves(self, player_index: int) -> tuple:
+        """ Every valid move of a player, the same moves that pass
+        Game_viewer.validate_player_move
+
+        The moves are built from the colour counts of the factories and the
+        types of tiles allowed in each row of the player's pattern lines, which
+        are updated as the moves are made. The result is cached until the
+        state changes, so asking again for the same state is O(1).
+
+        Parameters
+        ----------
+        player_index : int
+            Index of the player
+
+        Returns
+        -------
+        tuple
+            Tuple of moves (factory_index, tile_type, row_index), factory_index -1
+            is the center and row_index -1 breaks the tiles to the floor line
+        """
+        cache = self.__legal_moves_cache.get(player_index)
+        if cache is not None and cache[0] == self.state_version:
+            return cache[1]
+
+        rows_allowed_colours = self.players_boards[player_index].rows_allowed_colours
+
+        moves = []
+        sources = [(-1, self.center_counts)] + list(enumerate(self.factories_counts))
+        for factory_index, counts in sources:
+            for tile_type in range(1, 6):
+                if counts[tile_type - 1] == 0:
+                    continue
+
+                tile_bit = 1 << (tile_type - 1)
+                for row_index in range(5):
+                    if rows_allowed_colours[row_index] & tile_bit:
+                        moves.append((factory_index, tile_type, row_index))
+                moves.append((factory_index, tile_type, -1))
+
+        moves = tuple(moves)
+        self.__legal_moves_cache[player_index] = (self.state_version, moves)
+        return moves
+
+    def floor_restricted_moves(self, player_index: int) -> tuple:
+        """ legal_moves without the moves that break a type of tile on the
+        floor line while it can still be laid on a row of the pattern lines
+        that is not full, the moves that Dummy_player can choose
+
+        There is at least one move for each type of tile in each factory, and
+        the result is cached until the state changes like legal_moves.
+
+        Parameters
+        ----------
+        player_index : int
+            Index of the player
+
+        Returns
+        -------
+        tuple
+            Tuple of moves (factory_index, tile_type, row_index)
+        """
+        cache = self.__floor_restricted_moves_cache.get(player_index)
+        if cache is not None and cache[0] == self.state_version:
+            return cache[1]
+
+        open_colours = 0
+        for colours in self.players_boards[player_index].rows_open_colours:
+            open_colours |= colours
+
+        moves = tuple(
+            move for move in self.legal_moves(player_index)
+            if move[2] != -1 or not open_colours & (1 << (move[1] - 1))
+        )
+        self.__floor_restricted_moves_cache[player_index] = (self.state_version, moves)
+        return moves
+
+    def get_source_tiles(self, factory_index: int) -> tuple:
+        """ Tiles of a factory, or of the center when factory_index is -1 """
+        if factory_index == -1:
+            return tuple(self.center_tiles)
+        return tuple(self.factories[factory_index])
+
+    def apply_move(self, player_index: int, factory_index: int, tile_type: int, row_index: int) -> tuple:
+        """ Makes a player's move (take the tiles from a factory and lay them)
+        and returns what is needed to undo it with undo_move
+
+        Parameters
+        ----------
+        player_index : int
+            Index of the player
+        factory_index : int
+            Factory from which the tiles are taken, -1 for the center
+        tile_type : int
+            Type of tile, from 1 to 5
+        row_index : int
+            Row of the pattern lines, -1 to break all tiles
+
+        Returns
+        -------
+        tuple
+            Undo record (player_index, factory_index, tile_type, row_index,
+            source_tiles, center_len, row_len, floor_len, discard_mark, side_to_move),
+            source_tiles are the tiles of the factory (or the center when
+            factory_index is -1) before the move, the lengths, the discard_mark
+            and the side to move are also before the move
+
+        Raises
+        ------
+        RuntimeError
+            The move is invalid
+        """
+        board = self.players_boards[player_index]
+        source_tiles = self.get_source_tiles(factory_index)
+
+        if row_index == -1:
+            row_len = 0
+        else:
+            row_len = np.count_nonzero(board.pattern_lines[row_index])
+
+        undo_record = (
+            player_index,
+            factory_index,
+            tile_type,
+            row_index,
+            source_tiles,
+            len(self.center_tiles),
+            row_len,
+            np.count_nonzero(board.floor_line),
+            self.discard_mark(),
+            self.side_to_move,
+        )
+
+        tiles = self.get_tiles_from_factory(factory_index, tile_type)
+        board.laying_tiles(row_index, tiles)
+        self.set_side_to_move((player_index + 1) % self.number_players)
+
+        if self.check_invariants:
+            self.check_tile_conservation()
+
+        return undo_record
+
+    def undo_move(self, undo_record: tuple) -> None:
+        """ Restores the state before a move made with apply_move,
+        the moves must be undone in the reverse order in which they were made
+
+        Parameters
+        ----------
+        undo_record : tuple
+            Record returned by apply_move
+        """
+        (
+            player_index,
+            factory_index,
+            tile_type,
+            row_index,
+            source_tiles,
+            center_len,
+            row_len,
+            floor_len,
+            discard_mark,
+            side_to_move,
+        ) = undo_record
+
+        board = self.players_boards[player_index]
+
+        self.undo_discard(discard_mark)
+        self.boards_counts[tile_type - 1] -= source_tiles.count(tile_type)
+        board.floor_line[floor_len:] = 0
+        board.update_floor_cache()
+
+        if row_index != -1:
+            board.pattern_lines[row_index][row_len:] = 0
+            board.update_row_cache(row_index)
+
+        self.restore_source_tiles(factory_index, source_tiles, center_len)
+        if factory_index == -1:
+            self.set_center_count(tile_type, source_tiles.count(tile_type))
+        else:
+            for tile in source_tiles:
+                self.set_factory_count(factory_index, tile, self.factories_counts[factory_index][tile - 1] + 1)
+                if tile != tile_type:
+                    self.set_center_count(tile, self.center_counts[tile - 1] - 1)
+
+        self.set_side_to_move(side_to_move)
+        self.state_version += 1
+
+    def restore_source_tiles(self, factory_index: int, source_tiles: tuple, center_len: int) -> None:
+        """ Puts the lists of tiles back as they were before a move (undo_move),
+        the counters are restored by undo_move
+
+        Parameters
+        ----------
+        factory_index : int
+            Factory of the move, -1 for the center
+        source_tiles : tuple
+            Tiles of the factory (or the center) before the move
+        center_len : int
+            Number of tiles in the center before the move
+        """
+        if factory_index == -1:
+            self.center_tiles[:] = source_tiles
+        else:
+            del self.center_tiles[center_len:]
+            self.factories[factory_index][:] = source_tiles
+
+    def apply_wall_tiling(self) -> tuple:
+        """ Wall tiling of every player (Board.wall_tiling) that
+        returns what is needed to undo it with undo_wall_tiling
+
+        Returns
+        -------
+        tuple
+            Undo record (game_end, discard_mark, boards_records), game_end
+            and the discard_mark before the tiling, boards_records has
+            (score, init_player, floor_tiles, full_rows) for each player, where
+            full_rows are the (row, tile_type) moved to the wall
+        """
+        boards_records = []
+        for board in self.players_boards:
+            full_rows = tuple(
+                (row, int(pattern_line[0]))
+                for row, pattern_line in enumerate(board.pattern_lines)
+                if pattern_line[-1] != 0
+            )
+            boards_records.append((board.score, board.init_player, tuple(board.floor_line), full_rows))
+
+        undo_record = (self.game_end, self.discard_mark(), tuple(boards_records))
+
+        for board in self.players_boards:
+            board.wall_tiling()
+
+        return undo_record
+
+    def undo_wall_tiling(self, undo_record: tuple) -> None:
+        """ Restores the state before a wall tiling made with apply_wall_tiling
+
+        Parameters
+        ----------
+        undo_record : tuple
+            Record returned by apply_wall_tiling
+        """
+        game_end, discard_mark, boards_records = undo_record
+
+        for board, (score, init_player, floor_tiles, full_rows) in zip(self.players_boards, boards_records):
+            previous_score = board.score
+            board.score = score
+            board.update_score_cache(previous_score)
+            board.init_player = init_player
+            board.floor_line[:] = floor_tiles
+            board.update_floor_cache()
+
+            for row, tile_type in full_rows:
+                board.pattern_lines[row][:] = tile_type
+                # Also updates the row cache of the full row
+                board.remove_tile_from_wall(row, tile_type)
+
+        self.undo_discard(discard_mark)
+        self.game_end = game_end
+        self.state_version += 1
+
+    def apply_fill_factories(self) -> tuple:
+        """ Fills the factories (fill_factories) and returns
+        what is needed to undo it with undo_fill_factories
+
+        Returns
+        -------
+        tuple
+            Undo record (bag_tiles, discarted_tiles, rng_state), copies of the bag
+            and the discard pile before filling the factories and the state of rng
+        """
+        undo_record = (list(self.bag_tiles), list(self.discarted_tiles), self.rng.bit_generator.state)
+        self.fill_factories()
+        return undo_record
+
+    def undo_fill_factories(self, undo_record: tuple) -> None:
+        """ Empties the factories and restores the bag and the discard pile
+        before a fill made with apply_fill_factories
+
+        Parameters
+        ----------
+        undo_record : tuple
+            Record returned by apply_fill_factories
+        """
+        bag_tiles, discarted_tiles, rng_state = undo_record
+
+        for factory_num, factory_tiles in enumerate(self.factories):
+            factory_tiles.clear()
+            for tile in range(1, 6):
+                self.set_factory_count(factory_num, tile, 0)
+
+        self.bag_tiles = bag_tiles
+        self.discarted_tiles = discarted_tiles
+        self.bag_counts = count_tiles(bag_tiles)
+        self.discarted_counts = count_tiles(discarted_tiles)
+        self.rng.bit_generator.state = rng_state
+        self.state_version += 1
+
+    def first_player(self) -> int:
+        """ Player with the first player marker, who starts the next round, 0 if nobody has it """
+        for player_index, board in enumerate(self.players_boards):
+            if board.init_player:
+                return player_index
+        return 0
+
+    def finish_round(self) -> tuple:
+        """ Wall tiling of the end of a round (apply_wall_tiling), then the
+        first player of the next round moves, if the game is not over
+
+        Returns
+        -------
+        tuple
+            Undo record of apply_wall_tiling, the side to move is not in it
+        """
+        undo_record = self.apply_wall_tiling()
+        if not self.game_end:
+            self.set_side_to_move(self.first_player())
+        return undo_record
+
+    def is_round_over(self) -> bool:
+        """ True when the factories and the center are empty """
+        return not any(self.center_counts) and not any(map(any, self.factories_counts))
     
-    def validate_game_logic(self):
-        players_walls = []
-        players_line_patterns = []
-        players_floors = []
+    def validate_game_logic(self) -> None:
+        """ Counts every tile of the game from scratch and checks that there are
+        20 tiles of each type and that the counters used by check_tile_conservation
+        are right, it is much slower than check_tile_conservation
+
+        Raises
+        ------
+        RuntimeError
+            Some tiles were lost or duplicated, or a counter is wrong
+        """
+        boards_tiles = []
         for player in self.players_boards:
-            players_walls.append(player.wall)
-            players_line_patterns.append(player.pattern_lines)
-            players_floors.append(player.floor_line)
+            boards_tiles += list(player.wall[player.wall != 0])
+            for tiles in player.pattern_lines:
+                boards_tiles += list(tiles[tiles != 0])
+            boards_tiles += list(player.floor_line[player.floor_line > 0])
+
+        factories_tiles = [tile for factory_tiles in self.factories for tile in factory_tiles]
+
+        locations = [
+            ("bag", self.bag_tiles, self.bag_counts),
+            ("discard pile", self.discarted_tiles, self.discarted_counts),
+            ("factories", factories_tiles, self.factories_total_counts),
+            ("center", self.center_tiles, self.center_counts),
+            ("boards", boards_tiles, self.boards_counts),
+        ]
 
-        players_walls = players_walls.copy()
-        players_line_patterns = players_line_patterns.copy()
-        players_floors = players_floors.copy()
+        all_tiles_counts = [0]*5
+        for name, tiles, counts in locations:
+            tiles_counts = count_tiles(tiles)
+            if tiles_counts != list(counts):
+                raise RuntimeError(f"The counter of the {name} is wrong, tiles: {tiles_counts}, counter: {list(counts)}")
+            for i in range(5):
+                all_tiles_counts[i] += tiles_counts[i]
 
-        center_tiles = self.center_tiles.copy()
-        bag_tiles = self.bag_tiles.copy()
-        discarted_tiles = self.discarted_tiles.copy()
-        factories_tiles = self.factories.copy()
+        if sum(all_tiles_counts) != 100:
+            raise RuntimeError(f"The total number of tiles is not 100, number of tiles: {sum(all_tiles_counts)}")
 
-        all_tiles = center_tiles + bag_tiles + discarted_tiles
+        for i in range(5):
+            if all_tiles_counts[i] != 20:
+                raise RuntimeError(f"The number of tiles of type {i + 1} is not equal to 20, total: {all_tiles_counts[i]}")
 
-        for tiles in players_walls:
-            all_tiles += list(tiles[tiles != 0])
 
-        for player_line_patterns in players_line_patterns:
-            for tiles in player_line_patterns:
-                all_tiles += list(tiles[tiles != 0])
+def tiles_from_counts(counts: List[int]) -> List[int]:
+    """ Tiles of a container from the number of tiles of each type, sorted by type """
+    tiles = []
+    for i, count in enumerate(counts):
+        tiles += [i + 1]*count
+    return tiles
 
-        for tiles in players_floors:
-            all_tiles += list(tiles[tiles != 0])
 
-        for tiles in factories_tiles:
-            all_tiles += tiles
+class Count_game_logic(Game_logic):
+    """ Game_logic where the bag, the discard pile, the factories and the center
+    are only kept as the number of tiles of each type (bag_counts, discarted_counts,
+    factories_counts and center_counts)
 
-        if len(all_tiles) != 100:
-            raise RuntimeError(f"The total number of tiles is not 100, number of tiles: {len(all_tiles)}")
-        
-        count_dict = Counter(all_tiles)
-        ic(count_dict)
-        print()
-        all_tiles = np.array(all_tiles)
+    Taking tiles, moving them to the center, discarding and filling the factories
+    are O(number of types of tiles), there are no lists to copy or search. The
+    tiles are drawn from the bag by sampling its counts, so the games are not
+    the same as the games of Game_logic with the same seed, but they only
+    depend on the seed and the moves too.
+
+    The lists bag_tiles, discarted_tiles, factories and center_tiles are built
+    from the counts when they are read, sorted by type, changing them does not
+    change the game. Assigning a list sets the counts of the container.
+    """
+    @property
+    def bag_tiles(self) -> List[int]:
+        return tiles_from_counts(self.bag_counts)
+
+    @bag_tiles.setter
+    def bag_tiles(self, tiles: List[int]) -> None:
+        self.bag_counts = count_tiles(tiles)
+
+    @property
+    def discarted_tiles(self) -> List[int]:
+        return tiles_from_counts(self.discarted_counts)
+
+    @discarted_tiles.setter
+    def discarted_tiles(self, tiles: List[int]) -> None:
+        self.discarted_counts = count_tiles(tiles)
+
+    @property
+    def factories(self) -> List[List[int]]:
+        return [tiles_from_counts(factory_counts) for factory_counts in self.factories_counts]
+
+    @factories.setter
+    def factories(self, factories: List[List[int]]) -> None:
+        for factory_num, factory_tiles in enumerate(factories):
+            for i, count in enumerate(count_tiles(factory_tiles)):
+                self.set_factory_count(factory_num, i + 1, count)
+        self.state_version += 1
+
+    @property
+    def center_tiles(self) -> List[int]:
+        return tiles_from_counts(self.center_counts)
+
+    @center_tiles.setter
+    def center_tiles(self, tiles: List[int]) -> None:
+        for i, count in enumerate(count_tiles(tiles)):
+            self.set_center_count(i + 1, count)
+        self.state_version += 1
+
+    def get_tiles_from_factory(self, factory_num: int, tile: int) -> List[int]:
+        if not self.validate_get_tiles_from_factory(factory_num, tile):
+            raise RuntimeError("It was not possible to remove the tiles")
+
+        if factory_num == -1:
+            taken = self.center_counts[tile - 1]
+            self.set_center_count(tile, 0)
+        else:
+            factory_counts = self.factories_counts[factory_num]
+            taken = factory_counts[tile - 1]
+            for i in range(5):
+                if factory_counts[i] == 0:
+                    continue
+
+                if i != tile - 1:
+                    self.set_center_count(i + 1, self.center_counts[i] + factory_counts[i])
+                self.set_factory_count(factory_num, i + 1, 0)
+
+        self.state_version += 1
+
+        return [tile]*taken
+
+    def get_source_tiles(self, factory_index: int) -> tuple:
+        if factory_index == -1:
+            return tuple(tiles_from_counts(self.center_counts))
+        return tuple(tiles_from_counts(self.factories_counts[factory_index]))
+
+    def fill_factories(self) -> None:
+        """ Fills every factory with 4 tiles drawn from the bag, when the bag is
+        empty the discarded tiles go back to the bag, if there are still not
+        enough tiles the last factories are not full
+
+        Each tile is drawn with the probability of its type in the bag, from
+        one uniform number of the random generator of the game
+        """
+        if not self.is_round_over():
+            raise RuntimeError("It is not possible to fill the factories because they are not empty")
+
+        bag_counts = self.bag_counts
+        bag_size = sum(bag_counts)
+        draws = iter(self.rng.random(self.factories_num*4).tolist())
+
+        for factory_num in range(self.factories_num):
+            factory_counts = [0]*5
+            for _ in range(4):
+                if bag_size == 0:
+                    # Pour the discarded tiles back into the bag
+                    for i in range(5):
+                        bag_counts[i] += self.discarted_counts[i]
+                        self.discarted_counts[i] = 0
+                    bag_size = sum(bag_counts)
+                    if bag_size == 0:
+                        break
+
+                position = int(next(draws)*bag_size)
+                i = 0
+                while position >= bag_counts[i]:
+                    position -= bag_counts[i]
+                    i += 1
+                bag_counts[i] -= 1
+                factory_counts[i] += 1
+                bag_size -= 1
+
+            for i, count in enumerate(factory_counts):
+                if count:
+                    self.set_factory_count(factory_num, i + 1, count)
+
+        self.state_version += 1
+        if self.check_invariants:
+            self.check_tile_conservation()
+
+    def restore_source_tiles(self, factory_index: int, source_tiles: tuple, center_len: int) -> None:
+        """ There are no lists of tiles, the counters restored by undo_move are the whole state """
+        pass
+
+    def discard_tiles(self, tiles: List[int]) -> None:
+        for tile in tiles:
+            self.discarted_counts[tile - 1] += 1
+            self.boards_counts[tile - 1] -= 1
+
+        if self.check_invariants:
+            self.check_tile_conservation()
+
+    def discard_mark(self):
+        """ State of the discard pile kept in the undo records, its counts """
+        return tuple(self.discarted_counts)
+
+    def undo_discard(self, discard_mark) -> None:
+        for i in range(5):
+            self.boards_counts[i] += self.discarted_counts[i] - discard_mark[i]
+            self.discarted_counts[i] = discard_mark[i]
+
+    def determinize(self, seed: int) -> None:
+        """ The bag has no order, the tiles are drawn from its counts with
+        the random generator, a new generator from seed is enough """
+        self.rng = np.random.default_rng(seed)
+
+    def apply_fill_factories(self) -> tuple:
+        """ Fills the factories (fill_factories) and returns
+        what is needed to undo it with undo_fill_factories
+
+        Returns
+        -------
+        tuple
+            Undo record (bag_counts, discarted_counts, rng_state) before filling the factories
+        """
+        undo_record = (tuple(self.bag_counts), tuple(self.discarted_counts), self.rng.bit_generator.state)
+        self.fill_factories()
+        return undo_record
+
+    def undo_fill_factories(self, undo_record: tuple) -> None:
+        bag_counts, discarted_counts, rng_state = undo_record
+
+        for factory_num in range(self.factories_num):
+            for tile in range(1, 6):
+                self.set_factory_count(factory_num, tile, 0)
+
+        self.bag_counts = list(bag_counts)
+        self.discarted_counts = list(discarted_counts)
+        self.rng.bit_generator.state = rng_state
+        self.state_version += 1
+
+
+def get_snapshot_layout(number_players: int, factories_num: int) -> dict:
+    """ Position of each part of the state in the array returned by Game_viewer.snapshot
+
+    The array is int16 and its parts are, in this order:
+
+    - factories: factories_num x 5, number of tiles of each type in each factory
+    - center: 5, number of tiles of each type in the center
+    - bag: 5, number of tiles of each type in the bag
+    - discarted: 5, number of tiles of each type in the discard pile
+    - walls: number_players x 5 x 5, same values as Board.wall
+    - pattern_lines: number_players x 5 x 2, (type of tile, number of tiles) of each row
+    - floor_lines: number_players x 7, same values as Board.floor_line
+    - scores: number_players
+    - init_player: number_players, 1 for the first player
+    - side_to_move: 1
+    - game_end: 1
+
+    Parameters
+    ----------
+    number_players : int
+        Number of players
+    factories_num : int
+        Number of factories
+
+    Returns
+    -------
+    dict
+        Name of each part: (slice in the array, shape)
+    """
+    shapes = [
+        ("factories", (factories_num, 5)),
+        ("center", (5,)),
+        ("bag", (5,)),
+        ("discarted", (5,)),
+        ("walls", (number_players, 5, 5)),
+        ("pattern_lines", (number_players, 5, 2)),
+        ("floor_lines", (number_players, 7)),
+        ("scores", (number_players,)),
+        ("init_player", (number_players,)),
+        ("side_to_move", (1,)),
+        ("game_end", (1,)),
+    ]
+
+    layout = {}
+    offset = 0
+    for name, shape in shapes:
+        size = int(np.prod(shape))
+        layout[name] = (slice(offset, offset + size), shape)
+        offset += size
+    layout["size"] = offset
+
+    return layout
 
-        for i in range(1,6):
-            tiles_by_type = all_tiles[all_tiles == i]
-            if len(tiles_by_type) != 20:
-                raise RuntimeError(f"The number of tiles of type {i} is not equal to 20, total: {len(tiles_by_type)}")
 
-    
 class Game_viewer():
-    def __init__(self, game_logic: Game_logic):
+    """ Access of the players to the state of the game
+
+    By default every getter returns a copy of the state. With read_only=True
+    the arrays are returned as read-only numpy views of the boards (the
+    same view object each time) and the lists as tuples, so the models can
+    look at the state without copying it and without being able to change it.
+    The views of the pattern lines and the floor lines always show the current
+    state of the game. The walls are an exception: get_player_wall returns
+    Board.wall, a view with the numpy backend but a snapshot built from the
+    wall mask with the bitboard backend. Callers must ask for the wall again
+    every time they need it instead of keeping it (as Game_GUI.render_state does).
+    """
+    def __init__(self, game_logic: Game_logic, read_only: bool = False):
+        """
+        Parameters
+        ----------
+        game_logic : Game_logic
+            Game to view
+        read_only : bool, optional
+            Return read-only views and tuples instead of copies, by default False
+        """
         self.game_logic = game_logic
-
-        self.__factories = game_logic.factories
-        self.__center_tiles = game_logic.center_tiles
+        self.read_only = read_only
 
         self.__players_boards = game_logic.players_boards
 
+        self.__read_only_views = {}
+        self.__snapshot_layout = get_snapshot_layout(game_logic.number_players, game_logic.factories_num)
+
+    def __read_only_view(self, key: tuple, array: np.array) -> np.array:
+        cached = self.__read_only_views.get(key)
+        if cached is not None and cached[0] is array:
+            return cached[1]
+
+        view = array.view()
+        view.flags.writeable = False
+        self.__read_only_views[key] = (array, view)
+        return view
+
+    def __pattern_lines_views(self, player_index: int) -> tuple:
+        pattern_lines = self.__players_boards[player_index].pattern_lines
+        return tuple(
+            self.__read_only_view(("pattern_lines", player_index, row), actual_row)
+            for row, actual_row in enumerate(pattern_lines)
+        )
+
     def get_factories(self):
-        return self.__factories.copy()
+        if self.read_only:
+            return tuple(tuple(factory) for factory in self.game_logic.factories)
+        return self.game_logic.factories.copy()
     
     def get_center_tiles(self):
-        return self.__center_tiles.copy()                                               
+        if self.read_only:
+            return tuple(self.game_logic.center_tiles)
+        return self.game_logic.center_tiles.copy()                                               
     
     def get_number_of_players(self):
         return self.game_logic.number_players
     
     def get_player_wall(self, player_index: int):
-        player = self.__players_boards[player_index]
-        wall = player.wall
+        wall = self.__players_boards[player_index].wall
+        if self.read_only:
+            # Board.wall is already read only
+            return wall
         return wall.copy()
     
     def get_player_floor_lines(self, player_index: int):
         player = self.__players_boards[player_index]
         floor_line =  player.floor_line
+        if self.read_only:
+            return self.__read_only_view(("floor_line", player_index), floor_line)
         return floor_line.copy()
     
     def get_player_pattern_lines(self, player_index: int):
+        if self.read_only:
+            return self.__pattern_lines_views(player_index)
         player = self.__players_boards[player_index]
         player_pattern_lines = player.pattern_lines
         return player_pattern_lines.copy()
     
     def get_bag_tiles(self):
         bag_tiles = self.game_logic.bag_tiles
+        if self.read_only:
+            return tuple(bag_tiles)
         return bag_tiles.copy()
     
     def get_discarted_tiles(self):
         discarted_tiles = self.game_logic.discarted_tiles
+        if self.read_only:
+            return tuple(discarted_tiles)
         return discarted_tiles.copy()
+
+    def legal_moves(self, player_index: int) -> tuple:
+        return self.game_logic.legal_moves(player_index)
+
+    def floor_restricted_moves(self, player_index: int) -> tuple:
+        return self.game_logic.floor_restricted_moves(player_index)
+
+    def player_seed_sequence(self, player_index: int) -> np.random.SeedSequence:
+        return player_seed_sequence(self.game_logic.seed, player_index)
+
+    def get_snapshot_layout(self) -> dict:
+        """ Layout of the array returned by snapshot, see get_snapshot_layout """
+        return self.__snapshot_layout
+
+    def snapshot(self, out: np.array = None) -> np.array:
+        """ Whole observable state of the game in one contiguous int16 array,
+        the layout is described in get_snapshot_layout
+
+        Parameters
+        ----------
+        out : np.array, optional
+            int16 array of size layout["size"] to write the snapshot,
+            by default a new array
+
+        Returns
+        -------
+        np.array
+            Snapshot of the state
+        """
+        layout = self.__snapshot_layout
+        if out is None:
+            out = np.empty(layout["size"], dtype=np.int16)
+
+        def part(name):
+            part_slice, shape = layout[name]
+            return out[part_slice].reshape(shape)
+
+        game_logic = self.game_logic
+        part("factories")[:] = game_logic.factories_counts
+        part("center")[:] = game_logic.center_counts
+        part("bag")[:] = game_logic.bag_counts
+        part("discarted")[:] = game_logic.discarted_counts
+
+        walls = part("walls")
+        pattern_lines = part("pattern_lines")
+        floor_lines = part("floor_lines")
+        scores = part("scores")
+        init_player = part("init_player")
+        for player_index, board in enumerate(self.__players_boards):
+            walls[player_index] = board.wall
+            for row, actual_row in enumerate(board.pattern_lines):
+                pattern_lines[player_index, row, 0] = actual_row[0]
+                pattern_lines[player_index, row, 1] = np.count_nonzero(actual_row)
+            floor_lines[player_index] = board.floor_line
+            scores[player_index] = board.score
+            init_player[player_index] = board.init_player
+
+        part("side_to_move")[0] = game_logic.side_to_move
+        part("game_end")[0] = game_logic.game_end
+
+        return out
     
     def validate_player_move(self, player_index: int, factory_index: int, tile_type: int, row_index: int) -> bool:
-        player = self.__players_boards[player_index]
-        
-        validate_get_tiles = self.game_logic.validate_get_tiles_from_factory(factory_index, tile_type)
-        if not validate_get_tiles:
-            return False
-        
+        rejection = self.player_move_rejection(player_index, factory_index, tile_type, row_index)
+
+        rejection_counts = self.game_logic.rejection_counts
+        if rejection_counts is not None:
+            rejection_counts[rejection] += 1
+
+        return rejection == Move_rejection.NONE
+
+    def player_move_rejection(self, player_index: int, factory_index: int, tile_type: int, row_index: int) -> Move_rejection:
+        """ Why the move is not valid, Move_rejection.NONE if it is valid """
+        rejection = self.game_logic.get_tiles_rejection(factory_index, tile_type)
+        if rejection != Move_rejection.NONE:
+            return rejection
+
         if factory_index == -1:
-            factory_tiles = self.game_logic.center_tiles
+            tiles_num = self.game_logic.center_counts[tile_type - 1]
         else:
-            factory_tiles = self.game_logic.factories[factory_index]
+            tiles_num = self.game_logic.factories_counts[factory_index][tile_type - 1]
 
-        occurances_num = np.count_nonzero(np.array(factory_tiles) == tile_type)
-        tiles = [tile_type]*occurances_num
+        return self.__players_boards[player_index].laying_tiles_rejection(row_index, [tile_type]*tiles_num)
 
-        validate_laying_tiles = player.validate_laying_tiles(row_index, tiles)
-        
-        if not validate_laying_tiles:
-            return False
-        
-        return True
-    
+    def describe_player_move(self, player_index: int, factory_index: int, tile_type: int, row_index: int) -> str:
+        """ Human readable reason why the move is not valid, "Valid move" if it is valid """
+        rejection = self.player_move_rejection(player_index, factory_index, tile_type, row_index)
+
+        context = {"factory_index": factory_index, "tile_type": tile_type}
+        if -1 <= factory_index < self.game_logic.factories_num:
+            factory_tiles = self.game_logic.center_tiles if factory_index == -1 else self.game_logic.factories[factory_index]
+            context["factory_tiles"] = list(factory_tiles)
+            context["tiles"] = [tile for tile in factory_tiles if tile == tile_type]
+        if 0 <= row_index < 5:
+            context["actual_row"] = self.__players_boards[player_index].pattern_lines[row_index]
+
+        return describe_rejection(rejection, **context)
+
+    def get_rejection_counts(self) -> dict:
+        """ Number of validated moves by the name of their Move_rejection, None if they are not counted """
+        rejection_counts = self.game_logic.rejection_counts
+        if rejection_counts is None:
+            return None
+        return {rejection.name: rejection_counts[rejection] for rejection in Move_rejection}
 
-    
-        
-        
     def get_players_wall(self):
+        if self.read_only:
+            return tuple(self.get_player_wall(i) for i in range(len(self.__players_boards)))
+
         walls = []
         for player in self.__players_boards:
             wall = player.wall
@@ -649,6 +1877,9 @@ class Game_viewer():
         return walls.copy()
     
     def get_players_floor_lines(self):
+        if self.read_only:
+            return tuple(self.get_player_floor_lines(i) for i in range(len(self.__players_boards)))
+
         floor_lines = []
         for player in self.__players_boards:
             floor_line = player.floor_line
@@ -657,6 +1888,9 @@ class Game_viewer():
         return floor_lines.copy()
     
     def get_players_pattern_lines(self):
+        if self.read_only:
+            return tuple(self.__pattern_lines_views(i) for i in range(len(self.__players_boards)))
+
         pattern_lines = []
         for player in self.__players_boards:
             player_pattern_lines = player.pattern_lines
@@ -669,11 +1903,22 @@ class Player_model(ABC):
     def __init__(self, Game_viewer: Game_viewer, player_index: int):
         self.game_viewer = Game_viewer
         self.player_index = player_index
+        # Own random generator, it only depends on the seed of the game and the player index
+        self.rng = np.random.default_rng(Game_viewer.player_seed_sequence(player_index))
+        # Moves validated by the model, the profiler counts the rejected attempts with it
+        self.validations = 0
 
     @abstractmethod
     def player_move(self) -> Tuple[int, int, int]:
         pass
 
     def validate_player_move(self, factory_index: int, tile_type: int, row_index: int):
+        self.validations += 1
         result = self.game_viewer.validate_player_move(self.player_index, factory_index, tile_type, row_index)
         return result
+
+    def legal_moves(self) -> tuple:
+        return self.game_viewer.legal_moves(self.player_index)
+
+    def floor_restricted_moves(self) -> tuple:
+        return self.game_viewer.floor_restricted_moves(self.player_index)
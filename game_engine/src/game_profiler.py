@@ -0,0 +1,215 @@
+""" Time spent in each phase of the games played by Game_state_machine
+
+A Game_profiler given to Game_state_machine records the wall time and the
+number of calls of each state method: fill_factory, round_end and
+wall_tiling, and player_move split into the think time of the model and the
+apply time of the engine. It also counts the rejected move attempts of each
+move, the calls of Player_model.validate_player_move that did not give the
+move played. The same profiler can be given to many games, the results are
+the totals of all of them.
+
+Without a profiler the state machine only checks that its profiler is None,
+so the instrumentation costs nothing when it is disabled.
+
+Usage:
+
+    python -m game_engine.src.game_profiler game_engine.src.models.dummy_model:Dummy_player \
+        game_engine.src.models.dummy_model:Dummy_player --games 100 --json profile.json --folded profile.folded
+
+The folded file has one line per stack, "game;phase;... microseconds", the
+input of flamegraph.pl or speedscope.
+"""
+import argparse
+import json
+from typing import Dict
+
+THINK = "think"
+APPLY = "apply"
+
+
+class Phase_stats():
+    """ Number of calls and wall time of a phase """
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, elapsed_time: float) -> None:
+        self.calls += 1
+        self.total_time += elapsed_time
+        if elapsed_time > self.max_time:
+            self.max_time = elapsed_time
+
+    def merge(self, other: "Phase_stats") -> None:
+        self.calls += other.calls
+        self.total_time += other.total_time
+        self.max_time = max(self.max_time, other.max_time)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "total_time": self.total_time,
+            "mean_time": self.total_time / self.calls if self.calls else 0.0,
+            "max_time": self.max_time,
+        }
+
+
+class Model_stats():
+    """ Moves of a player model, its think time and its rejected attempts """
+    def __init__(self):
+        self.think = Phase_stats()
+        self.apply = Phase_stats()
+        self.rejected_attempts = 0
+        self.max_rejected_attempts = 0
+
+    def add(self, think_time: float, apply_time: float, rejected_attempts: int) -> None:
+        self.think.add(think_time)
+        self.apply.add(apply_time)
+        self.rejected_attempts += rejected_attempts
+        if rejected_attempts > self.max_rejected_attempts:
+            self.max_rejected_attempts = rejected_attempts
+
+    def merge(self, other: "Model_stats") -> None:
+        self.think.merge(other.think)
+        self.apply.merge(other.apply)
+        self.rejected_attempts += other.rejected_attempts
+        self.max_rejected_attempts = max(self.max_rejected_attempts, other.max_rejected_attempts)
+
+    def to_dict(self) -> dict:
+        moves = self.think.calls
+        return {
+            "moves": moves,
+            THINK: self.think.to_dict(),
+            APPLY: self.apply.to_dict(),
+            "rejected_attempts": self.rejected_attempts,
+            "rejected_attempts_per_move": self.rejected_attempts / moves if moves else 0.0,
+            "max_rejected_attempts": self.max_rejected_attempts,
+        }
+
+
+class Game_profiler():
+    """ Totals of the phases of the games played with it
+
+    Attributes
+    ----------
+    games : int
+        Number of games started
+    phases : Dict[str, Phase_stats]
+        Stats of the state methods by name, "player_move" is the total of think and apply
+    models : Dict[str, Model_stats]
+        Stats of the moves by the class name of the player model
+    """
+    def __init__(self):
+        self.games = 0
+        self.phases: Dict[str, Phase_stats] = {}
+        self.models: Dict[str, Model_stats] = {}
+
+    def start_game(self) -> None:
+        self.games += 1
+
+    def record_phase(self, phase: str, elapsed_time: float) -> None:
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = Phase_stats()
+        stats.add(elapsed_time)
+
+    def record_move(self, model_name: str, think_time: float, apply_time: float, rejected_attempts: int) -> None:
+        """
+        Parameters
+        ----------
+        model_name : str
+            Class name of the player model
+        think_time : float
+            Seconds in Player_model.player_move
+        apply_time : float
+            Seconds in Game_logic.apply_move
+        rejected_attempts : int
+            Moves validated by the model before the move played
+        """
+        self.record_phase("player_move", think_time + apply_time)
+        stats = self.models.get(model_name)
+        if stats is None:
+            stats = self.models[model_name] = Model_stats()
+        stats.add(think_time, apply_time, rejected_attempts)
+
+    def merge(self, other: "Game_profiler") -> None:
+        """ Adds the results of other, for example a profiler of another process """
+        self.games += other.games
+        for phase, stats in other.phases.items():
+            self.phases.setdefault(phase, Phase_stats()).merge(stats)
+        for model_name, stats in other.models.items():
+            self.models.setdefault(model_name, Model_stats()).merge(stats)
+
+    @property
+    def rejected_attempts(self) -> int:
+        return sum(stats.rejected_attempts for stats in self.models.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "games": self.games,
+            "phases": {phase: stats.to_dict() for phase, stats in self.phases.items()},
+            "models": {model_name: stats.to_dict() for model_name, stats in self.models.items()},
+            "rejected_attempts": self.rejected_attempts,
+        }
+
+    def save_json(self, path: str) -> None:
+        with open(path, "w") as json_file:
+            json.dump(self.to_dict(), json_file, indent=2)
+
+    def folded_stacks(self) -> str:
+        """ Wall time in the folded stack format, one "frame;frame;... microseconds" line per stack """
+        lines = []
+        for phase, stats in self.phases.items():
+            if phase != "player_move":
+                lines.append(f"game;{phase} {round(stats.total_time*1e6)}")
+        for model_name, stats in self.models.items():
+            lines.append(f"game;player_move;{THINK};{model_name} {round(stats.think.total_time*1e6)}")
+            lines.append(f"game;player_move;{APPLY};{model_name} {round(stats.apply.total_time*1e6)}")
+        return "\n".join(lines) + "\n"
+
+    def save_folded(self, path: str) -> None:
+        with open(path, "w") as folded_file:
+            folded_file.write(self.folded_stacks())
+
+    def summary(self) -> str:
+        lines = [f"games: {self.games}"]
+        for phase, stats in self.phases.items():
+            lines.append(f"{phase:20s} calls {stats.calls:8d}  total {stats.total_time:9.3f} s  mean {stats.total_time/stats.calls*1e6:9.1f} us")
+        for model_name, stats in self.models.items():
+            moves = stats.think.calls
+            lines.append(
+                f"{model_name:20s} moves {moves:8d}  think {stats.think.total_time:9.3f} s  apply {stats.apply.total_time:9.3f} s"
+                f"  rejected attempts {stats.rejected_attempts} ({stats.rejected_attempts/moves:.2f} per move)"
+            )
+        return "\n".join(lines)
+
+
+def main():
+    from .run_simulation import run_simulation
+    from .tournament import load_model
+
+    parser = argparse.ArgumentParser(description="Time spent in each phase of Azul games")
+    parser.add_argument(
+        "models", nargs="+",
+        help="Player models, one per seat, as package.module:Class_name"
+    )
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Save the results to this JSON file")
+    parser.add_argument("--folded", help="Save the folded stacks to this file")
+    args = parser.parse_args()
+
+    players_models = [load_model(model_path) for model_path in args.models]
+    profiler = Game_profiler()
+    for game in range(args.games):
+        run_simulation(players_models, seed=args.seed + game, profiler=profiler)
+
+    print(profiler.summary())
+    if args.json:
+        profiler.save_json(args.json)
+    if args.folded:
+        profiler.save_folded(args.folded)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+""" Rebuilds the state of a game at any move from its seed and its moves
+
+The game is played again with the same rules as Game_state_machine: the
+first player of the first round is the player 0, after the last move of a
+round every board does the wall tiling and the next round starts with the
+player that took the first player tile. The bag only depends on the seed
+(Game_logic.rng), so the seed and the moves are enough to rebuild the game.
+
+A copy of the game is kept every checkpoint_interval moves, seeking to a
+move starts from the closest checkpoint before it.
+"""
+from __future__ import annotations
+import copy
+from typing import List, Tuple
+from .game_logic import Game_logic
+from .trajectory_recorder import Trajectory_reader, Record_kind
+
+
+class Game_replay():
+    """ Replay of a game from its seed and its moves
+
+    Attributes
+    ----------
+    seed : int
+        Seed of the game
+    number_players : int
+        Number of players
+    moves : List[Tuple[int, int, int]]
+        Moves (factory_index, tile_type, row_index) of the game in order
+    checkpoint_interval : int
+        Number of moves between two checkpoints
+    checkpoints : dict
+        Move number: copy of the game before that move
+    game_logic : Game_logic
+        State of the game before the move number ply, it is replaced by a copy
+        of a checkpoint when seeking backwards
+    ply : int
+        Number of moves made in game_logic
+    """
+    def __init__(
+            self,
+            seed: int,
+            number_players: int,
+            moves: List[Tuple[int, int, int]],
+            checkpoint_interval: int = 16,
+            board_backend: str = "numpy",
+    ):
+        """ Plays the whole game once to validate the moves and store the checkpoints
+
+        Parameters
+        ----------
+        seed : int
+            Seed of the game
+        number_players : int
+            Number of players
+        moves : List[Tuple[int, int, int]]
+            Moves (factory_index, tile_type, row_index) of the game in order
+        checkpoint_interval : int, optional
+            Number of moves between two checkpoints, by default 16
+        board_backend : str, optional
+            Board implementation of the game, by default "numpy"
+
+        Raises
+        ------
+        ValueError
+            The checkpoint interval must be at least 1
+        ValueError
+            A move is not legal or there are moves after the end of the game
+        """
+        if checkpoint_interval < 1:
+            raise ValueError("The checkpoint interval must be at least 1")
+
+        self.seed = seed
+        self.number_players = number_players
+        self.moves = [tuple(int(value) for value in move) for move in moves]
+        self.checkpoint_interval = checkpoint_interval
+
+        self.game_logic = Game_logic(number_players=number_players, seed=seed, board_backend=board_backend)
+        self.game_logic.players_boards[0].init_player = True
+        self.game_logic.fill_factories()
+        self.ply = 0
+
+        self.checkpoints = {0: copy.deepcopy(self.game_logic)}
+        while self.ply < len(self.moves):
+            self.__step()
+            if self.ply % checkpoint_interval == 0:
+                self.checkpoints[self.ply] = copy.deepcopy(self.game_logic)
+
+    @classmethod
+    def from_trajectory(
+            cls,
+            reader: Trajectory_reader,
+            game_id: int,
+            checkpoint_interval: int = 16,
+            board_backend: str = "numpy",
+    ) -> Game_replay:
+        """ Replay of a game saved by a Trajectory_recorder """
+        records = reader.game_records(game_id)
+        game_start = records[records["kind"] == Record_kind.GAME_START]
+        if len(game_start) == 0:
+            raise ValueError(f"There is no game {game_id} in the trajectory file")
+
+        return cls(
+            seed=int(game_start["value"][0]),
+            number_players=int(game_start["player"][0]),
+            moves=reader.game_moves(game_id),
+            checkpoint_interval=checkpoint_interval,
+            board_backend=board_backend,
+        )
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def __step(self) -> None:
+        game_logic = self.game_logic
+        if game_logic.game_end:
+            raise ValueError(f"The game ended before the move {self.ply}")
+
+        player_index = game_logic.side_to_move
+        move = self.moves[self.ply]
+        if move not in game_logic.legal_moves(player_index):
+            raise ValueError(f"The move {self.ply} {move} of the player {player_index} is not legal")
+
+        game_logic.apply_move(player_index, *move)
+        self.ply += 1
+
+        if game_logic.is_round_over():
+            game_logic.finish_round()
+            if not game_logic.game_end:
+                game_logic.fill_factories()
+
+    def seek(self, ply: int) -> Game_logic:
+        """ Moves the replay to the state before the move number ply
+
+        Parameters
+        ----------
+        ply : int
+            From 0, the start of the game, to len(self), the end of the game
+
+        Returns
+        -------
+        Game_logic
+            self.game_logic, the state of the game
+
+        Raises
+        ------
+        ValueError
+            The move number is out of range
+        """
+        if ply < 0 or ply > len(self.moves):
+            raise ValueError(f"The move number must be between 0 and {len(self.moves)}, not {ply}")
+
+        checkpoint_ply = ply - ply % self.checkpoint_interval
+        if not checkpoint_ply <= self.ply <= ply:
+            self.game_logic = copy.deepcopy(self.checkpoints[checkpoint_ply])
+            self.ply = checkpoint_ply
+
+        while self.ply < ply:
+            self.__step()
+
+        return self.game_logic
+
+    def state_at(self, ply: int) -> Game_logic:
+        """ Copy of the game before the move number ply, it is not changed by the replay """
+        return copy.deepcopy(self.seek(ply))
@@ -0,0 +1,175 @@
+""" Batches the evaluations of a model asked by many games or threads
+
+A learned player that evaluates its network for one observation at a time
+pays the whole overhead of a NumPy forward pass for one row. Inference_broker
+collects the observations submitted by every player, from any thread or from
+the tasks of an asyncio event loop, and evaluates them together: a batch is
+run when it has batch_size observations, or max_delay seconds after its first
+observation. Each observation gets its own row of the output back through a
+Future.
+"""
+from __future__ import annotations
+import asyncio
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future
+from typing import Callable
+
+
+class Inference_broker(threading.Thread):
+    """ Background thread that runs a forward function on batches of observations
+
+    Attributes
+    ----------
+    forward : Callable[[np.array], np.array]
+        Function of the model, from a batch x observation_size array
+        to an array with one row of output per observation
+    batch_size : int
+        Maximum number of observations of a batch
+    max_delay : float
+        Seconds a batch waits for more observations after its first one
+    batches : int
+        Number of batches evaluated
+    evaluations : int
+        Number of observations evaluated
+    """
+    def __init__(self, forward: Callable[[np.array], np.array], batch_size: int = 64, max_delay: float = 0.001):
+        """
+        Parameters
+        ----------
+        forward : Callable[[np.array], np.array]
+            Function of the model, it receives the observations stacked in one array
+        batch_size : int, optional
+            Maximum number of observations of a batch, by default 64
+        max_delay : float, optional
+            Seconds a batch waits for more observations, by default 0.001
+        """
+        if batch_size < 1:
+            raise ValueError("The batch size should be at least 1")
+
+        super().__init__(daemon=True)
+        self.forward = forward
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.batches = 0
+        self.evaluations = 0
+
+        self.__requests = queue.SimpleQueue()
+        self.__stopped = False
+
+    def __enter__(self) -> Inference_broker:
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def mean_batch_size(self) -> float:
+        if self.batches == 0:
+            return 0.0
+        return self.evaluations / self.batches
+
+    def submit(self, observation: np.array) -> Future:
+        """ Adds an observation to the next batch
+
+        Returns
+        -------
+        Future
+            Its result is the row of the output of forward for this observation
+
+        Raises
+        ------
+        RuntimeError
+            The broker is stopped
+        """
+        if self.__stopped:
+            raise RuntimeError("The inference broker is stopped")
+        future = Future()
+        self.__requests.put((observation, future))
+        return future
+
+    def evaluate(self, observation: np.array) -> np.array:
+        """ Output of forward for one observation, waits for its batch """
+        return self.submit(observation).result()
+
+    async def evaluate_async(self, observation: np.array) -> np.array:
+        """ Output of forward for one observation, the task is suspended until its batch is run """
+        return await asyncio.wrap_future(self.submit(observation))
+
+    def stop(self) -> None:
+        """ Evaluates the observations already submitted and ends the thread,
+        if the thread was never started their futures get a RuntimeError """
+        if self.__stopped:
+            return
+        self.__stopped = True
+        self.__requests.put(None)
+        if self.is_alive():
+            self.join()
+        else:
+            self.__fail_pending()
+
+    def __fail_pending(self) -> None:
+        """ Sets a RuntimeError on the futures of the observations left in the queue """
+        while True:
+            try:
+                request = self.__requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None and request[1].set_running_or_notify_cancel():
+                request[1].set_exception(RuntimeError("The inference broker is stopped"))
+
+    def __next_batch(self) -> list:
+        """ Waits for an observation, then for more until the batch is full or max_delay is over,
+        None once the broker is stopped and every observation is evaluated """
+        request = self.__requests.get()
+        if request is None:
+            return None
+
+        batch = [request]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.batch_size:
+            try:
+                request = self.__requests.get_nowait()
+            except queue.Empty:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.__requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if request is None:
+                # Stops after this batch
+                self.__requests.put(None)
+                break
+            batch.append(request)
+
+        return batch
+
+    def run(self) -> None:
+        while True:
+            batch = self.__next_batch()
+            if batch is None:
+                break
+
+            batch = [(observation, future) for observation, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                outputs = self.forward(np.stack([observation for observation, _ in batch]))
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+
+            self.batches += 1
+            self.evaluations += len(batch)
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+
+        # Observations submitted while the broker was stopping
+        self.__fail_pending()
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import numpy as np
 from .game_logic import Game_viewer
 from typing import Tuple
 
@@ -6,6 +7,8 @@ class Player_model(ABC):
     def __init__(self, Game_viewer: Game_viewer, player_index: int):
         self.game_viewer = Game_viewer
         self.player_index = player_index
+        # Own random generator, it only depends on the seed of the game and the player index
+        self.rng = np.random.default_rng(Game_viewer.player_seed_sequence(player_index))
 
     @abstractmethod
     def player_move(self) -> Tuple[int, int, int]:
@@ -14,3 +17,7 @@ class Player_model(ABC):
     def validate_player_move(self, factory_index: int, tile_type: int, row_index: int):
         result = self.game_viewer.validate_player_move(self.player_index, factory_index, tile_type, row_index)
         return result
+
+    def legal_moves(self) -> tuple:
+        return self.game_viewer.legal_moves(self.player_index)
+
@@ -1,69 +1,47 @@
-import sys
-# sys.path.append("..")
-from game_engine.src.game_logic import Player_model
-import random
-from typing import Tuple, List
-from icecream import ic
 import numpy as np
-import warnings
-
-class Dummy_player(Player_model):
-    def player_move(self) -> Tuple[int, int, int]:
-        valid_move = False
-        num_factories = len(self.game_viewer.get_factories())
-
-        while valid_move == False:
-            factory_index =  random.randint(0, num_factories) - 1
-            tile_type = random.randint(1, 5)
-            row_index = random.randint(0, 5) -1
-
-            if row_index == -1:
-                valid_move = self.validate_player_move(factory_index, tile_type, row_index)
-                valid_move = valid_move and self.validate_break_group_of_tiles(tile_type)
-            else:
-                valid_move = self.validate_player_move(factory_index, tile_type, row_index)
-        
-        result = (factory_index, tile_type, row_index)
-        return (factory_index, tile_type, row_index)
-    
-
-
-    def validate_break_group_of_tiles(self, tile_type: int) -> bool:
-    
-
-        possible_moves = False
-        
-        for i in range(5):
-            wall_row = self.game_viewer.get_player_wall(self.player_index)[i,]
-            pattern_line_row = self.game_viewer.get_player_pattern_lines(self.player_index)[i]
-
-            # Row full, cannot lay tiles
-            if np.count_nonzero(pattern_line_row) == len(pattern_line_row):
-                continue
-
-            # This row already contains tiles of another type
-            if pattern_line_row[0] != tile_type and pattern_line_row[0] != 0:
-                continue
-
-            # This tile is already in the current row of the wall.
-            if tile_type in wall_row:
-                continue
+from game_engine.src.game_logic import Player_model
+from game_engine.src.batch_game_logic import Batch_game_logic
+from typing import Tuple
 
-            # There is an empty row where the tiles can be placed
-            if pattern_line_row[0] == 0:
-                # warnings.warn(f"There is an empty row where the tiles can be placed, row with index {i}: {pattern_line_row}")
-                possible_moves = True
-                break
 
-            # There is a row that is not full and you can still place tiles in it
-            if pattern_line_row[0] == tile_type:
-                # warnings.warn(f"There is a row that is not full and you can still place tiles in it, row with index {i}: {pattern_line_row}")
-                possible_moves = True
-                break
+class Dummy_player(Player_model):
+    """ Random baseline player, any valid move with the same probability,
+    but it only breaks tiles on the floor line when they cannot be laid
+    on a row of the pattern lines that is not full
 
-        # As no movement is possible the tiles can be laid directly on the floor
-        if possible_moves is False:
-            return True
-         
-        return False
-                
\ No newline at end of file
+    The move is sampled from floor_restricted_moves, so its cost does not
+    depend on how many of the possible moves are invalid.
+    """
+    def player_move(self) -> Tuple[int, int, int]:
+        moves = self.floor_restricted_moves()
+        return moves[self.rng.integers(len(moves))]
+
+
+class Batch_dummy_player():
+    """ Dummy_player for all the games of a Batch_game_logic at once,
+    each game gets one of its floor restricted moves with the same probability
+
+    Attributes
+    ----------
+    batch : Batch_game_logic
+        Games to play
+    rng : np.random.Generator
+        Random generator of the moves
+    """
+    def __init__(self, batch: Batch_game_logic, seed: int = 1):
+        self.batch = batch
+        self.rng = np.random.default_rng(seed)
+
+    def player_moves(self) -> Tuple[np.array, np.array, np.array]:
+        """ Move of the current player of every game, the moves of the games that are over are not valid
+
+        Returns
+        -------
+        Tuple[np.array, np.array, np.array]
+            factory_index, tile_type and row_index of each game, arrays of size N
+        """
+        mask = self.batch.legal_moves_mask(restrict_floor=True).reshape(self.batch.number_games, -1)
+        # The largest random key among the valid moves is a uniform choice
+        keys = self.rng.random(mask.shape)
+        keys[~mask] = -1.0
+        return self.batch.moves_from_index(keys.argmax(axis=1))
\ No newline at end of file
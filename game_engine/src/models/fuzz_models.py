@@ -0,0 +1,73 @@
+""" Player models for the fuzz harness (game_engine/src/fuzz.py)
+
+They only choose among the legal moves, so any error they find is an
+error of the game engine. Models with makes_progress False never place
+tiles on the pattern lines, a game with only those models never ends.
+"""
+from game_engine.src.game_logic import Player_model
+from typing import Tuple
+
+
+class Random_legal_player(Player_model):
+    """ Any legal move with the same probability """
+    makes_progress = True
+
+    def player_move(self) -> Tuple[int, int, int]:
+        legal_moves = self.legal_moves()
+        return legal_moves[self.rng.integers(len(legal_moves))]
+
+
+class First_legal_player(Player_model):
+    """ Always the first legal move, the center first and the lowest factory, tile and row """
+    makes_progress = True
+
+    def player_move(self) -> Tuple[int, int, int]:
+        return self.legal_moves()[0]
+
+
+class Floor_dump_player(Player_model):
+    """ Always breaks the tiles, straight to the floor line """
+    makes_progress = False
+
+    def player_move(self) -> Tuple[int, int, int]:
+        floor_moves = [move for move in self.legal_moves() if move[2] == -1]
+        return floor_moves[self.rng.integers(len(floor_moves))]
+
+
+class Center_first_player(Player_model):
+    """ Takes tiles from the center whenever it is possible """
+    makes_progress = True
+
+    def player_move(self) -> Tuple[int, int, int]:
+        legal_moves = self.legal_moves()
+        center_moves = [move for move in legal_moves if move[0] == -1]
+        if center_moves:
+            legal_moves = center_moves
+        return legal_moves[self.rng.integers(len(legal_moves))]
+
+
+class Overflow_player(Player_model):
+    """ Takes the largest group of tiles and lays it on the shortest row
+    that accepts it, to fill the floor line and the discard pile as much as possible """
+    makes_progress = True
+
+    def player_move(self) -> Tuple[int, int, int]:
+        factories = self.game_viewer.get_factories()
+        center_tiles = self.game_viewer.get_center_tiles()
+
+        def move_key(move):
+            factory_index, tile_type, row_index = move
+            source_tiles = center_tiles if factory_index == -1 else factories[factory_index]
+            row_size = 6 if row_index == -1 else row_index + 1
+            return (-list(source_tiles).count(tile_type), row_size)
+
+        return min(self.legal_moves(), key=move_key)
+
+
+FUZZ_MODELS = [
+    Random_legal_player,
+    First_legal_player,
+    Floor_dump_player,
+    Center_first_player,
+    Overflow_player,
+]
@@ -0,0 +1,428 @@
+import copy
+import math
+import time
+import weakref
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from game_engine.src.game_logic import Game_logic, Game_viewer, Player_model
+
+
+class Mcts_node():
+    """ Node of the search tree, the state of the node is the state reached
+    after making the moves from the root to the node
+
+    Attributes
+    ----------
+    move : Tuple[int, int, int]
+        Move that leads from the parent to this node
+    player_index : int
+        Player that moves in the state of this node
+    zobrist_hash : int
+        Hash of the state of this node, used to reuse the tree between moves
+    untried_moves : List[Tuple[int, int, int]]
+        Legal moves not expanded yet, empty when the round is over
+    total_rewards : List[float]
+        Sum of the rewards of every player through this node
+    """
+    __slots__ = ("move", "parent", "children", "player_index", "zobrist_hash", "untried_moves", "visits", "total_rewards")
+
+    def __init__(self, move, parent, player_index: int, zobrist_hash: int, untried_moves: List, number_players: int):
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.player_index = player_index
+        self.zobrist_hash = zobrist_hash
+        self.untried_moves = untried_moves
+        self.visits = 0
+        self.total_rewards = [0.0]*number_players
+
+    def select_child(self, exploration: float):
+        """ Child with the highest UCT value for the player of this node """
+        log_visits = math.log(self.visits)
+        player_index = self.player_index
+
+        best_child = None
+        best_value = -math.inf
+        for child in self.children:
+            value = (
+                child.total_rewards[player_index] / child.visits
+                + exploration * math.sqrt(log_visits / child.visits)
+            )
+            if value > best_value:
+                best_value = value
+                best_child = child
+
+        return best_child
+
+    def find_state(self, zobrist_hash: int, max_depth: int):
+        """ Searches the subtree for the node of a state, up to max_depth moves below this node """
+        if self.zobrist_hash == zobrist_hash:
+            return self
+
+        if max_depth == 0:
+            return None
+
+        for child in self.children:
+            node = child.find_state(zobrist_hash, max_depth - 1)
+            if node is not None:
+                return node
+
+        return None
+
+
+def rollout_move(game_logic: Game_logic, player_index: int, rng: np.random.Generator) -> Tuple[int, int, int]:
+    """ Random legal move that only breaks tiles to the floor line
+    when no row of the pattern lines can take them """
+    legal_moves = game_logic.legal_moves(player_index)
+    row_moves = [move for move in legal_moves if move[2] != -1]
+    if row_moves:
+        return row_moves[rng.integers(len(row_moves))]
+    return legal_moves[rng.integers(len(legal_moves))]
+
+
+class Mcts_search():
+    """ Monte Carlo Tree Search over a copy of the game
+
+    The tree covers the moves until the end of the current round, the
+    rollouts continue with random moves for rollout_rounds rounds. All
+    the moves, wall tilings and refills are made and undone on the same
+    Game_logic, the game is never copied during the search.
+
+    The reward of each player is its gain of points since the root minus
+    the best gain of the other players, squashed to [0, 1].
+    """
+    def __init__(
+            self,
+            game_logic: Game_logic,
+            exploration: float = 1.4,
+            rollout_rounds: int = 1,
+            rng: np.random.Generator = None,
+        ):
+        self.game_logic = game_logic
+        self.exploration = exploration
+        self.rollout_rounds = rollout_rounds
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        self.root = None
+        self.root_scores = None
+        self.nodes = 0
+        self.iterations = 0
+
+    def new_node(self, move, parent) -> Mcts_node:
+        game_logic = self.game_logic
+        player_index = game_logic.side_to_move
+
+        if game_logic.is_round_over():
+            untried_moves = []
+        else:
+            untried_moves = list(game_logic.legal_moves(player_index))
+            self.rng.shuffle(untried_moves)
+
+        return Mcts_node(move, parent, player_index, game_logic.zobrist_hash, untried_moves, game_logic.number_players)
+
+    def set_root(self, root: Mcts_node = None) -> None:
+        """ Starts the search from the current state of the game,
+        root is a node of a previous search with the same state to reuse its statistics """
+        if root is None:
+            root = self.new_node(None, None)
+        root.parent = None
+        root.move = None
+
+        self.root = root
+        self.root_scores = [board.score for board in self.game_logic.players_boards]
+
+    def rewards(self) -> List[float]:
+        gains = [
+            board.score - root_score
+            for board, root_score in zip(self.game_logic.players_boards, self.root_scores)
+        ]
+
+        rewards = []
+        for player_index, gain in enumerate(gains):
+            other_gains = gains[:player_index] + gains[player_index+1:]
+            margin = gain - max(other_gains) if other_gains else gain
+            rewards.append(0.5 + 0.5*math.tanh(margin / 10))
+
+        return rewards
+
+    def rollout(self) -> List[float]:
+        game_logic = self.game_logic
+        undo_stack = []
+
+        for round_num in range(self.rollout_rounds):
+            while not game_logic.is_round_over():
+                player_index = game_logic.side_to_move
+                move = rollout_move(game_logic, player_index, self.rng)
+                undo_stack.append((game_logic.undo_move, game_logic.apply_move(player_index, *move)))
+                self.nodes += 1
+
+            # finish_round gives the move to the first player of the next round
+            undo_stack.append((game_logic.set_side_to_move, game_logic.side_to_move))
+            undo_stack.append((game_logic.undo_wall_tiling, game_logic.finish_round()))
+
+            if game_logic.game_end or round_num == self.rollout_rounds - 1:
+                break
+
+            # Next round, the bag order of the search game is already a determinization
+            undo_stack.append((game_logic.undo_fill_factories, game_logic.apply_fill_factories()))
+
+        rewards = self.rewards()
+
+        for undo_method, undo_record in reversed(undo_stack):
+            undo_method(undo_record)
+
+        return rewards
+
+    def iteration(self) -> None:
+        game_logic = self.game_logic
+        node = self.root
+        undo_stack = []
+
+        # Selection
+        while not node.untried_moves and node.children:
+            node = node.select_child(self.exploration)
+            undo_stack.append(game_logic.apply_move(node.parent.player_index, *node.move))
+            self.nodes += 1
+
+        # Expansion
+        if node.untried_moves:
+            move = node.untried_moves.pop()
+            undo_stack.append(game_logic.apply_move(node.player_index, *move))
+            child = self.new_node(move, node)
+            node.children.append(child)
+            node = child
+            self.nodes += 1
+
+        rewards = self.rollout()
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            for i, reward in enumerate(rewards):
+                node.total_rewards[i] += reward
+            node = node.parent
+
+        for undo_record in reversed(undo_stack):
+            game_logic.undo_move(undo_record)
+
+        self.iterations += 1
+
+    def run(self, iterations: int = None, time_budget: float = None) -> None:
+        """ Runs iterations until one of the budgets is used, at least one iteration
+
+        Parameters
+        ----------
+        iterations : int, optional
+            Maximum number of iterations
+        time_budget : float, optional
+            Maximum number of seconds
+        """
+        start_time = time.perf_counter()
+        iterations_done = 0
+        while True:
+            self.iteration()
+            iterations_done += 1
+
+            if iterations is not None and iterations_done >= iterations:
+                break
+            if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+                break
+
+    def root_statistics(self) -> Dict[Tuple[int, int, int], Tuple[int, float]]:
+        """ (visits, total reward of the root player) of each move of the root """
+        player_index = self.root.player_index
+        return {
+            child.move: (child.visits, child.total_rewards[player_index])
+            for child in self.root.children
+        }
+
+
+def search_worker(
+        game_logic: Game_logic,
+        iterations: int,
+        time_budget: float,
+        exploration: float,
+        rollout_rounds: int,
+        seed: int,
+    ) -> Tuple[Dict, int, int]:
+    """ Independent search of one worker of the root parallelism
+
+    Returns
+    -------
+    Tuple[Dict, int, int]
+        Root statistics, number of nodes and number of iterations
+    """
+    search = Mcts_search(game_logic, exploration, rollout_rounds, np.random.default_rng(seed))
+    search.set_root()
+    search.run(iterations, time_budget)
+    return search.root_statistics(), search.nodes, search.iterations
+
+
+class Mcts_player(Player_model):
+    """ Player that chooses its moves with Monte Carlo Tree Search
+
+    The search runs on a copy of the game where the bag is shuffled
+    (determinization), the player must not know the order of the bag,
+    only the tiles that are in it and in the discard pile.
+
+    With workers > 1 each worker process searches its own tree from the
+    same root (root parallelism) and the visits of the moves of the root
+    are added. The tree is only reused between moves with one worker.
+    The worker processes are stopped by close, or when the player is
+    garbage collected.
+
+    Attributes
+    ----------
+    last_search_stats : dict
+        iterations, nodes, seconds and nodes_per_second of the last move
+    """
+    def __init__(
+            self,
+            Game_viewer: Game_viewer,
+            player_index: int,
+            iterations: int = 200,
+            time_budget: float = None,
+            exploration: float = 1.4,
+            rollout_rounds: int = 1,
+            workers: int = 1,
+            reuse_tree: bool = True,
+            seed: int = None,
+        ):
+        """
+        Parameters
+        ----------
+        Game_viewer : Game_viewer
+            View of the game
+        player_index : int
+            Index of the player
+        iterations : int, optional
+            Maximum number of iterations per move (per worker), by default 200,
+            None to only use the time budget
+        time_budget : float, optional
+            Maximum number of seconds per move, by default None
+        exploration : float, optional
+            UCT exploration constant, by default 1.4
+        rollout_rounds : int, optional
+            Number of round ends reached by each rollout, by default 1 (the current round)
+        workers : int, optional
+            Number of processes of the root parallelism, by default 1
+        reuse_tree : bool, optional
+            Keep the subtree of the state reached between moves, by default True
+        seed : int, optional
+            Seed of the search, by default the search uses the generator of the player
+
+        Raises
+        ------
+        ValueError
+            There must be at least one budget
+        """
+        super().__init__(Game_viewer, player_index)
+
+        if iterations is None and time_budget is None:
+            raise ValueError("The search needs an iteration or a time budget")
+
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.rollout_rounds = rollout_rounds
+        self.workers = workers
+        self.reuse_tree = reuse_tree
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+        self.previous_root = None
+        self.executor = None
+        self.__executor_finalizer = None
+        self.last_search_stats = {}
+
+    def determinized_game(self) -> Game_logic:
+        """ Copy of the game with its own random generator and the bag in a
+        random order (Game_logic.determinize), so the draws of the search
+        are not the ones of the real game """
+        game_logic = copy.deepcopy(self.game_viewer.game_logic)
+        game_logic.determinize(int(self.rng.integers(2**64, dtype=np.uint64)))
+        return game_logic
+
+    def player_move(self) -> Tuple[int, int, int]:
+        legal_moves = self.legal_moves()
+        if len(legal_moves) == 1:
+            self.previous_root = None
+            return legal_moves[0]
+
+        start_time = time.perf_counter()
+        game_logic = self.determinized_game()
+        game_logic.set_side_to_move(self.player_index)
+
+        if self.workers > 1:
+            statistics, nodes, iterations = self.__parallel_search(game_logic)
+        else:
+            statistics, nodes, iterations = self.__search(game_logic)
+
+        seconds = time.perf_counter() - start_time
+        self.last_search_stats = {
+            "iterations": iterations,
+            "nodes": nodes,
+            "seconds": seconds,
+            "nodes_per_second": nodes / seconds if seconds > 0 else 0.0,
+        }
+
+        # Most visited move, ties broken by the total reward
+        return max(statistics, key=lambda move: statistics[move])
+
+    def __search(self, game_logic: Game_logic) -> Tuple[Dict, int, int]:
+        search = Mcts_search(game_logic, self.exploration, self.rollout_rounds, self.rng)
+
+        root = None
+        if self.reuse_tree and self.previous_root is not None:
+            root = self.previous_root.find_state(game_logic.zobrist_hash, game_logic.number_players)
+            if root is not None and root.player_index != self.player_index:
+                root = None
+        search.set_root(root)
+        search.run(self.iterations, self.time_budget)
+
+        statistics = search.root_statistics()
+        if self.reuse_tree:
+            best_move = max(statistics, key=lambda move: statistics[move])
+            self.previous_root = next(child for child in search.root.children if child.move == best_move)
+
+        return statistics, search.nodes, search.iterations
+
+    def __parallel_search(self, game_logic: Game_logic) -> Tuple[Dict, int, int]:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            # The drivers do not call close, the pool is stopped with the player
+            self.__executor_finalizer = weakref.finalize(self, self.executor.shutdown)
+
+        futures = [
+            self.executor.submit(
+                search_worker,
+                game_logic,
+                self.iterations,
+                self.time_budget,
+                self.exploration,
+                self.rollout_rounds,
+                int(self.rng.integers(2**64, dtype=np.uint64)),
+            )
+            for _ in range(self.workers)
+        ]
+
+        statistics = {}
+        nodes = 0
+        iterations = 0
+        for future in futures:
+            worker_statistics, worker_nodes, worker_iterations = future.result()
+            nodes += worker_nodes
+            iterations += worker_iterations
+            for move, (visits, total_reward) in worker_statistics.items():
+                move_visits, move_reward = statistics.get(move, (0, 0.0))
+                statistics[move] = (move_visits + visits, move_reward + total_reward)
+
+        return statistics, nodes, iterations
+
+    def close(self) -> None:
+        """ Stops the worker processes """
+        if self.executor is not None:
+            self.__executor_finalizer()
+            self.executor = None
+            self.__executor_finalizer = None
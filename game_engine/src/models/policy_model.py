@@ -0,0 +1,92 @@
+import numpy as np
+from typing import Tuple
+from game_engine.src.game_logic import Game_viewer, Player_model
+from game_engine.src.inference_broker import Inference_broker
+from game_engine.src.observation_encoder import Observation_encoder
+
+
+def get_number_moves(factories_num: int) -> int:
+    """ Number of outputs of a policy, one per (factory or center, tile type, row or floor) """
+    return (factories_num + 1)*5*6
+
+
+def move_index(factory_index: int, tile_type: int, row_index: int) -> int:
+    """ Output of a policy for a move, the same order as Batch_game_logic.legal_moves_mask """
+    return ((factory_index + 1)*5 + tile_type - 1)*6 + (row_index if row_index != -1 else 5)
+
+
+class Policy_network():
+    """ Small fully connected network, the logits of every move from an observation
+
+    observation -> dense -> relu -> dense -> logits, with random weights
+    drawn from the seed until it is trained. forward works on batches of
+    observations, so it can be given to an Inference_broker.
+
+    Attributes
+    ----------
+    weights : list
+        (matrix, bias) of each layer, float32
+    """
+    def __init__(self, observation_size: int, factories_num: int, hidden_size: int = 64, seed: int = 0):
+        """
+        Parameters
+        ----------
+        observation_size : int
+            Size of the observations of Observation_encoder
+        factories_num : int
+            Number of factories of the games
+        hidden_size : int, optional
+            Size of the hidden layer, by default 64
+        seed : int, optional
+            Seed of the random weights, by default 0
+        """
+        rng = np.random.default_rng(seed)
+        sizes = [observation_size, hidden_size, get_number_moves(factories_num)]
+        self.weights = [
+            (
+                (rng.standard_normal((input_size, output_size))/np.sqrt(input_size)).astype(np.float32),
+                np.zeros(output_size, dtype=np.float32),
+            )
+            for input_size, output_size in zip(sizes[:-1], sizes[1:])
+        ]
+
+    def forward(self, observations: np.array) -> np.array:
+        """ Logits of a batch of observations, batch x number of moves """
+        hidden = observations
+        for layer, (matrix, bias) in enumerate(self.weights):
+            hidden = hidden @ matrix + bias
+            if layer < len(self.weights) - 1:
+                np.maximum(hidden, 0, out=hidden)
+        return hidden
+
+
+class Policy_player(Player_model):
+    """ Plays the legal move with the highest logit of a policy evaluated by an Inference_broker
+
+    The observations of every Policy_player using the same broker are evaluated
+    together. player_move waits for the batch in the current thread,
+    async_player_move suspends the task instead, so many games can wait
+    for their moves in the same event loop (see Async_game_driver).
+
+    Give it to run_simulation with functools.partial(Policy_player, broker=broker).
+    """
+    def __init__(self, game_viewer: Game_viewer, player_index: int, broker: Inference_broker):
+        super().__init__(game_viewer, player_index)
+        self.broker = broker
+        number_players = game_viewer.get_number_of_players()
+        self.encoder = Observation_encoder(number_players, len(game_viewer.get_factories()))
+
+    def observation(self) -> np.array:
+        return self.encoder.encode(self.game_viewer, self.player_index)
+
+    def best_move(self, logits: np.array) -> Tuple[int, int, int]:
+        """ Legal move with the highest logit """
+        moves = self.legal_moves()
+        moves_logits = logits[[move_index(*move) for move in moves]]
+        return moves[int(np.argmax(moves_logits))]
+
+    def player_move(self) -> Tuple[int, int, int]:
+        return self.best_move(self.broker.evaluate(self.observation()))
+
+    async def async_player_move(self) -> Tuple[int, int, int]:
+        return self.best_move(await self.broker.evaluate_async(self.observation()))
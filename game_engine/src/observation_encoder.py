@@ -0,0 +1,257 @@
+""" Fixed layout encoding of the state of a game for learned players
+
+The observation of a game with P players and F factories is a flat
+array, seen from the player that moves: the boards are ordered starting
+with that player and then the next ones in the order of play.
+
+================  ==========  ==================================================
+part              shape       value
+================  ==========  ==================================================
+walls             P x 5 x 5   1 where the box of the wall is filled
+pattern_lines     P x 5 x 5   [player, row, t-1] number of tiles of type t in the row
+floor_lines       P           number of tiles on the floor line
+scores            P           score, limited to 255 for uint8
+factories         F x 5       number of tiles of each type in each factory
+center            5           number of tiles of each type in the center
+bag               5           number of tiles of each type in the bag
+discarted         5           number of tiles of each type in the discard pile
+================  ==========  ==================================================
+
+The parts are stored one after the other in the order of the table,
+Observation_encoder.layout has the slice and shape of each one.
+"""
+import numpy as np
+from typing import List
+from .game_logic import Game_viewer, get_snapshot_layout
+from .batch_game_logic import Batch_game_logic
+
+TILE_TYPES = np.arange(1, 6)
+
+
+class Observation_encoder():
+    """ Writes the observation of one or many games in preallocated arrays
+
+    Attributes
+    ----------
+    number_players : int
+        Number of players of the games
+    factories_num : int
+        Number of factories of the games
+    dtype : np.dtype
+        np.float32 or np.uint8
+    layout : dict
+        Name of each part: (slice, shape), and "size" the total size
+    size : int
+        Size of one observation
+    """
+    def __init__(self, number_players: int, factories_num: int, dtype=np.float32):
+        """
+        Parameters
+        ----------
+        number_players : int
+            Number of players of the games
+        factories_num : int
+            Number of factories of the games
+        dtype : optional
+            np.float32 or np.uint8, by default np.float32
+
+        Raises
+        ------
+        ValueError
+            Unsupported dtype
+        """
+        dtype = np.dtype(dtype)
+        if dtype not in (np.dtype(np.float32), np.dtype(np.uint8)):
+            raise ValueError(f"The observations can be float32 or uint8, not {dtype}")
+
+        self.number_players = number_players
+        self.factories_num = factories_num
+        self.dtype = dtype
+
+        shapes = [
+            ("walls", (number_players, 5, 5)),
+            ("pattern_lines", (number_players, 5, 5)),
+            ("floor_lines", (number_players,)),
+            ("scores", (number_players,)),
+            ("factories", (factories_num, 5)),
+            ("center", (5,)),
+            ("bag", (5,)),
+            ("discarted", (5,)),
+        ]
+        self.layout = {}
+        offset = 0
+        for name, shape in shapes:
+            size = int(np.prod(shape))
+            self.layout[name] = (slice(offset, offset + size), shape)
+            offset += size
+        self.layout["size"] = offset
+        self.size = offset
+
+        self.__snapshot_layout = get_snapshot_layout(number_players, factories_num)
+        self.__snapshot = np.empty(self.__snapshot_layout["size"], dtype=np.int16)
+
+    def new_buffer(self, batch_size: int = None) -> np.array:
+        """ Zeroed array for one observation, or batch_size x size for a batch """
+        shape = (self.size,) if batch_size is None else (batch_size, self.size)
+        return np.zeros(shape, dtype=self.dtype)
+
+    def __check_buffer(self, out: np.array, shape: tuple) -> None:
+        if out.dtype != self.dtype or out.shape != shape:
+            raise ValueError(f"The buffer must be {self.dtype} with shape {shape}, not {out.dtype} {out.shape}")
+
+    def __parts(self, out: np.array) -> dict:
+        """ Views of out for each part, out is batch x size """
+        parts = {}
+        for name, part_layout in self.layout.items():
+            if name == "size":
+                continue
+            part_slice, shape = part_layout
+            parts[name] = out[:, part_slice].reshape((out.shape[0],) + shape)
+        return parts
+
+    def __write(
+            self,
+            out: np.array,
+            walls: np.array,
+            pattern_lines_colour: np.array,
+            pattern_lines_count: np.array,
+            floor_lines: np.array,
+            scores: np.array,
+            factories: np.array,
+            center: np.array,
+            bag: np.array,
+            discarted: np.array,
+        ) -> None:
+        """ Writes a batch of observations, the boards already in the order of the player that moves """
+        parts = self.__parts(out)
+        parts["walls"][:] = walls != 0
+        parts["pattern_lines"][:] = (pattern_lines_colour[..., None] == TILE_TYPES) * pattern_lines_count[..., None]
+        parts["floor_lines"][:] = np.count_nonzero(floor_lines, axis=-1)
+        if self.dtype == np.uint8:
+            scores = np.minimum(scores, 255)
+        parts["scores"][:] = scores
+        parts["factories"][:] = factories
+        parts["center"][:] = center
+        parts["bag"][:] = bag
+        parts["discarted"][:] = discarted
+
+    def encode(self, game_viewer: Game_viewer, player_index: int = None, out: np.array = None) -> np.array:
+        """ Observation of one game
+
+        Parameters
+        ----------
+        game_viewer : Game_viewer
+            View of the game
+        player_index : int, optional
+            Player whose point of view is encoded, by default the side to move
+        out : np.array, optional
+            Array of size self.size and type self.dtype to write the observation,
+            by default a new array
+
+        Returns
+        -------
+        np.array
+            The observation
+        """
+        if out is None:
+            out = self.new_buffer()
+        self.__check_buffer(out, (self.size,))
+
+        snapshot = game_viewer.snapshot(self.__snapshot)
+
+        def part(name):
+            part_slice, shape = self.__snapshot_layout[name]
+            return snapshot[part_slice].reshape(shape)
+
+        if player_index is None:
+            player_index = int(part("side_to_move")[0])
+        order = (np.arange(self.number_players) + player_index) % self.number_players
+
+        pattern_lines = part("pattern_lines")[order]
+        self.__write(
+            out[None],
+            walls=part("walls")[order][None],
+            pattern_lines_colour=pattern_lines[None, ..., 0],
+            pattern_lines_count=pattern_lines[None, ..., 1],
+            floor_lines=part("floor_lines")[order][None],
+            scores=part("scores")[order][None],
+            factories=part("factories")[None],
+            center=part("center")[None],
+            bag=part("bag")[None],
+            discarted=part("discarted")[None],
+        )
+        return out
+
+    def encode_batch(self, game_viewers: List[Game_viewer], player_indices: List[int] = None, out: np.array = None) -> np.array:
+        """ Observations of many games, one row per game
+
+        Parameters
+        ----------
+        game_viewers : List[Game_viewer]
+            Views of the games
+        player_indices : List[int], optional
+            Point of view of each game, by default the side to move of each game
+        out : np.array, optional
+            Array of len(game_viewers) x self.size, by default a new array
+
+        Returns
+        -------
+        np.array
+            The observations
+        """
+        if out is None:
+            out = self.new_buffer(len(game_viewers))
+        self.__check_buffer(out, (len(game_viewers), self.size))
+
+        for i, game_viewer in enumerate(game_viewers):
+            player_index = None if player_indices is None else player_indices[i]
+            self.encode(game_viewer, player_index, out[i])
+
+        return out
+
+    def encode_batch_game_logic(self, batch: Batch_game_logic, out: np.array = None) -> np.array:
+        """ Observations of every game of a Batch_game_logic from the point of view
+        of its current player, computed for all the games at once
+
+        Parameters
+        ----------
+        batch : Batch_game_logic
+            Games to encode
+        out : np.array, optional
+            Array of batch.number_games x self.size, by default a new array
+
+        Returns
+        -------
+        np.array
+            The observations
+        """
+        number_games = batch.number_games
+        if out is None:
+            out = self.new_buffer(number_games)
+        self.__check_buffer(out, (number_games, self.size))
+
+        games = batch.games_index[:, None]
+        order = (np.arange(self.number_players) + batch.current_player[:, None]) % self.number_players
+
+        factories = np.count_nonzero(batch.factories[..., None] == TILE_TYPES, axis=2)
+
+        positions = np.arange(batch.bag_tiles.shape[1])
+        in_bag = (positions >= batch.bag_begin[:, None]) & (positions < batch.bag_end[:, None])
+        bag = np.count_nonzero((batch.bag_tiles[..., None] == TILE_TYPES) & in_bag[..., None], axis=1)
+
+        in_discarted = positions < batch.discarted_len[:, None]
+        discarted = np.count_nonzero((batch.discarted_tiles[..., None] == TILE_TYPES) & in_discarted[..., None], axis=1)
+
+        self.__write(
+            out,
+            walls=batch.walls[games, order],
+            pattern_lines_colour=batch.pattern_lines_colour[games, order],
+            pattern_lines_count=batch.pattern_lines_count[games, order],
+            floor_lines=batch.floor_lines[games, order],
+            scores=batch.scores[games, order],
+            factories=factories,
+            center=batch.center_tiles,
+            bag=bag,
+            discarted=discarted,
+        )
+        return out
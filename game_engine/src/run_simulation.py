@@ -1,10 +1,16 @@
+import asyncio
+import time
+import numpy as np
 from enum import Enum, auto
 from itertools import cycle
 from .game_logic import Game_logic
 from .game_logic import Player_model
 from .game_logic import Game_viewer
+from .game_logic import fallback_seed_sequence
 from typing import List
 from .models.dummy_model import Dummy_player
+from .trajectory_recorder import Trajectory_recorder
+from .game_profiler import Game_profiler
 from icecream import ic
 
 class Game_states(Enum):
@@ -33,8 +39,23 @@ class Player_cycle:
             raise ValueError(f"{value} is not in the cycle items.")
         
 class Game_state_machine():
-    def __init__(self, game_logic: Game_logic, players_models: List[Player_model]):
+    def __init__(self, game_logic: Game_logic, players_models: List[Player_model], recorder: Trajectory_recorder = None, profiler: Game_profiler = None):
+        """
+        Parameters
+        ----------
+        game_logic : Game_logic
+            Game to play
+        players_models : List[Player_model]
+            One model for each player
+        recorder : Trajectory_recorder, optional
+            Records the seed, the moves and the scores of each round of the game,
+            by default None
+        profiler : Game_profiler, optional
+            Records the time spent in each state and the rejected move attempts,
+            by default None
+        """
         self.state = Game_states.INIT_GAME
+        self.profiler = profiler
 
         self.game_logic = game_logic
         self.game_logic.players_boards[0].init_player = True
@@ -60,6 +81,20 @@ class Game_state_machine():
         }
         self.state_methods_dict[self.state]() # Execute first state
 
+        self.recorder = recorder
+        self.last_move = None
+        # Seconds waited for the last move and whether its model ran out of time, set by async_player_move
+        self.last_move_latency = 0.0
+        self.last_move_timed_out = False
+        # Random moves of the models that run out of time, created at the first timeout
+        self.fallback_rng = None
+        self.ply = 0
+        self.round_num = 0
+        if recorder is not None:
+            self.game_id = recorder.start_game(game_logic.seed, game_logic.number_players)
+        if profiler is not None:
+            profiler.start_game()
+
     def init_game(self):
         pass
 
@@ -68,15 +103,73 @@ class Game_state_machine():
 
     def player_move(self):
         player_model = self.players_models[self.current_player_index]
+        if self.profiler is not None:
+            self.__profiled_player_move(player_model)
+            return
 
-        player_move_tuple = player_model.player_move()
+        self.__apply_player_move(player_model.player_move())
+
+    async def async_player_move(self, move_timeout: float = None):
+        """ player_move that awaits async_player_move for the models that have one
+
+        Parameters
+        ----------
+        move_timeout : float, optional
+            Seconds given to an async model for its move, after them the
+            move is a random move of Dummy_player, by default no limit.
+            The models without async_player_move cannot be interrupted
+        """
+        player_model = self.players_models[self.current_player_index]
+        self.last_move_timed_out = False
+        if not hasattr(player_model, "async_player_move"):
+            start_time = time.perf_counter()
+            self.player_move()
+            self.last_move_latency = time.perf_counter() - start_time
+            return
+
+        validations = getattr(player_model, "validations", 0)
+        start_time = time.perf_counter()
+        try:
+            player_move_tuple = await asyncio.wait_for(player_model.async_player_move(), move_timeout)
+        except asyncio.TimeoutError:
+            self.last_move_timed_out = True
+            player_move_tuple = self.__fallback_move()
+        think_end_time = time.perf_counter()
+        self.last_move_latency = think_end_time - start_time
+
+        self.__apply_player_move(player_move_tuple)
+        if self.profiler is not None:
+            self.__record_move(player_model, validations, start_time, think_end_time)
+
+    def __fallback_move(self) -> tuple:
+        """ Random move of Dummy_player, drawn from the stream of the game kept for
+        the timeouts, the generator of the model is not used """
+        if self.fallback_rng is None:
+            self.fallback_rng = np.random.default_rng(fallback_seed_sequence(self.game_logic.seed))
+        moves = self.game_logic.floor_restricted_moves(self.current_player_index)
+        return moves[self.fallback_rng.integers(len(moves))]
+
+    def __apply_player_move(self, player_move_tuple: tuple) -> None:
         factory_index, tile_type, row_index = player_move_tuple
+        self.last_move = player_move_tuple
 
-        player_board = self.game_logic.players_boards[self.current_player_index]
-        
-        tiles = self.game_logic.get_tiles_from_factory(factory_index, tile_type)
+        self.game_logic.apply_move(self.current_player_index, factory_index, tile_type, row_index)
+
+    def __profiled_player_move(self, player_model: Player_model):
+        """ player_move with the think time of the model, the apply time and the rejected attempts """
+        validations = getattr(player_model, "validations", 0)
+        start_time = time.perf_counter()
+        player_move_tuple = player_model.player_move()
+        think_end_time = time.perf_counter()
+        self.__apply_player_move(player_move_tuple)
+        self.__record_move(player_model, validations, start_time, think_end_time)
 
-        player_board.laying_tiles(row_index, tiles)
+    def __record_move(self, player_model: Player_model, validations: int, start_time: float, think_end_time: float) -> None:
+        apply_time = time.perf_counter() - think_end_time
+
+        # Every validation but the one of the move played is a rejected attempt
+        rejected_attempts = max(getattr(player_model, "validations", 0) - validations - 1, 0)
+        self.profiler.record_move(type(player_model).__name__, think_end_time - start_time, apply_time, rejected_attempts)
 
     def round_end(self):
         for player in self.game_logic.players_boards:
@@ -91,9 +184,23 @@ class Game_state_machine():
         pass
 
     def next(self):
-        round_end = all(not sublist for sublist in self.game_logic.factories) and len(self.game_logic.center_tiles) == 0
-        result = list((not sublist for sublist in self.game_logic.factories))
-  
+        next_state = self.__get_next_state()
+        self.__execute(next_state)
+        return self.__set_state(next_state)
+
+    async def async_next(self, move_timeout: float = None):
+        """ next, but the task is suspended while an async model thinks its move,
+        so other games can go on in the same event loop, see async_player_move """
+        next_state = self.__get_next_state()
+        if next_state == Game_states.PLAYER_MOVE:
+            await self.async_player_move(move_timeout)
+        else:
+            self.__execute(next_state)
+        return self.__set_state(next_state)
+
+    def __get_next_state(self) -> Game_states:
+        round_end = self.game_logic.is_round_over()
+
         next_state = None
         if self.state == Game_states.INIT_GAME:
             next_state = Game_states.FILL_FACTORY
@@ -116,24 +223,43 @@ class Game_state_machine():
         elif self.state == Game_states.GAME_END:
             next_state = Game_states.GAME_END
 
+        return next_state
+
+    def __execute(self, next_state: Game_states) -> None:
         exec_method = self.state_methods_dict[next_state]
-        exec_method()
+        if self.profiler is None or next_state == Game_states.PLAYER_MOVE:
+            exec_method()
+        else:
+            start_time = time.perf_counter()
+            exec_method()
+            self.profiler.record_phase(exec_method.__name__, time.perf_counter() - start_time)
+
+    def __set_state(self, next_state: Game_states) -> Game_states:
+        if self.recorder is not None:
+            self.__record(next_state)
 
         self.state = next_state
         return self.state
     
+    def __record(self, next_state: Game_states) -> None:
+        if next_state == Game_states.PLAYER_MOVE:
+            self.recorder.record_move(self.game_id, self.ply, self.current_player_index, self.last_move)
+            self.ply += 1
+        elif next_state == Game_states.WALL_TILING:
+            for player_index, board in enumerate(self.game_logic.players_boards):
+                self.recorder.record_round_score(self.game_id, self.round_num, player_index, int(board.score))
+            self.round_num += 1
+        elif next_state == Game_states.GAME_END and self.state != Game_states.GAME_END:
+            self.recorder.end_game(self.game_id, self.ply)
+
     def __next_player(self):
         self.current_player_index = self.player_cycle.next()
 
     def __set_player_first_move(self):
-        start_player_index = 0
-        for i, player in enumerate(self.game_logic.players_boards):
-            if player.init_player:
-                start_player_index = i
-                break
-
+        start_player_index = self.game_logic.first_player()
         self.current_player_index = start_player_index
         self.player_cycle.set(start_player_index)
+        self.game_logic.set_side_to_move(start_player_index)
 
 
     def print_state(self):
@@ -143,19 +269,92 @@ class Game_state_machine():
             print(f"{self.state}")
 
 
-def run_simulation(players_models: List, seed: int = 1):
+def play_move(game_logic: Game_logic, players: List[Player_model]) -> None:
+    """ Plays the next move of a game without the state machine, in the same
+    order: the factories are filled at the start of a round, and the round
+    is finished (Game_logic.finish_round) after its last move
+
+    Parameters
+    ----------
+    game_logic : Game_logic
+        Game that is not over
+    players : List[Player_model]
+        One model for each player
+    """
+    if game_logic.is_round_over():
+        game_logic.fill_factories()
+
+    player_index = game_logic.side_to_move
+    game_logic.apply_move(player_index, *players[player_index].player_move())
+
+    if game_logic.is_round_over():
+        game_logic.finish_round()
+
+
+def run_simulation(players_models: List, seed: int = 1, profiler: Game_profiler = None, game_logic_class: type = Game_logic) -> List[int]:
+    """ Plays a full game without GUI
+
+    Parameters
+    ----------
+    players_models : List
+        Player_model classes, one for each player in the order of the seats
+    seed : int, optional
+        Seed of the game, by default 1
+    profiler : Game_profiler, optional
+        Records the time spent in each phase of the game, by default None
+    game_logic_class : type, optional
+        Game_logic or Count_game_logic, by default Game_logic
+
+    Returns
+    -------
+    List[int]
+        Final score of each player
+    """
     number_players = len(players_models)
 
-    game_logic = Game_logic(number_players=number_players, seed=seed)
+    game_logic = game_logic_class(number_players=number_players, seed=seed)
     game_view = Game_viewer(game_logic)
 
     players = []
-    for i in range(players_models):
-        players.appennd(
+    for i in range(number_players):
+        players.append(
             players_models[i](game_view, i)
         )
 
-    game_state = Game_state_machine(game_logic, players)
+    game_state = Game_state_machine(game_logic, players, profiler=profiler)
 
     while game_state.state != Game_states.GAME_END:
-        game_state.next()
\ No newline at end of file
+        game_state.next()
+
+    return [int(player.score) for player in game_logic.players_boards]
+
+
+async def run_game_async(game_state: Game_state_machine, move_timeout: float = None, metrics=None) -> List[int]:
+    """ Plays a game until its end, suspended while its async models think,
+    the game loop of Async_game_driver
+
+    Parameters
+    ----------
+    game_state : Game_state_machine
+        Game to play
+    move_timeout : float, optional
+        Seconds given to an async model for a move, see Game_state_machine.async_player_move,
+        by default no limit
+    metrics : Driver_metrics, optional
+        Records the latency of each move and the timeouts, by default None
+
+    Returns
+    -------
+    List[int]
+        Final score of each player
+    """
+    while game_state.state != Game_states.GAME_END:
+        state = await game_state.async_next(move_timeout)
+        if state == Game_states.PLAYER_MOVE:
+            if metrics is not None:
+                metrics.record_move(game_state.last_move_latency, game_state.last_move_timed_out)
+        elif state == Game_states.FILL_FACTORY:
+            # Lets the other games go on, even when the models never await
+            await asyncio.sleep(0)
+
+    return [int(player.score) for player in game_state.game_logic.players_boards]
\ No newline at end of file
@@ -0,0 +1,381 @@
+""" Many games in one block of shared memory, stepped in place by worker processes
+
+Shared_game_arena keeps number_games Compact_game_state one after another in
+a multiprocessing.shared_memory block, with the number of moves played of
+each game. A worker attaches to the block by its name, loads a game into a
+Count_game_logic, plays some moves and writes the game back into its slot,
+so no game is pickled between the processes: a task is the name of the
+arena and a list of game indices. The coordinator reads the scores, the end
+of the games or any whole state directly from the block.
+
+Each game is stepped by one worker at a time. The coordinator can read a
+game while a worker writes it, the values it gets are then from before or
+after the write, or a mix of both, so it should read the states between
+two steps, as Arena_simulation does.
+"""
+from __future__ import annotations
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import List
+from .compact_state import Compact_game_state, get_compact_layout
+from .game_logic import Count_game_logic, Game_viewer
+from .run_simulation import play_move
+
+# number_players, factories_num, number_games, slot_size
+ARENA_HEADER = np.dtype([
+    ("number_players", np.uint32),
+    ("factories_num", np.uint32),
+    ("number_games", np.uint32),
+    ("slot_size", np.uint32),
+])
+SLOT_ALIGNMENT = 8
+
+
+class Shared_game_arena():
+    """ Fixed layout of many game states in a block of shared memory
+
+    The block has the header (number of players, number of factories,
+    number of games and size of a slot, uint32 each), the number of moves
+    played of each game (uint32) and then one slot per game with its
+    Compact_game_state, aligned on 8 bytes.
+
+    The arena that creates the block owns it and unlinks it in close, the
+    arenas attached to it only close their mapping. The states returned by
+    state are views of the block, they must be deleted before close.
+
+    Attributes
+    ----------
+    name : str
+        Name of the shared memory block, used by attach
+    number_players : int
+        Number of players of every game
+    factories_num : int
+        Number of factories of every game
+    number_games : int
+        Number of slots
+    plies : np.array
+        Number of moves played of each game, a view of the block
+    scores : np.array
+        number_games x number_players scores, a view of the block
+    game_end : np.array
+        1 for the games that are over, a view of the block
+    """
+    def __init__(self, number_players: int, number_games: int, name: str = None):
+        """ Creates a new block of shared memory with empty states
+
+        Parameters
+        ----------
+        number_players : int
+            Number of players of every game
+        number_games : int
+            Number of games of the arena
+        name : str, optional
+            Name of the block, by default a random name
+        """
+        if number_games < 1:
+            raise ValueError("The arena should have at least one game")
+
+        factories_num = Count_game_logic(number_players=number_players).factories_num
+        state_size = get_compact_layout(number_players, factories_num)["size"]
+        slot_size = -(-state_size // SLOT_ALIGNMENT)*SLOT_ALIGNMENT
+        size = slots_offset(number_games) + number_games*slot_size
+
+        self.shared_memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.owner = True
+        header = np.ndarray((1,), dtype=ARENA_HEADER, buffer=self.shared_memory.buf)
+        header[0] = (number_players, factories_num, number_games, slot_size)
+        del header
+
+        self.__map()
+        # Compact_game_state writes the header of each slot
+        for game_index in range(number_games):
+            self.state(game_index)
+
+    @classmethod
+    def attach(cls, name: str) -> Shared_game_arena:
+        """ Arena of a block created by another Shared_game_arena, usually in another process """
+        arena = cls.__new__(cls)
+        arena.shared_memory = shared_memory.SharedMemory(name=name)
+        arena.owner = False
+        arena.__map()
+        return arena
+
+    def __map(self) -> None:
+        """ Reads the header and makes the views of the block """
+        buffer = self.shared_memory.buf
+        header = np.ndarray((1,), dtype=ARENA_HEADER, buffer=buffer)[0]
+        self.number_players = int(header["number_players"])
+        self.factories_num = int(header["factories_num"])
+        self.number_games = int(header["number_games"])
+        self.slot_size = int(header["slot_size"])
+        del header
+
+        self.state_size = get_compact_layout(self.number_players, self.factories_num)["size"]
+        self.slots_offset = slots_offset(self.number_games)
+
+        self.plies = np.ndarray((self.number_games,), dtype=np.uint32, buffer=buffer, offset=ARENA_HEADER.itemsize)
+
+        # The scores and the end of the game of every slot, seen through the strides
+        layout = get_compact_layout(self.number_players, self.factories_num)
+        self.scores = np.ndarray(
+            (self.number_games, self.number_players),
+            dtype=np.int16,
+            buffer=buffer,
+            offset=self.slots_offset + layout["scores"][0].start,
+            strides=(self.slot_size, np.dtype(np.int16).itemsize),
+        )
+        self.game_end = np.ndarray(
+            (self.number_games,),
+            dtype=np.uint8,
+            buffer=buffer,
+            offset=self.slots_offset + layout["game_end"][0].start,
+            strides=(self.slot_size,),
+        )
+
+    @property
+    def name(self) -> str:
+        return self.shared_memory.name
+
+    def __len__(self) -> int:
+        return self.number_games
+
+    def __enter__(self) -> Shared_game_arena:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """ Releases the views and the mapping of the block, the owner also unlinks it """
+        self.plies = self.scores = self.game_end = None
+        self.shared_memory.close()
+        if self.owner:
+            self.shared_memory.unlink()
+            self.owner = False
+
+    def state(self, game_index: int) -> Compact_game_state:
+        """ State of a game, a view of its slot: the changes are written in the block """
+        if not 0 <= game_index < self.number_games:
+            raise IndexError(f"There is no game {game_index} in an arena of {self.number_games} games")
+        start = self.slots_offset + game_index*self.slot_size
+        buffer = self.shared_memory.buf[start:start + self.state_size]
+        return Compact_game_state(self.number_players, self.factories_num, buffer=buffer)
+
+    def snapshot(self, game_index: int) -> bytes:
+        """ Copy of the state of a game """
+        start = self.slots_offset + game_index*self.slot_size
+        return bytes(self.shared_memory.buf[start:start + self.state_size])
+
+    def reset(self, game_index: int, seed: int) -> None:
+        """ Starts a new game in a slot, the first player is the player 0 """
+        game_logic = Count_game_logic(number_players=self.number_players, seed=seed)
+        game_logic.players_boards[0].init_player = True
+        self.store(game_index, game_logic, 0)
+
+    def load(self, game_index: int, board_backend: str = "numpy") -> Count_game_logic:
+        """ New Count_game_logic in the state of a game """
+        state = self.state(game_index)
+        game_logic = state.to_game_logic(board_backend)
+        del state
+        return game_logic
+
+    def store(self, game_index: int, game_logic: Count_game_logic, ply: int) -> None:
+        """ Writes a game and its number of moves played in a slot """
+        state = self.state(game_index)
+        state.capture(game_logic)
+        del state
+        self.plies[game_index] = ply
+
+
+def slots_offset(number_games: int) -> int:
+    """ Position of the first slot in the block of a Shared_game_arena """
+    size = ARENA_HEADER.itemsize + number_games*np.dtype(np.uint32).itemsize
+    return -(-size // SLOT_ALIGNMENT)*SLOT_ALIGNMENT
+
+
+def step_arena_games(arena_name: str, players_models: List, game_indices: List[int], number_moves: int = None) -> int:
+    """ Plays moves of some games of an arena, in place, usually in a worker process
+
+    The players are created again for each step, their random generators are
+    seeded from the seed of the game and its number of moves played, so
+    the games do not depend on which worker steps them.
+
+    Parameters
+    ----------
+    arena_name : str
+        Name of the Shared_game_arena
+    players_models : List
+        Player_model classes, one for each player, they must be importable
+        from the worker processes (defined at module level)
+    game_indices : List[int]
+        Games to step
+    number_moves : int, optional
+        Maximum number of moves played in each game, by default until the end of the game
+
+    Returns
+    -------
+    int
+        Number of moves played
+    """
+    arena = Shared_game_arena.attach(arena_name)
+    total_moves = 0
+    try:
+        for game_index in game_indices:
+            if arena.game_end[game_index]:
+                continue
+
+            game_logic = arena.load(game_index)
+            ply = int(arena.plies[game_index])
+            game_view = Game_viewer(game_logic)
+            players = []
+            for player_index, player_model in enumerate(players_models):
+                player = player_model(game_view, player_index)
+                # The child ply of the seed sequence of the player
+                player.rng = np.random.default_rng(np.random.SeedSequence(game_logic.seed, spawn_key=(player_index + 1, ply)))
+                players.append(player)
+
+            moves = 0
+            while not game_logic.game_end and (number_moves is None or moves < number_moves):
+                play_move(game_logic, players)
+                moves += 1
+
+            arena.store(game_index, game_logic, ply + moves)
+            total_moves += moves
+    finally:
+        arena.close()
+
+    return total_moves
+
+
+class Arena_simulation():
+    """ Plays many games in a Shared_game_arena with a pool of worker processes
+
+    Each step plays number_moves moves of every game that is not over,
+    the games are split in chunks of chunk_size games, one task per chunk.
+    Between two steps the coordinator can read the arena without any copy.
+
+    Attributes
+    ----------
+    arena : Shared_game_arena
+        Games of the simulation, created by start
+    moves_played : int
+        Number of moves played since start
+    elapsed_time : float
+        Seconds spent in the steps
+    """
+    def __init__(
+            self,
+            players_models: List,
+            number_games: int,
+            seed: int = 1,
+            max_workers: int = None,
+            number_moves: int = None,
+            chunk_size: int = 16,
+        ):
+        """
+        Parameters
+        ----------
+        players_models : List
+            Player_model classes, one for each player, they must be importable
+            from the worker processes (defined at module level)
+        number_games : int
+            Number of games, the seed of each game is seed + game_index
+        seed : int, optional
+            Seed of the first game, by default 1
+        max_workers : int, optional
+            Number of worker processes, by default the number of cores,
+            with 1 the games are stepped in the current process
+        number_moves : int, optional
+            Moves played by each game in a step, by default the whole game
+        chunk_size : int, optional
+            Number of games of a task, by default 16
+        """
+        if len(players_models) < 1 or len(players_models) > 4:
+            raise ValueError("The number of players should be between 1 and 4")
+        if chunk_size < 1:
+            raise ValueError("The chunk size should be at least 1")
+
+        self.players_models = list(players_models)
+        self.number_games = number_games
+        self.seed = seed
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.number_moves = number_moves
+        self.chunk_size = chunk_size
+
+        self.arena = None
+        self.executor = None
+        self.moves_played = 0
+        self.elapsed_time = 0.0
+
+    def __enter__(self) -> Arena_simulation:
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def moves_per_second(self) -> float:
+        if self.elapsed_time == 0:
+            return 0.0
+        return self.moves_played / self.elapsed_time
+
+    def start(self) -> None:
+        """ Creates the arena with every game at its start and the worker processes """
+        self.arena = Shared_game_arena(len(self.players_models), self.number_games)
+        for game_index in range(self.number_games):
+            self.arena.reset(game_index, self.seed + game_index)
+        if self.max_workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.moves_played = 0
+        self.elapsed_time = 0.0
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.arena is not None:
+            self.arena.close()
+            self.arena = None
+
+    def step(self) -> int:
+        """ Plays number_moves moves of every game that is not over
+
+        Returns
+        -------
+        int
+            Number of games that are not over
+        """
+        game_indices = np.flatnonzero(self.arena.game_end == 0).tolist()
+        chunks = [game_indices[i:i + self.chunk_size] for i in range(0, len(game_indices), self.chunk_size)]
+        start_time = time.perf_counter()
+
+        if self.executor is None:
+            for chunk in chunks:
+                self.moves_played += step_arena_games(self.arena.name, self.players_models, chunk, self.number_moves)
+        else:
+            futures = [
+                self.executor.submit(step_arena_games, self.arena.name, self.players_models, chunk, self.number_moves)
+                for chunk in chunks
+            ]
+            wait(futures)
+            for future in futures:
+                self.moves_played += future.result()
+
+        self.elapsed_time += time.perf_counter() - start_time
+        return int(np.count_nonzero(self.arena.game_end == 0))
+
+    def run(self) -> List[List[int]]:
+        """ Steps the games until they are all over
+
+        Returns
+        -------
+        List[List[int]]
+            Final scores of each game
+        """
+        while self.step():
+            pass
+        return self.arena.scores.tolist()
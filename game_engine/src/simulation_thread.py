@@ -0,0 +1,219 @@
+""" Plays a game in a background thread and publishes snapshots of its state
+
+The GUI and the simulation run at their own speed: Simulation_thread advances
+the Game_state_machine one step at a time at the chosen ply rate, and after
+each step puts a Game_snapshot in a queue. A step is one player move (a ply),
+or the end of a round with the wall tiling and the refill of the factories.
+A Game_snapshot is built from Game_viewer.snapshot, a read only int16 array,
+so it can be drawn from another thread while the game goes on.
+"""
+from __future__ import annotations
+import queue
+import threading
+import time
+import numpy as np
+from typing import List
+from .game_logic import Game_viewer, get_snapshot_layout
+from .run_simulation import Game_state_machine, Game_states
+
+TILE_TYPES = np.arange(1, 6)
+
+
+class Game_snapshot():
+    """ Immutable state of a game after a step, with the getters of Game_viewer used to draw it
+
+    The factories and the center only keep the number of tiles of each type,
+    so their tiles are given sorted by type.
+
+    Attributes
+    ----------
+    ply : int
+        Number of moves made
+    state : Game_states
+        State of the game state machine
+    array : np.array
+        Read only snapshot, the layout is described in get_snapshot_layout
+    """
+    def __init__(self, array: np.array, number_players: int, factories_num: int, ply: int, state: Game_states):
+        array.setflags(write=False)
+        self.array = array
+        self.number_players = number_players
+        self.factories_num = factories_num
+        self.ply = ply
+        self.state = state
+        self.__layout = get_snapshot_layout(number_players, factories_num)
+
+    def part(self, name: str) -> np.array:
+        part_slice, shape = self.__layout[name]
+        return self.array[part_slice].reshape(shape)
+
+    @property
+    def game_end(self) -> bool:
+        return bool(self.part("game_end")[0])
+
+    def get_number_of_players(self) -> int:
+        return self.number_players
+
+    def get_factories(self) -> tuple:
+        return tuple(tuple(np.repeat(TILE_TYPES, counts).tolist()) for counts in self.part("factories"))
+
+    def get_center_tiles(self) -> tuple:
+        return tuple(np.repeat(TILE_TYPES, self.part("center")).tolist())
+
+    def get_player_wall(self, player_index: int) -> np.array:
+        return self.part("walls")[player_index]
+
+    def get_player_pattern_lines(self, player_index: int) -> List[np.array]:
+        pattern_lines = []
+        for row, (tile_type, count) in enumerate(self.part("pattern_lines")[player_index]):
+            actual_row = np.zeros(row + 1, dtype=int)
+            actual_row[:count] = tile_type
+            pattern_lines.append(actual_row)
+        return pattern_lines
+
+    def get_player_floor_lines(self, player_index: int) -> np.array:
+        return self.part("floor_lines")[player_index]
+
+    def get_scores(self) -> List[int]:
+        return self.part("scores").tolist()
+
+
+class Simulation_thread(threading.Thread):
+    """ Plays a game in a daemon thread, one step at a time
+
+    The snapshots are put in a queue of max_snapshots, when the queue is full
+    the oldest snapshot is dropped, so a slow reader never slows down the game.
+
+    Attributes
+    ----------
+    game_state : Game_state_machine
+        Game to play, it must not be used by other threads while the thread runs
+    snapshots : queue.Queue
+        Game_snapshot published after each step, the first one is the state before the first move
+    ply_rate : float
+        Steps per second, None to play as fast as possible
+    paused : bool
+        The game does not advance, only with step
+    ply : int
+        Number of moves made
+    """
+    def __init__(self, game_state: Game_state_machine, ply_rate: float = 1.0, paused: bool = False, max_snapshots: int = 64):
+        """
+        Parameters
+        ----------
+        game_state : Game_state_machine
+            Game to play
+        ply_rate : float, optional
+            Steps per second, None to play as fast as possible, by default 1.0
+        paused : bool, optional
+            Start paused, by default False
+        max_snapshots : int, optional
+            Size of the queue of snapshots, by default 64
+        """
+        super().__init__(daemon=True)
+        self.game_state = game_state
+        self.ply_rate = ply_rate
+        self.paused = paused
+        self.ply = 0
+        self.snapshots = queue.Queue(maxsize=max_snapshots)
+
+        self.__viewer = Game_viewer(game_state.game_logic)
+        self.__condition = threading.Condition()
+        self.__pending_steps = 0
+        self.__stopped = False
+
+    def play(self) -> None:
+        with self.__condition:
+            self.paused = False
+            self.__condition.notify_all()
+
+    def pause(self) -> None:
+        with self.__condition:
+            self.paused = True
+            self.__condition.notify_all()
+
+    def step(self, steps: int = 1) -> None:
+        """ Advances steps while paused """
+        with self.__condition:
+            self.__pending_steps += steps
+            self.__condition.notify_all()
+
+    def set_ply_rate(self, ply_rate: float) -> None:
+        """ Steps per second, None to fast-forward as fast as possible """
+        with self.__condition:
+            self.ply_rate = ply_rate
+            self.__condition.notify_all()
+
+    def stop(self) -> None:
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+
+    def latest_snapshot(self) -> Game_snapshot:
+        """ Empties the queue and returns the newest snapshot, None if there is no new snapshot """
+        snapshot = None
+        while True:
+            try:
+                snapshot = self.snapshots.get_nowait()
+            except queue.Empty:
+                return snapshot
+
+    def __publish(self) -> None:
+        game_logic = self.game_state.game_logic
+        snapshot = Game_snapshot(
+            self.__viewer.snapshot(),
+            game_logic.number_players,
+            game_logic.factories_num,
+            self.ply,
+            self.game_state.state,
+        )
+        while True:
+            try:
+                self.snapshots.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self.snapshots.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def __advance_step(self) -> None:
+        """ Runs the state machine until the next move, the next refill of the factories or the end of the game """
+        while True:
+            state = self.game_state.next()
+            if state in (Game_states.PLAYER_MOVE, Game_states.FILL_FACTORY, Game_states.GAME_END):
+                break
+        if state == Game_states.PLAYER_MOVE:
+            self.ply += 1
+
+    def run(self) -> None:
+        # The state before the first move
+        if self.game_state.state == Game_states.INIT_GAME:
+            self.game_state.next()
+        self.__publish()
+
+        next_ply_time = time.perf_counter()
+        while self.game_state.state != Game_states.GAME_END:
+            with self.__condition:
+                while True:
+                    if self.__stopped:
+                        return
+                    if self.__pending_steps > 0:
+                        self.__pending_steps -= 1
+                        next_ply_time = time.perf_counter()
+                        break
+                    if self.paused:
+                        self.__condition.wait()
+                        next_ply_time = time.perf_counter()
+                        continue
+                    if self.ply_rate is None:
+                        break
+                    wait_time = next_ply_time - time.perf_counter()
+                    if wait_time <= 0:
+                        next_ply_time = max(next_ply_time, time.perf_counter() - 1.0) + 1.0/self.ply_rate
+                        break
+                    # Wakes up early if the controls change
+                    self.__condition.wait(wait_time)
+
+            self.__advance_step()
+            self.__publish()
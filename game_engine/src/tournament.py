@@ -0,0 +1,268 @@
+import argparse
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, Tuple
+from .run_simulation import run_simulation
+
+
+class Game_result():
+    """ Result of one game of the tournament
+
+    Attributes
+    ----------
+    game_index : int
+        Number of the game in the tournament
+    seed : int
+        Seed used for the game
+    seats : Tuple[int, ...]
+        seats[i] is the index of the model (in players_models) sitting in seat i
+    scores : Tuple[int, ...]
+        Final score of each seat
+    """
+    def __init__(self, game_index: int, seed: int, seats: Tuple[int, ...], scores: Tuple[int, ...]):
+        self.game_index = game_index
+        self.seed = seed
+        self.seats = seats
+        self.scores = scores
+
+    def model_scores(self) -> Tuple[int, ...]:
+        """ Final score of each model, in the order of players_models """
+        scores = [0]*len(self.seats)
+        for seat, model_index in enumerate(self.seats):
+            scores[model_index] = self.scores[seat]
+        return tuple(scores)
+
+    def winners(self) -> Tuple[int, ...]:
+        """ Index of the models with the highest score, more than one if there is a tie """
+        model_scores = self.model_scores()
+        best_score = max(model_scores)
+        return tuple(i for i, score in enumerate(model_scores) if score == best_score)
+
+    def __eq__(self, other) -> bool:
+        return (
+            isinstance(other, Game_result)
+            and (self.game_index, self.seed, self.seats, self.scores)
+            == (other.game_index, other.seed, other.seats, other.scores)
+        )
+
+    def __repr__(self) -> str:
+        return f"Game_result(game_index={self.game_index}, seed={self.seed}, seats={self.seats}, scores={self.scores})"
+
+
+def get_seats(number_models: int, game_index: int, rotate_seats: bool = True) -> Tuple[int, ...]:
+    """ Order of the models around the table for one game
+
+    With seat rotation the models move one seat each game, so over
+    number_models games every model plays from every seat.
+
+    Parameters
+    ----------
+    number_models : int
+        Number of models, one per player
+    game_index : int
+        Number of the game in the tournament
+    rotate_seats : bool, optional
+        Rotate the seats each game, by default True
+
+    Returns
+    -------
+    Tuple[int, ...]
+        Index of the model sitting in each seat
+    """
+    shift = game_index % number_models if rotate_seats else 0
+    return tuple((seat + shift) % number_models for seat in range(number_models))
+
+
+def play_games(players_models: List, games: List[Tuple[int, int, Tuple[int, ...]]]) -> List[Game_result]:
+    """ Plays a group of games in the current process
+
+    Parameters
+    ----------
+    players_models : List
+        Player_model classes of the tournament
+    games : List[Tuple[int, int, Tuple[int, ...]]]
+        (game_index, seed, seats) of each game
+
+    Returns
+    -------
+    List[Game_result]
+        Result of each game
+    """
+    results = []
+    for game_index, seed, seats in games:
+        scores = run_simulation([players_models[model_index] for model_index in seats], seed=seed)
+        results.append(Game_result(game_index, seed, seats, tuple(scores)))
+
+    return results
+
+
+class Tournament():
+    """ Plays many seeded games of the same models using all the cores
+
+    Every game is identified by its index, its seed is seed + game_index,
+    and its seats only depend on the index. As each game seeds its own
+    Game_logic, the results are the same whatever the number of workers,
+    only the order in which they arrive changes.
+
+    Attributes
+    ----------
+    games_played : int
+        Number of games finished in the last run
+    elapsed_time : float
+        Seconds since the start of the last run
+    """
+    def __init__(
+            self,
+            players_models: List,
+            number_games: int,
+            seed: int = 1,
+            max_workers: int = None,
+            rotate_seats: bool = True,
+            chunk_size: int = 1,
+        ):
+        """
+        Parameters
+        ----------
+        players_models : List
+            Player_model classes, one for each player, they must be importable
+            from the worker processes (defined at module level)
+        number_games : int
+            Number of games to play
+        seed : int, optional
+            Seed of the first game, by default 1
+        max_workers : int, optional
+            Number of worker processes, by default the number of cores,
+            with 1 the games are played in the current process
+        rotate_seats : bool, optional
+            Rotate the seats of the models each game, by default True
+        chunk_size : int, optional
+            Number of games sent to a worker at once, by default 1
+        """
+        if len(players_models) < 1 or len(players_models) > 4:
+            raise ValueError("The number of players should be between 2 and 4")
+
+        if chunk_size < 1:
+            raise ValueError("The chunk size should be at least 1")
+
+        self.players_models = list(players_models)
+        self.number_games = number_games
+        self.seed = seed
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.rotate_seats = rotate_seats
+        self.chunk_size = chunk_size
+
+        self.games_played = 0
+        self.elapsed_time = 0.0
+
+    @property
+    def games_per_second(self) -> float:
+        if self.elapsed_time == 0:
+            return 0.0
+        return self.games_played / self.elapsed_time
+
+    def get_games(self) -> List[Tuple[int, int, Tuple[int, ...]]]:
+        """ (game_index, seed, seats) of every game of the tournament """
+        number_models = len(self.players_models)
+        return [
+            (game_index, self.seed + game_index, get_seats(number_models, game_index, self.rotate_seats))
+            for game_index in range(self.number_games)
+        ]
+
+    def run(self) -> Iterator[Game_result]:
+        """ Plays the tournament, the results are yielded as the games finish
+
+        Yields
+        ------
+        Game_result
+            Result of each game, in order of completion
+        """
+        games = self.get_games()
+        chunks = [games[i:i + self.chunk_size] for i in range(0, len(games), self.chunk_size)]
+
+        self.games_played = 0
+        start_time = time.perf_counter()
+
+        if self.max_workers == 1:
+            for chunk in chunks:
+                for result in play_games(self.players_models, chunk):
+                    self.games_played += 1
+                    self.elapsed_time = time.perf_counter() - start_time
+                    yield result
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(play_games, self.players_models, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                for result in future.result():
+                    self.games_played += 1
+                    self.elapsed_time = time.perf_counter() - start_time
+                    yield result
+
+    def run_all(self) -> List[Game_result]:
+        """ Plays the tournament and returns the results sorted by game index """
+        return sorted(self.run(), key=lambda result: result.game_index)
+
+
+def summarize(results: List[Game_result], number_models: int) -> dict:
+    """ Wins (ties count for every winner) and mean score of each model """
+    wins = [0]*number_models
+    total_scores = [0]*number_models
+    for result in results:
+        for model_index in result.winners():
+            wins[model_index] += 1
+        for model_index, score in enumerate(result.model_scores()):
+            total_scores[model_index] += score
+
+    games = max(len(results), 1)
+    return {
+        "games": len(results),
+        "wins": wins,
+        "mean_scores": [total / games for total in total_scores],
+    }
+
+
+def load_model(model_path: str):
+    """ Imports a Player_model class from "package.module:Class_name" """
+    module_name, class_name = model_path.split(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Azul tournament between player models")
+    parser.add_argument(
+        "models", nargs="+",
+        help="Player models, one per seat, as package.module:Class_name"
+    )
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1)
+    parser.add_argument("--no-rotate", action="store_true")
+    args = parser.parse_args()
+
+    players_models = [load_model(model_path) for model_path in args.models]
+    tournament = Tournament(
+        players_models,
+        args.games,
+        seed=args.seed,
+        max_workers=args.workers,
+        rotate_seats=not args.no_rotate,
+        chunk_size=args.chunk_size,
+    )
+
+    results = []
+    for result in tournament.run():
+        results.append(result)
+        print(result, f"{tournament.games_per_second:.1f} games/s")
+
+    summary = summarize(results, len(players_models))
+    print(f"games: {summary['games']}, {tournament.games_per_second:.1f} games/s")
+    for model_path, wins, mean_score in zip(args.models, summary["wins"], summary["mean_scores"]):
+        print(f"{model_path}: wins {wins}, mean score {mean_score:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+""" Compact binary log of the games played by Game_state_machine
+
+A trajectory file is a 16 bytes header followed by packed records of 16 bytes
+(RECORD_DTYPE), so the whole file can be memory mapped as one numpy array and
+sliced without parsing. Records are written in chunks of chunk_records; each
+chunk adds one entry to the chunk index file (path + ".idx") with its first
+record, number of records and the range of games it contains.
+
+Kinds of records:
+
+- GAME_START: player is the number of players, value is the seed of the game,
+  so only the seeds that fit in the int32 value can be recorded
+- MOVE: player, factory, tile and row of the move, ply is the number of the move in the game
+- ROUND_SCORE: player, round and its score after the wall tiling in value
+- GAME_END: ply is the number of moves of the game
+
+Files are append only, opening an existing file with Trajectory_recorder
+continues writing after its last record.
+"""
+from __future__ import annotations
+import os
+import numpy as np
+from enum import IntEnum
+from typing import Tuple
+
+MAGIC = b"AZULTRJ1"
+VERSION = 1
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<u4"), ("record_size", "<u4")])
+
+RECORD_DTYPE = np.dtype([
+    ("kind", "u1"),
+    ("player", "u1"),
+    ("factory", "i1"),
+    ("tile", "u1"),
+    ("row", "i1"),
+    ("round", "u1"),
+    ("ply", "<u2"),
+    ("game_id", "<u4"),
+    ("value", "<i4"),
+])
+
+CHUNK_INDEX_DTYPE = np.dtype([
+    ("first_record", "<u8"),
+    ("records", "<u4"),
+    ("first_game_id", "<u4"),
+    ("last_game_id", "<u4"),
+])
+
+
+class Record_kind(IntEnum):
+    GAME_START = 1
+    MOVE = 2
+    ROUND_SCORE = 3
+    GAME_END = 4
+
+
+class Trajectory_recorder():
+    """ Writes the records of the games to a trajectory file
+
+    Attributes
+    ----------
+    path : str
+        Path of the trajectory file
+    records_written : int
+        Number of records in the file, including the ones of previous sessions
+    next_game_id : int
+        Id that the next game will get
+    """
+    def __init__(self, path: str, chunk_records: int = 4096):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the trajectory file, created if it doesn't exist
+        chunk_records : int, optional
+            Number of records of each chunk, by default 4096
+
+        Raises
+        ------
+        ValueError
+            The file is not a trajectory file
+        """
+        self.path = str(path)
+        self.index_path = self.path + ".idx"
+        self.chunk_records = chunk_records
+
+        self.chunk = np.zeros(chunk_records, dtype=RECORD_DTYPE)
+        self.chunk_len = 0
+
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            check_header(self.path)
+            self.records_written = (os.path.getsize(self.path) - HEADER_DTYPE.itemsize) // RECORD_DTYPE.itemsize
+            chunk_index = read_chunk_index(self.index_path)
+            self.next_game_id = int(chunk_index["last_game_id"].max()) + 1 if len(chunk_index) else 0
+            self.file = open(self.path, "ab")
+        else:
+            self.records_written = 0
+            self.next_game_id = 0
+            self.file = open(self.path, "wb")
+            header = np.array([(MAGIC, VERSION, RECORD_DTYPE.itemsize)], dtype=HEADER_DTYPE)
+            self.file.write(header.tobytes())
+
+        self.index_file = open(self.index_path, "ab")
+
+    def __append(self, kind: Record_kind, game_id: int, player: int = 0, factory: int = 0,
+                 tile: int = 0, row: int = 0, round_num: int = 0, ply: int = 0, value: int = 0) -> None:
+        self.chunk[self.chunk_len] = (kind, player, factory, tile, row, round_num, ply, game_id, value)
+        self.chunk_len += 1
+        if self.chunk_len == self.chunk_records:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Writes the current chunk to the file, even if it is not full """
+        if self.chunk_len == 0:
+            return
+
+        chunk = self.chunk[:self.chunk_len]
+        self.file.write(chunk.tobytes())
+
+        chunk_index = np.array(
+            [(self.records_written, self.chunk_len, chunk["game_id"].min(), chunk["game_id"].max())],
+            dtype=CHUNK_INDEX_DTYPE
+        )
+        self.index_file.write(chunk_index.tobytes())
+
+        self.records_written += self.chunk_len
+        self.chunk_len = 0
+        self.file.flush()
+        self.index_file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+        self.index_file.close()
+
+    def __enter__(self) -> Trajectory_recorder:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def start_game(self, seed: int, number_players: int) -> int:
+        """ Records the start of a game
+
+        Returns
+        -------
+        int
+            Id of the game
+
+        Raises
+        ------
+        ValueError
+            The seed does not fit in the int32 value of a record
+        """
+        value_info = np.iinfo(RECORD_DTYPE["value"])
+        if not value_info.min <= seed <= value_info.max:
+            raise ValueError(
+                f"The seed {seed} can not be recorded, the seeds of a trajectory file "
+                f"should be between {value_info.min} and {value_info.max}"
+            )
+        game_id = self.next_game_id
+        self.next_game_id += 1
+        self.__append(Record_kind.GAME_START, game_id, player=number_players, value=seed)
+        return game_id
+
+    def record_move(self, game_id: int, ply: int, player: int, move: Tuple[int, int, int]) -> None:
+        factory_index, tile_type, row_index = move
+        self.__append(Record_kind.MOVE, game_id, player=player, factory=factory_index,
+                      tile=tile_type, row=row_index, ply=ply)
+
+    def record_round_score(self, game_id: int, round_num: int, player: int, score: int) -> None:
+        self.__append(Record_kind.ROUND_SCORE, game_id, player=player, round_num=round_num, value=score)
+
+    def end_game(self, game_id: int, plies: int) -> None:
+        self.__append(Record_kind.GAME_END, game_id, ply=plies)
+
+
+def check_header(path: str) -> None:
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) != 1 or header["magic"][0] != MAGIC or header["record_size"][0] != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} is not a trajectory file")
+
+
+def read_chunk_index(index_path: str) -> np.array:
+    if not os.path.exists(index_path):
+        return np.zeros(0, dtype=CHUNK_INDEX_DTYPE)
+    return np.fromfile(index_path, dtype=CHUNK_INDEX_DTYPE)
+
+
+class Trajectory_reader():
+    """ Reads a trajectory file through a memory map
+
+    Attributes
+    ----------
+    records : np.memmap
+        Every record of the file, RECORD_DTYPE
+    chunk_index : np.array
+        Index of the chunks, CHUNK_INDEX_DTYPE
+    """
+    def __init__(self, path: str):
+        path = str(path)
+        check_header(path)
+
+        self.chunk_index = read_chunk_index(path + ".idx")
+        records_num = (os.path.getsize(path) - HEADER_DTYPE.itemsize) // RECORD_DTYPE.itemsize
+        if records_num == 0:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        else:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_DTYPE.itemsize, shape=(records_num,))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def game_records(self, game_id: int) -> np.array:
+        """ Records of one game, only the chunks that contain the game are read """
+        chunks = self.chunk_index[
+            (self.chunk_index["first_game_id"] <= game_id) & (self.chunk_index["last_game_id"] >= game_id)
+        ]
+        parts = []
+        for chunk in chunks:
+            first_record = int(chunk["first_record"])
+            records = self.records[first_record:first_record + int(chunk["records"])]
+            parts.append(records[records["game_id"] == game_id])
+
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.concatenate(parts)
+
+    def game_seed(self, game_id: int) -> int:
+        records = self.game_records(game_id)
+        return int(records[records["kind"] == Record_kind.GAME_START]["value"][0])
+
+    def game_moves(self, game_id: int) -> list:
+        """ Moves (factory, tile, row) of one game in order """
+        records = self.game_records(game_id)
+        moves = records[records["kind"] == Record_kind.MOVE]
+        return list(zip(moves["factory"].tolist(), moves["tile"].tolist(), moves["row"].tolist()))
+
+    def moves(self) -> np.array:
+        """ Every move record of the file """
+        return self.records[self.records["kind"] == Record_kind.MOVE]
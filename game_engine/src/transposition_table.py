@@ -0,0 +1,165 @@
+""" Fixed size table of search results keyed by the Zobrist hash of Game_logic
+
+It is a building block for depth-limited searches (alpha-beta, expectimax)
+that store a value and a bound per state. No search player uses it yet:
+Mcts_player keeps its statistics in the nodes of its tree and reuses the
+tree between moves with Mcts_node.find_state, which matches the same
+zobrist_hash by walking the subtree.
+"""
+from enum import Enum, auto
+from typing import Optional, Tuple
+
+
+class Replacement_policy(Enum):
+    # The new entry always takes the slot
+    ALWAYS_REPLACE = auto()
+    # The new entry only takes the slot of another state if it was searched as deep or deeper
+    DEPTH_PREFERRED = auto()
+    # Two slots per index, the first is depth preferred and the second always replace
+    TWO_TIER = auto()
+
+
+class Bound(Enum):
+    EXACT = auto()
+    LOWER = auto()
+    UPPER = auto()
+
+
+class Transposition_table():
+    """ Fixed size table of search results indexed by the Zobrist hash of the state
+
+    Each entry is a tuple (key, depth, value, bound, move). Only the lower bits
+    of the key choose the slot, the full key is kept to detect collisions.
+
+    Attributes
+    ----------
+    size : int
+        Number of slots, a power of two
+    replacement_policy : Replacement_policy
+        What to do when a slot is already used
+    hits : int
+        Lookups that found the state
+    misses : int
+        Lookups that did not find the state
+    overwrites : int
+        Entries of other states lost because their slot was taken
+    """
+    def __init__(self, size: int = 2**16, replacement_policy: Replacement_policy = Replacement_policy.DEPTH_PREFERRED):
+        """
+        Parameters
+        ----------
+        size : int, optional
+            Number of slots, rounded up to a power of two, by default 2**16
+        replacement_policy : Replacement_policy, optional
+            By default Replacement_policy.DEPTH_PREFERRED
+
+        Raises
+        ------
+        ValueError
+            The size must be at least 1
+        """
+        if size < 1:
+            raise ValueError("The size of the transposition table must be at least 1")
+
+        self.size = 1 << (size - 1).bit_length()
+        self.mask = self.size - 1
+        self.replacement_policy = replacement_policy
+
+        self.slots = [None]*self.size
+        # Second slot of each index, only used by Replacement_policy.TWO_TIER
+        self.always_replace_slots = [None]*self.size if replacement_policy == Replacement_policy.TWO_TIER else None
+
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+
+    def __len__(self) -> int:
+        used = sum(slot is not None for slot in self.slots)
+        if self.always_replace_slots is not None:
+            used += sum(slot is not None for slot in self.always_replace_slots)
+        return used
+
+    def clear(self) -> None:
+        self.slots = [None]*self.size
+        if self.always_replace_slots is not None:
+            self.always_replace_slots = [None]*self.size
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+
+    def lookup(self, key: int) -> Optional[Tuple]:
+        """ Searches the entry of a state
+
+        Parameters
+        ----------
+        key : int
+            Zobrist hash of the state
+
+        Returns
+        -------
+        Optional[Tuple]
+            (key, depth, value, bound, move) or None if the state is not in the table
+        """
+        index = key & self.mask
+
+        entry = self.slots[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        if self.always_replace_slots is not None:
+            entry = self.always_replace_slots[index]
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry
+
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, value: float, bound: Bound = Bound.EXACT, move: tuple = None) -> bool:
+        """ Saves the result of a search following the replacement policy
+
+        Parameters
+        ----------
+        key : int
+            Zobrist hash of the state
+        depth : int
+            Depth of the search below the state
+        value : float
+            Value of the state
+        bound : Bound, optional
+            If the value is exact or a bound, by default Bound.EXACT
+        move : tuple, optional
+            Best move found, by default None
+
+        Returns
+        -------
+        bool
+            True if the entry was saved
+        """
+        index = key & self.mask
+        entry = (key, depth, value, bound, move)
+        old_entry = self.slots[index]
+
+        if self.replacement_policy == Replacement_policy.ALWAYS_REPLACE:
+            replace = True
+        else:
+            replace = old_entry is None or old_entry[0] == key or depth >= old_entry[1]
+
+        if replace:
+            if old_entry is not None and old_entry[0] != key:
+                self.overwrites += 1
+                if self.always_replace_slots is not None:
+                    # The old entry is still useful, it moves to the second slot
+                    self.always_replace_slots[index] = old_entry
+            self.slots[index] = entry
+            return True
+
+        if self.always_replace_slots is not None:
+            old_entry = self.always_replace_slots[index]
+            if old_entry is not None and old_entry[0] != key:
+                self.overwrites += 1
+            self.always_replace_slots[index] = entry
+            return True
+
+        return False
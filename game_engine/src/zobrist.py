@@ -0,0 +1,83 @@
+""" Zobrist keys to hash the state of a game
+
+The hash of a state is the XOR of one random 64-bit key for each part of
+the state, so when a part changes the hash is updated by XOR-ing the key of
+the old value and the key of the new value. The keys are the same for every
+game, so the hashes of different games can be compared.
+
+The factories and the center are hashed by the number of tiles of each type,
+the order of the tiles in them does not change the game. The bag and the
+discard pile are not part of the hash, they are hidden to the players.
+"""
+import numpy as np
+
+MAX_PLAYERS = 4
+MAX_FACTORIES = 9
+MAX_CENTER_TILES = 20
+SCORE_KEYS = 512
+
+
+class Zobrist_keys():
+    """ Random keys of every part of the state
+
+    Attributes
+    ----------
+    factories : List
+        factories[factory][tile_type-1][count], count from 0 to 4
+    center : List
+        center[tile_type-1][count], count from 0 to 20
+    walls : List
+        walls[player][row*5 + column]
+    pattern_lines : List
+        pattern_lines[player][row][tile_type][count], tile_type 0 for an empty row
+    floor_lines : List
+        floor_lines[player][position][tile_type + 1], tile_type -1 is the first player tile
+    scores : List
+        scores[player][score % 512]
+    side_to_move : List
+        side_to_move[player]
+    """
+    def __init__(self, seed: int = 20240601):
+        rng = np.random.default_rng(seed)
+
+        def keys(*shape):
+            return rng.integers(0, 2**64, size=shape, dtype=np.uint64, endpoint=False).tolist()
+
+        self.factories = keys(MAX_FACTORIES, 5, 5)
+        self.center = keys(5, MAX_CENTER_TILES + 1)
+        self.walls = keys(MAX_PLAYERS, 25)
+        self.pattern_lines = keys(MAX_PLAYERS, 5, 6, 6)
+        self.floor_lines = keys(MAX_PLAYERS, 7, 7)
+        self.scores = keys(MAX_PLAYERS, SCORE_KEYS)
+        self.side_to_move = keys(MAX_PLAYERS)
+
+        # Empty containers, rows and a score of zero have no key
+        for factory_keys in self.factories:
+            for tile_keys in factory_keys:
+                tile_keys[0] = 0
+        for tile_keys in self.center:
+            tile_keys[0] = 0
+        for player_keys in self.pattern_lines:
+            for row_keys in player_keys:
+                row_keys[0] = [0]*6
+        for player_keys in self.floor_lines:
+            for position_keys in player_keys:
+                position_keys[1] = 0
+        for player_keys in self.scores:
+            player_keys[0] = 0
+
+    def score_key(self, player_index: int, score: int) -> int:
+        return self.scores[player_index][int(score) % SCORE_KEYS]
+
+    def floor_line_key(self, player_index: int, floor_line) -> int:
+        """ Key of a whole floor line, the XOR of the key of each position """
+        key = 0
+        player_keys = self.floor_lines[player_index]
+        for position, tile_type in enumerate(floor_line):
+            if tile_type == 0:
+                break
+            key ^= player_keys[position][int(tile_type) + 1]
+        return key
+
+
+ZOBRIST_KEYS = Zobrist_keys()
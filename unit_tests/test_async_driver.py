@@ -0,0 +1,124 @@
+import asyncio
+import random
+import pytest
+
+from game_engine.src.async_driver import Async_game_driver
+from game_engine.src.game_logic import Player_model
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import run_simulation
+
+
+class Async_dummy_player(Dummy_player):
+    """ Dummy_player that waits a little for each move, like a model served by another process """
+    async def async_player_move(self):
+        await asyncio.sleep(0)
+        return self.player_move()
+
+
+class Slow_player(Dummy_player):
+    """ Takes too long for one move out of three """
+    moves = 0
+
+    async def async_player_move(self):
+        self.moves += 1
+        if self.moves % 3 == 0:
+            await asyncio.sleep(10)
+        return self.player_move()
+
+
+class Unavailable_player(Player_model):
+    """ Never answers in time, its generator is a random.Random instead of a numpy Generator """
+    def __init__(self, game_viewer, player_index):
+        super().__init__(game_viewer, player_index)
+        self.rng = random.Random(player_index)
+
+    async def async_player_move(self):
+        await asyncio.sleep(10)
+
+    def player_move(self):
+        raise RuntimeError("The model is not available")
+
+
+class Failing_player(Player_model):
+    async def async_player_move(self):
+        raise RuntimeError("The model is not available")
+
+    def player_move(self):
+        raise RuntimeError("The model is not available")
+
+
+@pytest.mark.parametrize(
+    "players_models",
+    [[Dummy_player]*2, [Async_dummy_player]*3, [Async_dummy_player, Dummy_player, Async_dummy_player, Dummy_player]]
+)
+def test_same_games_as_run_simulation(players_models):
+    seeds = [i for i in range(12)]
+    driver = Async_game_driver(players_models, seeds, max_concurrent_games=5)
+    results = driver.run()
+
+    assert [result.game_index for result in results] == list(range(12))
+    for result, seed in zip(results, seeds):
+        assert list(result.scores) == run_simulation(players_models, seed=seed)
+
+    metrics = driver.metrics
+    assert metrics.games_started == metrics.games_finished == 12
+    assert metrics.peak_active_games == 5
+    assert metrics.moves == len(metrics.latencies) > 0
+    assert metrics.timeouts == 0
+    latency = metrics.latency_percentiles()
+    assert 0 <= latency["p50"] <= latency["p90"] <= latency["p99"] <= latency["max"]
+    assert metrics.to_dict()["games_finished"] == 12
+
+
+def test_move_timeout():
+    driver = Async_game_driver([Slow_player]*2, [1, 2, 3], move_timeout=0.001)
+    results = driver.run()
+
+    assert len(results) == 3
+    metrics = driver.metrics
+    # Every player times out once every three moves
+    assert metrics.moves // 3 - 6 <= metrics.timeouts <= metrics.moves // 3
+    assert metrics.latency_percentiles()["max"] < 1
+
+
+def test_timeout_moves_do_not_use_the_model_generator():
+    results = []
+    for _ in range(2):
+        driver = Async_game_driver([Unavailable_player]*2, [1, 2], move_timeout=0.001)
+        results.append(driver.run())
+        assert driver.metrics.timeouts == driver.metrics.moves > 0
+
+    # The random moves only depend on the seed of the game
+    assert results[0] == results[1]
+
+
+def test_backpressure():
+    max_concurrent_games = 4
+    max_pending_results = 2
+    driver = Async_game_driver(
+        [Async_dummy_player]*2,
+        [i for i in range(20)],
+        max_concurrent_games=max_concurrent_games,
+        max_pending_results=max_pending_results,
+    )
+
+    async def slow_consumer():
+        results = []
+        async for result in driver.play():
+            # The runners wait while the results are not taken
+            assert driver.metrics.games_finished - len(results) <= max_concurrent_games + max_pending_results
+            results.append(result)
+            await asyncio.sleep(0.005)
+        return results
+
+    results = asyncio.run(slow_consumer())
+    assert sorted(result.game_index for result in results) == list(range(20))
+
+
+def test_driver_errors():
+    with pytest.raises(RuntimeError):
+        Async_game_driver([Failing_player]*2, [1, 2, 3], max_concurrent_games=2).run()
+    with pytest.raises(ValueError):
+        Async_game_driver([Dummy_player]*2, [1], move_timeout=0)
+    with pytest.raises(ValueError):
+        Async_game_driver([Dummy_player]*2, [1], max_concurrent_games=0)
@@ -0,0 +1,176 @@
+import pytest
+import random
+import numpy as np
+from collections import Counter
+
+from game_engine.src.game_logic import Game_logic, Game_viewer, Player_model
+from game_engine.src.batch_game_logic import Batch_game_logic
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+from game_engine.src.models.dummy_model import Batch_dummy_player
+
+def game_logic_state(game_logic: Game_logic):
+    boards = game_logic.players_boards
+    return {
+        "factories": [[int(tile) for tile in factory] for factory in game_logic.factories],
+        "center_tiles": Counter(int(tile) for tile in game_logic.center_tiles),
+        "bag_tiles": [int(tile) for tile in game_logic.bag_tiles],
+        "discarted_tiles": [int(tile) for tile in game_logic.discarted_tiles],
+        "walls": np.array([board.wall for board in boards]),
+        "pattern_lines": [[tuple(int(tile) for tile in row) for row in board.pattern_lines] for board in boards],
+        "floor_lines": np.array([board.floor_line for board in boards]),
+        "scores": [int(board.score) for board in boards],
+    }
+
+
+def batch_state(batch: Batch_game_logic, game_index: int):
+    pattern_lines = []
+    for player in range(batch.number_players):
+        rows = []
+        for row in range(5):
+            count = batch.pattern_lines_count[game_index, player, row]
+            colour = batch.pattern_lines_colour[game_index, player, row]
+            rows.append(tuple([int(colour)]*int(count) + [0]*(row + 1 - int(count))))
+        pattern_lines.append(rows)
+
+    return {
+        "factories": [[int(tile) for tile in factory if tile != 0] for factory in batch.factories[game_index]],
+        "center_tiles": Counter({tile_type + 1: int(count) for tile_type, count in enumerate(batch.center_tiles[game_index]) if count}),
+        "bag_tiles": batch.get_bag_tiles(game_index),
+        "discarted_tiles": batch.get_discarted_tiles(game_index),
+        "walls": batch.walls[game_index],
+        "pattern_lines": pattern_lines,
+        "floor_lines": batch.floor_lines[game_index],
+        "scores": batch.scores[game_index].tolist(),
+    }
+
+
+def assert_same_state(state, other_state):
+    for key in state:
+        if isinstance(state[key], np.ndarray):
+            assert np.array_equal(state[key], other_state[key]), key
+        else:
+            assert state[key] == other_state[key], key
+
+
+class Random_legal_player(Player_model):
+    """ Picks random valid moves with its own random generator and
+    keeps the state seen before each move """
+    def __init__(self, game_viewer, player_index, rng, history):
+        super().__init__(game_viewer, player_index)
+        self.rng = rng
+        self.history = history
+
+    def player_move(self):
+        moves = [
+            (factory_index, tile_type, row_index)
+            for factory_index in range(-1, len(self.game_viewer.get_factories()))
+            for tile_type in range(1, 6)
+            for row_index in range(-1, 5)
+            if self.validate_player_move(factory_index, tile_type, row_index)
+        ]
+        move = self.rng.choice(moves)
+        self.history.append((self.player_index, move, game_logic_state(self.game_viewer.game_logic)))
+        return move
+
+
+def play_game(num_players, seed):
+    game_logic = Game_logic(number_players=num_players, seed=seed)
+    game_view = Game_viewer(game_logic)
+    rng = random.Random(seed + 1000)
+    history = []
+    players = [Random_legal_player(game_view, i, rng, history) for i in range(num_players)]
+
+    game_state = Game_state_machine(game_logic, players)
+    while game_state.state != Game_states.GAME_END:
+        game_state.next()
+
+    return history, game_logic_state(game_logic)
+
+
+@pytest.mark.parametrize(
+    "num_players",
+    [1, 2, 3, 4]
+)
+def test_batch_agrees_with_game_logic(num_players):
+    seeds = [i for i in range(12)]
+    games = [play_game(num_players, seed) for seed in seeds]
+
+    batch = Batch_game_logic(number_players=num_players, seeds=seeds)
+    max_moves = max(len(history) for history, _ in games)
+
+    for move_num in range(max_moves):
+        moves = np.zeros((len(seeds), 3), dtype=int)
+        for game_index, (history, _) in enumerate(games):
+            if move_num >= len(history):
+                assert batch.game_end[game_index]
+                continue
+
+            player_index, move, state = history[move_num]
+            assert not batch.game_end[game_index]
+            assert batch.current_player[game_index] == player_index
+            assert_same_state(state, batch_state(batch, game_index))
+            moves[game_index] = move
+
+        batch.apply_moves(moves[:, 0], moves[:, 1], moves[:, 2])
+
+    assert batch.game_end.all()
+    for game_index, (_, final_state) in enumerate(games):
+        assert_same_state(final_state, batch_state(batch, game_index))
+
+
+def test_batch_rejects_invalid_moves():
+    batch = Batch_game_logic(number_players=2, seeds=[1, 2])
+    tile_type = batch.factories[:, 0, 0]
+    missing_tile_type = np.array([
+        next(t for t in range(1, 6) if t not in batch.factories[i, 0])
+        for i in range(2)
+    ])
+
+    assert batch.validate_moves([0, 0], tile_type, [0, 0]).all()
+    assert not batch.validate_moves([0, 0], missing_tile_type, [0, 0]).any()
+    with pytest.raises(RuntimeError):
+        batch.apply_moves([0, 0], missing_tile_type, [0, 0])
+
+
+def expected_moves(batch: Batch_game_logic, game_index: int, restrict_floor: bool):
+    """ Moves of a game of the batch checked one by one with validate_moves """
+    moves = set()
+    for factory_index in range(-1, batch.factories_num):
+        for tile_type in range(1, 6):
+            for row_index in range(-1, 5):
+                move = np.full((batch.number_games, 3), (factory_index, tile_type, row_index))
+                if batch.validate_moves(move[:, 0], move[:, 1], move[:, 2])[game_index]:
+                    moves.add((factory_index, tile_type, row_index))
+
+    if restrict_floor:
+        player = batch.current_player[game_index]
+        open_rows = {
+            (tile_type, row_index) for _, tile_type, row_index in moves
+            if row_index != -1 and batch.pattern_lines_count[game_index, player, row_index] < row_index + 1
+        }
+        moves = {move for move in moves if move[2] != -1 or all(row[0] != move[1] for row in open_rows)}
+    return moves
+
+
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 3, 4]
+)
+def test_batch_dummy_player(num_players):
+    seeds = [i for i in range(6)]
+    batch = Batch_game_logic(number_players=num_players, seeds=seeds)
+    player = Batch_dummy_player(batch, seed=num_players)
+
+    move_num = 0
+    while not batch.game_end.all():
+        if move_num % 7 == 0:
+            for restrict_floor in (False, True):
+                mask = batch.legal_moves_mask(restrict_floor).reshape(len(seeds), -1)
+                for game_index in np.flatnonzero(~batch.game_end):
+                    moves = set(zip(*(values.tolist() for values in batch.moves_from_index(np.flatnonzero(mask[game_index])))))
+                    assert moves == expected_moves(batch, game_index, restrict_floor)
+
+        factory_index, tile_type, row_index = player.player_moves()
+        assert batch.validate_moves(factory_index, tile_type, row_index)[~batch.game_end].all()
+        batch.apply_moves(factory_index, tile_type, row_index)
+        move_num += 1
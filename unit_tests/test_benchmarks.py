@@ -0,0 +1,31 @@
+import pytest
+from benchmarks.engine_benchmarks import compare, get_benchmarks, run_benchmarks
+
+
+def test_every_benchmark_runs():
+    names = [benchmark.name for benchmark in get_benchmarks()]
+    assert len(names) == len(set(names))
+
+    current = run_benchmarks(repeats=1, batch_scale=0.02)
+    assert list(current["results"]) == names
+    for result in current["results"].values():
+        assert result["ops_per_sec"] > 0
+        assert result["median_ops_per_sec"] <= result["ops_per_sec"]
+        assert result["peak_bytes_per_op"] >= 0
+
+
+@pytest.mark.parametrize("baseline_ops, current_ops, status", [
+    (100.0, 100.0, "same"),
+    (100.0, 95.0, "same"),
+    (100.0, 85.0, "regression"),
+    (100.0, 120.0, "improvement"),
+])
+def test_compare(baseline_ops, current_ops, status):
+    baseline = {"results": {"operation": {"ops_per_sec": baseline_ops}, "removed": {"ops_per_sec": 1.0}}}
+    current = {"results": {"operation": {"ops_per_sec": current_ops}, "added": {"ops_per_sec": 1.0}}}
+
+    rows = {row["name"]: row for row in compare(current, baseline, threshold=0.1)}
+    assert rows["operation"]["status"] == status
+    assert rows["operation"]["ratio"] == pytest.approx(current_ops / baseline_ops)
+    assert rows["removed"]["status"] == "missing"
+    assert rows["added"]["status"] == "new"
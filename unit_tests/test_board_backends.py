@@ -0,0 +1,107 @@
+import pytest
+import random
+import numpy as np
+
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.game_logic import Game_logic, Game_viewer, Board, Bitboard_board
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+
+def play_game(num_players, seed, board_backend):
+    game_logic = Game_logic(number_players=num_players, seed=seed, board_backend=board_backend)
+    game_view = Game_viewer(game_logic)
+    players = [Dummy_player(game_view, i) for i in range(num_players)]
+
+    game_state = Game_state_machine(game_logic, players)
+    history = []
+    while game_state.state != Game_states.GAME_END:
+        game_state.next()
+        history.append((
+            [board.score for board in game_logic.players_boards],
+            [board.wall.copy() for board in game_logic.players_boards],
+        ))
+
+    return history
+
+
+@pytest.mark.parametrize(
+    "seed",
+    [i for i in range(200)]
+)
+def test_random_wall_fill_order_same_score(seed):
+    rng = random.Random(seed)
+    order = [(i, j) for i in range(5) for j in range(5)]
+    rng.shuffle(order)
+
+    game_logic = Game_logic(number_players=2, seed=seed)
+    board = Board(game_logic)
+    bitboard = Bitboard_board(game_logic)
+
+    for row, column in order:
+        tile_type = int(board.wall_default_pattern[row, column])
+        board.place_tile_on_wall(row, tile_type)
+        bitboard.place_tile_on_wall(row, tile_type)
+
+        assert board.score == bitboard.score
+        assert np.array_equal(board.wall, bitboard.wall)
+
+
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 3, 4]
+)
+@pytest.mark.parametrize(
+    "seed",
+    [i for i in range(20)]
+)
+def test_games_same_result_with_both_backends(num_players, seed):
+    numpy_history = play_game(num_players, seed, "numpy")
+    bitboard_history = play_game(num_players, seed, "bitboard")
+
+    assert len(numpy_history) == len(bitboard_history)
+    for (numpy_scores, numpy_walls), (bitboard_scores, bitboard_walls) in zip(numpy_history, bitboard_history):
+        assert numpy_scores == bitboard_scores
+        for numpy_wall, bitboard_wall in zip(numpy_walls, bitboard_walls):
+            assert np.array_equal(numpy_wall, bitboard_wall)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        Game_logic(number_players=2, board_backend="unknown")
+
+
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+def test_wall_is_read_only(board_backend):
+    board = Game_logic(number_players=2, seed=0, board_backend=board_backend).players_boards[0]
+    with pytest.raises(ValueError):
+        board.wall[0, 0] = 1
+
+    wall = board.wall.copy()
+    wall[0, 0] = board.wall_default_pattern[0, 0]
+    board.wall = wall
+    assert board.is_tile_on_wall_row(0, int(wall[0, 0]))
+
+
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+def test_wall_assignment_updates_caches(board_backend):
+    game_logic = Game_logic(number_players=2, seed=0, board_backend=board_backend)
+    game_logic.fill_factories()
+    board = game_logic.players_boards[0]
+    tile_type = int(game_logic.factories[0][0])
+
+    wall = np.array(board.wall_default_pattern)
+    wall[1:] = 0
+    wall[0, board.wall_default_pattern[0] != tile_type] = 0
+    board.wall = wall
+
+    assert not board.rows_allowed_colours[0] & (1 << (tile_type - 1))
+    assert game_logic.zobrist_hash == game_logic.compute_zobrist_hash()
+
+    board.wall = np.zeros((5, 5), dtype=int)
+    assert board.rows_allowed_colours[0] & (1 << (tile_type - 1))
+    assert game_logic.zobrist_hash == game_logic.compute_zobrist_hash()
@@ -0,0 +1,119 @@
+import pickle
+import pytest
+
+from game_engine.src.compact_state import Compact_game_state
+from game_engine.src.game_logic import Game_logic, Count_game_logic, Game_viewer
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import play_move
+from unit_tests.test_undo_move import full_state
+
+
+def new_players(game_logic, players=None):
+    """ Dummy players of a game, with the random generators of players when given """
+    new_players = [Dummy_player(Game_viewer(game_logic), i) for i in range(game_logic.number_players)]
+    for new_player, player in zip(new_players, players or []):
+        new_player.rng.bit_generator.state = player.rng.bit_generator.state
+    return new_players
+
+
+def play_moves(game_logic, players, number_moves):
+    for _ in range(number_moves):
+        if game_logic.game_end:
+            return
+        play_move(game_logic, players)
+
+
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+@pytest.mark.parametrize(
+    "num_players",
+    [1, 2, 3, 4]
+)
+@pytest.mark.parametrize(
+    "seed",
+    [i for i in range(4)]
+)
+def test_restored_game_goes_on_the_same(board_backend, num_players, seed):
+    game_logic = Count_game_logic(number_players=num_players, seed=seed, board_backend=board_backend, check_invariants=True)
+    players = new_players(game_logic)
+    state = Compact_game_state.from_game_logic(game_logic)
+    # A game that is already in use, the state replaces all of it
+    reused_game_logic = Count_game_logic(number_players=num_players, seed=seed + 1, board_backend=board_backend)
+    play_moves(reused_game_logic, new_players(reused_game_logic), 11)
+
+    while not game_logic.game_end:
+        play_moves(game_logic, players, 9)
+        state.capture(game_logic)
+        snapshot = state.snapshot()
+        assert len(snapshot) < 256
+
+        restored = Compact_game_state.from_bytes(snapshot).to_game_logic(board_backend)
+        state.apply_to(reused_game_logic)
+        for other_game_logic in (restored, reused_game_logic):
+            assert full_state(other_game_logic) == full_state(game_logic)
+            assert other_game_logic.zobrist_hash == game_logic.zobrist_hash
+            assert other_game_logic.side_to_move == game_logic.side_to_move
+            assert other_game_logic.legal_moves(game_logic.side_to_move) == game_logic.legal_moves(game_logic.side_to_move)
+            other_game_logic.validate_game_logic()
+
+        # The bag is drawn from the same random generator
+        checkpoint_players = [player.rng.bit_generator.state for player in players]
+        play_moves(restored, new_players(restored, players), 25)
+        compared_game_logic = Compact_game_state.from_bytes(snapshot).to_game_logic(board_backend)
+        compared_players = new_players(compared_game_logic)
+        for player, rng_state in zip(compared_players, checkpoint_players):
+            player.rng.bit_generator.state = rng_state
+        play_moves(compared_game_logic, compared_players, 25)
+        assert full_state(restored) == full_state(compared_game_logic)
+
+    assert Compact_game_state.from_game_logic(restored).game_end[0] == restored.game_end
+
+
+def test_game_to_the_end_from_the_first_state():
+    game_logic = Count_game_logic(number_players=3, seed=9)
+    snapshot = Compact_game_state.from_game_logic(game_logic).snapshot()
+    play_moves(game_logic, new_players(game_logic), 1000)
+
+    restored = Compact_game_state.from_bytes(snapshot).to_game_logic()
+    play_moves(restored, new_players(restored), 1000)
+    assert restored.game_end
+    assert full_state(restored) == full_state(game_logic)
+
+
+def test_snapshot_and_restore():
+    game_logic = Count_game_logic(number_players=2, seed=5)
+    game_logic.fill_factories()
+    state = Compact_game_state.from_game_logic(game_logic)
+    snapshot = state.snapshot()
+
+    other_state = state.copy()
+    game_logic.apply_move(0, *game_logic.legal_moves(0)[0])
+    state.capture(game_logic)
+    assert state.snapshot() != snapshot
+    assert other_state.snapshot() == snapshot
+
+    state.restore(snapshot)
+    assert state.snapshot() == snapshot
+    assert pickle.loads(pickle.dumps(state)).snapshot() == snapshot
+
+    with pytest.raises(ValueError):
+        state.restore(Compact_game_state(3, 7).snapshot())
+    with pytest.raises(ValueError):
+        state.apply_to(Game_logic(number_players=2, seed=5))
+    with pytest.raises(ValueError):
+        state.apply_to(Count_game_logic(number_players=3, seed=5))
+
+
+def test_capture_of_game_logic():
+    game_logic = Game_logic(number_players=3, seed=2)
+    game_logic.fill_factories()
+    game_logic.apply_move(0, *game_logic.legal_moves(0)[0])
+
+    restored = Compact_game_state.from_game_logic(game_logic).to_game_logic()
+    assert restored.factories_counts == game_logic.factories_counts
+    assert restored.center_counts == game_logic.center_counts
+    assert restored.bag_counts == game_logic.bag_counts
+    assert restored.zobrist_hash == game_logic.zobrist_hash
+    assert full_state(restored)[-1] == full_state(game_logic)[-1]
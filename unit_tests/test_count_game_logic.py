@@ -0,0 +1,79 @@
+import pytest
+
+from game_engine.src.game_logic import Game_logic, Count_game_logic, Game_viewer, count_tiles
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+
+
+def play_game(num_players, seed, board_backend="numpy"):
+    game_logic = Count_game_logic(number_players=num_players, seed=seed, board_backend=board_backend, check_invariants=True)
+    game_view = Game_viewer(game_logic)
+    players = [Dummy_player(game_view, i) for i in range(num_players)]
+
+    game_state = Game_state_machine(game_logic, players)
+    while game_state.state != Game_states.GAME_END:
+        game_state.next()
+
+        if game_state.state == Game_states.PLAYER_MOVE:
+            # The lists are built from the counts
+            assert [count_tiles(factory) for factory in game_view.get_factories()] == game_logic.factories_counts
+            assert count_tiles(game_view.get_center_tiles()) == game_logic.center_counts
+        elif game_state.state == Game_states.WALL_TILING:
+            game_logic.validate_game_logic()
+
+    game_logic.validate_game_logic()
+    return [int(board.score) for board in game_logic.players_boards]
+
+
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+@pytest.mark.parametrize(
+    "num_players",
+    [1, 2, 3, 4]
+)
+@pytest.mark.parametrize(
+    "seed",
+    [i for i in range(10)]
+)
+def test_random_games(board_backend, num_players, seed):
+    scores = play_game(num_players, seed, board_backend)
+    assert scores == play_game(num_players, seed, board_backend)
+
+
+def test_lists_are_views_of_the_counts():
+    game_logic = Count_game_logic(number_players=2, seed=3)
+    assert game_logic.bag_tiles == sorted(Game_logic(number_players=2, seed=3).bag_tiles)
+
+    game_logic.fill_factories()
+    assert all(len(factory) == 4 for factory in game_logic.factories)
+    assert all(factory == sorted(factory) for factory in game_logic.factories)
+    assert len(game_logic.bag_tiles) == 100 - 4*game_logic.factories_num
+
+    # Changing a list does not change the game
+    game_logic.factories[0].clear()
+    assert len(game_logic.factories[0]) == 4
+
+    tile_type = game_logic.factories[0][0]
+    other_tiles = [tile for tile in game_logic.factories[0] if tile != tile_type]
+    tiles = game_logic.get_tiles_from_factory(0, tile_type)
+    assert tiles == [tile_type]*(4 - len(other_tiles))
+    assert game_logic.factories[0] == []
+    assert game_logic.center_tiles == sorted(other_tiles)
+
+    game_logic.center_tiles = [1, 1, 2]
+    assert game_logic.center_counts == [2, 1, 0, 0, 0]
+    assert game_logic.zobrist_hash == game_logic.compute_zobrist_hash()
+
+
+def test_fill_with_few_tiles():
+    game_logic = Count_game_logic(number_players=4, seed=1)
+    game_logic.bag_tiles = [1]*6
+    game_logic.discarted_tiles = [2]*3
+    game_logic.fill_factories()
+
+    assert game_logic.factories[:3] == [[1, 1, 1, 1], [1, 1, 2, 2], [2]]
+    assert all(factory == [] for factory in game_logic.factories[3:])
+    assert game_logic.bag_tiles == []
+    assert game_logic.discarted_tiles == []
@@ -0,0 +1,71 @@
+import pytest
+
+from game_engine.src.fuzz import Fuzzer, check_game, fuzz_games, get_game_setup, shrink
+from game_engine.src.models.fuzz_models import FUZZ_MODELS, Floor_dump_player
+
+def full_floor_line(game_state):
+    """ Fails as soon as a floor line has 5 tiles, to have a failure to shrink """
+    for player_index, board in enumerate(game_state.game_logic.players_boards):
+        if (board.floor_line != 0).sum() >= 5:
+            return f"Player {player_index} has 5 tiles on the floor line"
+    return None
+
+
+def test_fuzz_games_pass():
+    fuzzer = Fuzzer(40, seed=0, max_workers=1, chunk_size=8)
+    results = list(fuzzer.run())
+
+    assert len(results) == 40
+    assert fuzzer.failures == []
+    assert fuzzer.games_played == 40
+    assert fuzzer.games_per_second > 0
+    assert {result.seed for result in results} == set(range(40))
+    assert all(result.plies > 0 for result in results)
+
+
+@pytest.mark.parametrize(
+    "seed",
+    [i for i in range(50)]
+)
+def test_game_setup(seed):
+    number_players, board_backend, players_models = get_game_setup(seed)
+    assert 1 <= number_players <= 4
+    assert len(players_models) == number_players
+    assert all(model in FUZZ_MODELS for model in players_models)
+    assert any(model.makes_progress for model in players_models)
+    assert get_game_setup(seed) == (number_players, board_backend, players_models)
+
+
+def test_endless_game():
+    result = check_game(0, 2, "numpy", (Floor_dump_player, Floor_dump_player), max_plies=200)
+    assert result.check == "termination"
+    assert len(result.moves) == 201
+
+
+def test_illegal_move():
+    result = check_game(0, 2, "numpy", moves=[(0, 1, 0), (0, 1, 0)])
+    assert result.check == "exception"
+    assert result.moves == [(0, 1, 0), (0, 1, 0)]
+
+
+def test_shrink():
+    failures = [
+        result
+        for result in fuzz_games(range(10), shrink_failures=False, extra_checks=[full_floor_line])
+        if result.failed
+    ]
+    assert failures
+
+    for failure in failures:
+        assert failure.check == "full_floor_line"
+        shrunk = shrink(failure, extra_checks=[full_floor_line])
+
+        assert shrunk.check == "full_floor_line"
+        assert len(shrunk.moves) <= len(failure.moves)
+
+        replay = check_game(
+            shrunk.seed, shrunk.number_players, shrunk.board_backend,
+            moves=shrunk.moves, extra_checks=[full_floor_line],
+        )
+        assert replay.check == "full_floor_line"
+        assert replay.moves == shrunk.moves
@@ -0,0 +1,102 @@
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from game_engine.src.game_logic import Game_logic, Game_viewer
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+from game_engine.src.game_replay import Game_replay
+from game_engine.src.game_gui import Game_GUI, create_headless_screen, render_replay
+from game_engine.src.simulation_thread import Simulation_thread
+
+@pytest.fixture(scope="module")
+def screen():
+    screen = create_headless_screen()
+    yield screen
+    pygame.display.quit()
+
+
+def new_game(seed, num_players):
+    game_logic = Game_logic(number_players=num_players, seed=seed)
+    game_view = Game_viewer(game_logic)
+    players = [Dummy_player(game_view, i) for i in range(num_players)]
+    return Game_state_machine(game_logic, players)
+
+
+def full_frame(screen, game_logic):
+    """ Frame drawn from scratch by a new GUI """
+    game_gui = Game_GUI(screen, game_viewer=Game_viewer(game_logic, read_only=True))
+    game_gui.render()
+    return pygame.image.tobytes(screen, "RGB")
+
+
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 4]
+)
+def test_dirty_rects_match_full_redraw(screen, num_players):
+    game_state = new_game(0, num_players)
+    game_gui = Game_GUI(screen, game_state)
+
+    assert game_gui.render() == [screen.get_rect()]
+    assert game_gui.render() == []
+
+    while game_state.state != Game_states.GAME_END:
+        game_state.next()
+        game_gui.render()
+        incremental_frame = pygame.image.tobytes(screen, "RGB")
+
+        assert incremental_frame == full_frame(screen, game_state.game_logic)
+
+        # Restore the screen of the incremental GUI
+        game_gui.invalidate()
+        game_gui.render()
+
+
+def test_only_changed_regions_are_redrawn(screen):
+    game_state = new_game(1, 2)
+    game_gui = Game_GUI(screen, game_state)
+    game_state.next()
+    game_gui.render()
+
+    # The first move changes one factory, the center and the board of the player
+    game_state.next()
+    dirty_rects = game_gui.render()
+    changed_regions = [
+        region
+        for region, rect in game_gui.regions.items()
+        if rect in dirty_rects
+    ]
+    assert 2 <= len(changed_regions) <= 3
+    assert ("board", 0) in changed_regions
+    assert ("board", 1) not in changed_regions
+    assert any(region[0] == "factory" for region in changed_regions)
+
+
+def test_render_replay(screen, tmp_path):
+    game_state = new_game(2, 2)
+    moves = []
+    while game_state.state != Game_states.GAME_END:
+        game_state.next()
+        if game_state.state == Game_states.PLAYER_MOVE:
+            moves.append(game_state.last_move)
+
+    replay = Game_replay(2, 2, moves)
+    frames = render_replay(replay, tmp_path / "frames", screen)
+
+    assert frames == len(moves) + 1
+    assert len(list((tmp_path / "frames").glob("frame_*.png"))) == frames
+
+
+def test_render_snapshots(screen):
+    simulation = Simulation_thread(new_game(3, 4), ply_rate=None, max_snapshots=1000)
+    simulation.start()
+    simulation.join(timeout=10)
+
+    first = simulation.snapshots.get()
+    game_gui = Game_GUI(screen, game_viewer=first)
+    assert game_gui.render() == [screen.get_rect()]
+
+    while not simulation.snapshots.empty():
+        game_gui.set_game_viewer(simulation.snapshots.get())
+        assert len(game_gui.render()) <= len(game_gui.regions)
@@ -0,0 +1,70 @@
+import json
+import pytest
+from game_engine.src.game_logic import Player_model
+from game_engine.src.game_profiler import Game_profiler
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.models.fuzz_models import Random_legal_player
+from game_engine.src.run_simulation import run_simulation
+
+
+class Rejection_sampling_player(Player_model):
+    """ Tries random moves until one is valid """
+    def player_move(self):
+        num_factories = len(self.game_viewer.get_factories())
+        while True:
+            move = (int(self.rng.integers(-1, num_factories)), int(self.rng.integers(1, 6)), int(self.rng.integers(-1, 5)))
+            if self.validate_player_move(*move):
+                return move
+
+
+@pytest.mark.parametrize("number_players", [2, 3, 4])
+@pytest.mark.parametrize("seed", range(3))
+def test_profiler_does_not_change_the_game(number_players, seed):
+    players_models = [Dummy_player]*number_players
+    profiler = Game_profiler()
+    assert run_simulation(players_models, seed=seed, profiler=profiler) == run_simulation(players_models, seed=seed)
+
+    assert profiler.games == 1
+    assert set(profiler.phases) == {"fill_factory", "player_move", "round_end", "wall_tiling", "game_end"}
+    rounds = profiler.phases["fill_factory"].calls
+    assert profiler.phases["round_end"].calls == rounds
+    assert profiler.phases["wall_tiling"].calls == rounds
+    assert profiler.phases["player_move"].calls == profiler.models["Dummy_player"].think.calls >= rounds
+
+
+def test_rejected_attempts():
+    profiler = Game_profiler()
+    for seed in range(3):
+        run_simulation([Rejection_sampling_player, Random_legal_player], seed=seed, profiler=profiler)
+
+    assert profiler.games == 3
+    # Random_legal_player only chooses among the legal moves
+    assert profiler.models["Rejection_sampling_player"].rejected_attempts > 0
+    assert profiler.models["Random_legal_player"].rejected_attempts == 0
+    assert profiler.rejected_attempts == profiler.models["Rejection_sampling_player"].rejected_attempts
+
+
+def test_exports(tmp_path):
+    profiler = Game_profiler()
+    run_simulation([Dummy_player]*2, seed=1, profiler=profiler)
+
+    other = Game_profiler()
+    run_simulation([Dummy_player]*2, seed=2, profiler=other)
+    moves = profiler.models["Dummy_player"].think.calls + other.models["Dummy_player"].think.calls
+    profiler.merge(other)
+    assert profiler.games == 2
+    assert profiler.models["Dummy_player"].think.calls == moves
+
+    profiler.save_json(tmp_path / "profile.json")
+    summary = json.loads((tmp_path / "profile.json").read_text())
+    assert summary["games"] == 2
+    assert summary["models"]["Dummy_player"]["moves"] == moves
+    assert summary["rejected_attempts"] == profiler.rejected_attempts
+
+    profiler.save_folded(tmp_path / "profile.folded")
+    stacks = dict(line.rsplit(" ", 1) for line in (tmp_path / "profile.folded").read_text().splitlines())
+    assert set(stacks) == {
+        "game;fill_factory", "game;round_end", "game;wall_tiling", "game;game_end",
+        "game;player_move;think;Dummy_player", "game;player_move;apply;Dummy_player",
+    }
+    assert all(int(microseconds) >= 0 for microseconds in stacks.values())
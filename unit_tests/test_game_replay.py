@@ -0,0 +1,130 @@
+import pytest
+import copy
+import random
+
+from game_engine.src.game_logic import Game_logic, Game_viewer
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+from game_engine.src.game_replay import Game_replay
+from game_engine.src.trajectory_recorder import Trajectory_recorder, Trajectory_reader
+
+def game_state(game_logic: Game_logic):
+    return (
+        game_logic.zobrist_hash,
+        game_logic.side_to_move,
+        [list(factory) for factory in game_logic.factories],
+        list(game_logic.center_tiles),
+        list(game_logic.bag_tiles),
+        list(game_logic.discarted_tiles),
+        [(int(board.score), board.wall.tolist(), board.floor_line.tolist()) for board in game_logic.players_boards],
+    )
+
+
+class Logged_player(Dummy_player):
+    """ Saves the move and the state of the game before each move """
+    def __init__(self, game_viewer, player_index, log):
+        super().__init__(game_viewer, player_index)
+        self.log = log
+
+    def player_move(self):
+        state = game_state(self.game_viewer.game_logic)
+        move = super().player_move()
+        self.log.append((move, state))
+        return move
+
+
+def play_game(seed, num_players, recorder=None):
+    game_logic = Game_logic(number_players=num_players, seed=seed)
+    game_view = Game_viewer(game_logic)
+    log = []
+    players = [Logged_player(game_view, i, log) for i in range(num_players)]
+
+    game_state_machine = Game_state_machine(game_logic, players, recorder=recorder)
+    while game_state_machine.state != Game_states.GAME_END:
+        game_state_machine.next()
+
+    return log, game_state(game_logic)
+
+
+@pytest.mark.parametrize(
+    "checkpoint_interval",
+    [1, 7, 16]
+)
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 3, 4]
+)
+@pytest.mark.parametrize(
+    "seed",
+    [i for i in range(3)]
+)
+def test_replay_matches_the_game(checkpoint_interval, num_players, seed):
+    log, final_state = play_game(seed, num_players)
+    moves = [move for move, _ in log]
+
+    replay = Game_replay(seed, num_players, moves, checkpoint_interval=checkpoint_interval)
+    assert game_state(replay.seek(len(replay))) == final_state
+
+    # Seek in any order, forwards and backwards
+    rng = random.Random(seed)
+    plies = list(range(len(moves)))
+    rng.shuffle(plies)
+    for ply in plies:
+        assert game_state(replay.seek(ply)) == log[ply][1]
+        assert replay.ply == ply
+
+    for ply, checkpoint in replay.checkpoints.items():
+        expected = final_state if ply == len(moves) else log[ply][1]
+        assert game_state(checkpoint) == expected
+
+
+def test_replay_does_not_depend_on_the_global_random():
+    log, final_state = play_game(3, 2)
+    moves = [move for move, _ in log]
+
+    random.seed(1000)
+    first = Game_replay(3, 2, moves)
+    random.seed(2000)
+    second = Game_replay(3, 2, moves)
+
+    assert game_state(first.game_logic) == game_state(second.game_logic) == final_state
+
+
+def test_state_at_is_a_copy():
+    log, _ = play_game(0, 2)
+    replay = Game_replay(0, 2, [move for move, _ in log], checkpoint_interval=4)
+
+    state = replay.state_at(10)
+    expected = copy.deepcopy(game_state(state))
+    replay.seek(20)
+    replay.seek(2)
+    assert game_state(state) == expected == log[10][1]
+
+
+def test_invalid_moves():
+    log, _ = play_game(0, 2)
+    moves = [move for move, _ in log]
+
+    with pytest.raises(ValueError):
+        Game_replay(0, 2, moves + [moves[-1]])
+
+    with pytest.raises(ValueError):
+        Game_replay(0, 2, [(0, 1, 0), (0, 1, 0)])
+
+    replay = Game_replay(0, 2, moves)
+    with pytest.raises(ValueError):
+        replay.seek(len(moves) + 1)
+
+
+def test_replay_from_trajectory(tmp_path):
+    path = tmp_path / "games.azt"
+    games = []
+    with Trajectory_recorder(path) as recorder:
+        for seed in range(3):
+            games.append(play_game(seed, 2 + seed, recorder))
+
+    reader = Trajectory_reader(path)
+    for game_id, (log, final_state) in enumerate(games):
+        replay = Game_replay.from_trajectory(reader, game_id)
+        assert replay.number_players == 2 + game_id
+        assert game_state(replay.seek(len(replay))) == final_state
@@ -0,0 +1,100 @@
+import pytest
+import numpy as np
+
+from game_engine.src.game_logic import Game_logic, Game_viewer
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 4]
+)
+def test_read_only_views_follow_the_game(board_backend, num_players):
+    game_logic = Game_logic(number_players=num_players, seed=2, board_backend=board_backend)
+    game_view = Game_viewer(game_logic)
+    read_only_view = Game_viewer(game_logic, read_only=True)
+    players = [Dummy_player(read_only_view, i) for i in range(num_players)]
+
+    floor_line = read_only_view.get_player_floor_lines(0)
+    pattern_lines = read_only_view.get_player_pattern_lines(0)
+
+    game_state = Game_state_machine(game_logic, players)
+    while game_state.state != Game_states.GAME_END:
+        game_state.next()
+
+        assert read_only_view.get_factories() == tuple(tuple(factory) for factory in game_view.get_factories())
+        assert read_only_view.get_center_tiles() == tuple(game_view.get_center_tiles())
+        assert read_only_view.get_bag_tiles() == tuple(game_view.get_bag_tiles())
+        assert read_only_view.get_discarted_tiles() == tuple(game_view.get_discarted_tiles())
+
+        for player_index in range(num_players):
+            assert np.array_equal(read_only_view.get_player_wall(player_index), game_view.get_player_wall(player_index))
+            for row, other_row in zip(read_only_view.get_player_pattern_lines(player_index), game_view.get_player_pattern_lines(player_index)):
+                assert np.array_equal(row, other_row)
+
+        # The views are not copies, they always show the current state
+        assert read_only_view.get_player_floor_lines(0) is floor_line
+        assert np.array_equal(floor_line, game_view.get_player_floor_lines(0))
+        assert read_only_view.get_player_pattern_lines(0)[4] is pattern_lines[4]
+
+    with pytest.raises(ValueError):
+        read_only_view.get_player_wall(0)[0, 0] = 1
+    with pytest.raises(ValueError):
+        read_only_view.get_player_pattern_lines(0)[0][0] = 1
+    with pytest.raises(ValueError):
+        read_only_view.get_players_floor_lines()[1][0] = 1
+
+
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+def test_wall_views(board_backend):
+    game_logic = Game_logic(number_players=2, seed=0, board_backend=board_backend)
+    read_only_view = Game_viewer(game_logic, read_only=True)
+    board = game_logic.players_boards[0]
+
+    wall = read_only_view.get_player_wall(0)
+    board.place_tile_on_wall(0, 1)
+
+    assert np.count_nonzero(read_only_view.get_player_wall(0)) == 1
+    # Only the numpy backend gives a view of the wall, the bitboard wall is a snapshot
+    assert np.count_nonzero(wall) == (1 if board_backend == "numpy" else 0)
+
+
+def test_snapshot():
+    game_logic = Game_logic(number_players=3, seed=4)
+    game_view = Game_viewer(game_logic)
+    players = [Dummy_player(game_view, i) for i in range(3)]
+    game_state = Game_state_machine(game_logic, players)
+    for _ in range(10):
+        game_state.next()
+
+    layout = game_view.get_snapshot_layout()
+    snapshot = game_view.snapshot()
+    assert snapshot.dtype == np.int16
+    assert snapshot.shape == (layout["size"],)
+    assert snapshot.flags["C_CONTIGUOUS"]
+
+    def part(name):
+        part_slice, shape = layout[name]
+        return snapshot[part_slice].reshape(shape)
+
+    assert part("factories").tolist() == game_logic.factories_counts
+    assert part("center").tolist() == game_logic.center_counts
+    assert part("bag").sum() == len(game_logic.bag_tiles)
+    assert part("discarted").sum() == len(game_logic.discarted_tiles)
+    for player_index, board in enumerate(game_logic.players_boards):
+        assert np.array_equal(part("walls")[player_index], board.wall)
+        assert np.array_equal(part("floor_lines")[player_index], board.floor_line)
+        for row, actual_row in enumerate(board.pattern_lines):
+            assert part("pattern_lines")[player_index, row, 1] == np.count_nonzero(actual_row)
+    assert part("side_to_move")[0] == game_logic.side_to_move
+
+    out = np.zeros(layout["size"], dtype=np.int16)
+    assert game_view.snapshot(out) is out
+    assert np.array_equal(out, snapshot)
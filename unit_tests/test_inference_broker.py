@@ -0,0 +1,94 @@
+import functools
+import pytest
+import numpy as np
+
+from game_engine.src.batch_game_logic import Batch_game_logic
+from game_engine.src.inference_broker import Inference_broker
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.models.policy_model import Policy_network, Policy_player, get_number_moves, move_index
+from game_engine.src.observation_encoder import Observation_encoder
+from game_engine.src.async_driver import Async_game_driver
+from game_engine.src.run_simulation import run_simulation
+
+
+@pytest.mark.parametrize(
+    "batch_size",
+    [1, 4, 16]
+)
+def test_broker_batches(batch_size):
+    observations = np.arange(40, dtype=np.float32).reshape(10, 4)
+    calls = []
+
+    def forward(batch):
+        calls.append(len(batch))
+        return batch*2
+
+    broker = Inference_broker(forward, batch_size=batch_size, max_delay=0.01)
+    futures = [broker.submit(observation) for observation in observations]
+    with broker:
+        results = [future.result() for future in futures]
+
+    assert np.array_equal(np.array(results), observations*2)
+    assert calls == [min(batch_size, 10 - i) for i in range(0, 10, batch_size)]
+    assert broker.batches == len(calls) and broker.evaluations == 10
+
+    with pytest.raises(RuntimeError):
+        broker.submit(observations[0])
+
+
+def test_broker_errors():
+    def forward(batch):
+        raise ValueError("wrong observation")
+
+    with Inference_broker(forward) as broker:
+        with pytest.raises(ValueError):
+            broker.evaluate(np.zeros(3))
+    with pytest.raises(ValueError):
+        Inference_broker(forward, batch_size=0)
+
+
+def test_stop_without_start():
+    broker = Inference_broker(lambda batch: batch)
+    futures = [broker.submit(np.zeros(3)) for _ in range(3)]
+    futures[1].cancel()
+    broker.stop()
+
+    assert futures[1].cancelled()
+    for future in (futures[0], futures[2]):
+        with pytest.raises(RuntimeError):
+            future.result(timeout=1)
+
+
+def test_move_index():
+    batch = Batch_game_logic(number_players=3, seeds=[0])
+    index = np.arange(get_number_moves(batch.factories_num))
+    moves = zip(*(values.tolist() for values in batch.moves_from_index(index)))
+    assert [move_index(*move) for move in moves] == index.tolist()
+
+
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 4]
+)
+def test_async_games_same_as_sync_games(num_players):
+    seeds = [i for i in range(8)]
+    encoder = Observation_encoder(num_players, 5 if num_players == 2 else 9)
+    network = Policy_network(encoder.size, encoder.factories_num, seed=num_players)
+
+    with Inference_broker(network.forward, batch_size=len(seeds), max_delay=0.005) as broker:
+        policy_player = functools.partial(Policy_player, broker=broker)
+        results = Async_game_driver([policy_player]*num_players, seeds).run()
+        async_scores = [list(result.scores) for result in results]
+        assert broker.mean_batch_size > 1
+
+    # One game at a time, there is nothing to wait for
+    with Inference_broker(network.forward, batch_size=1) as broker:
+        policy_player = functools.partial(Policy_player, broker=broker)
+        sync_scores = [run_simulation([policy_player]*num_players, seed=seed) for seed in seeds]
+
+    assert async_scores == sync_scores
+
+    # Models without async_player_move are played as usual
+    assert [list(result.scores) for result in Async_game_driver([Dummy_player]*num_players, seeds).run()] == [
+        run_simulation([Dummy_player]*num_players, seed=seed) for seed in seeds
+    ]
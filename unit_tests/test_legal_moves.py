@@ -0,0 +1,93 @@
+import pytest
+import random
+
+from game_engine.src.game_logic import Game_logic, Game_viewer, Player_model
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+
+def floor_only_tile(game_viewer, player_index, tile_type):
+    """ True when no row of the pattern lines that is not full can take the tiles """
+    wall = game_viewer.get_player_wall(player_index)
+    for row, pattern_line in enumerate(game_viewer.get_player_pattern_lines(player_index)):
+        if pattern_line[-1] == 0 and pattern_line[0] in (0, tile_type) and tile_type not in wall[row]:
+            return False
+    return True
+
+
+class Checked_legal_moves_player(Player_model):
+    """ Compares the legal moves with every move accepted by validate_player_move """
+    def __init__(self, game_viewer, player_index, rng):
+        super().__init__(game_viewer, player_index)
+        self.rng = rng
+
+    def player_move(self):
+        expected_moves = {
+            (factory_index, tile_type, row_index)
+            for factory_index in range(-1, len(self.game_viewer.get_factories()))
+            for tile_type in range(1, 6)
+            for row_index in range(-1, 5)
+            if self.validate_player_move(factory_index, tile_type, row_index)
+        }
+        legal_moves = self.legal_moves()
+
+        assert len(legal_moves) == len(set(legal_moves))
+        assert set(legal_moves) == expected_moves
+        # The cache gives the same object while the state does not change
+        assert self.legal_moves() is legal_moves
+
+        # The moves of Dummy_player, the floor line only when the tiles cannot be laid on a row that is not full
+        expected_restricted_moves = {
+            move for move in expected_moves
+            if move[2] != -1 or floor_only_tile(self.game_viewer, self.player_index, move[1])
+        }
+        restricted_moves = self.floor_restricted_moves()
+        assert set(restricted_moves) == expected_restricted_moves
+        assert {move[:2] for move in restricted_moves} == {move[:2] for move in legal_moves}
+
+        return self.rng.choice(legal_moves)
+
+
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 3, 4]
+)
+@pytest.mark.parametrize(
+    "seed",
+    [i for i in range(5)]
+)
+def test_legal_moves_match_validation(board_backend, num_players, seed):
+    game_logic = Game_logic(number_players=num_players, seed=seed, board_backend=board_backend)
+    game_view = Game_viewer(game_logic)
+    rng = random.Random(seed)
+    players = [Checked_legal_moves_player(game_view, i, rng) for i in range(num_players)]
+
+    game_state = Game_state_machine(game_logic, players)
+    while game_state.state != Game_states.GAME_END:
+        game_state.next()
+
+
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+def test_legal_moves_follow_wall_assignment(board_backend):
+    game_logic = Game_logic(number_players=2, seed=0, board_backend=board_backend)
+    game_logic.fill_factories()
+    game_view = Game_viewer(game_logic)
+    board = game_logic.players_boards[0]
+    tile_type = int(game_logic.factories[0][0])
+
+    legal_moves = game_logic.legal_moves(0)
+    restricted_moves = game_logic.floor_restricted_moves(0)
+    assert (0, tile_type, 0) in legal_moves and (0, tile_type, 0) in restricted_moves
+
+    wall = board.wall.copy()
+    wall[0, board.wall_default_pattern[0] == tile_type] = tile_type
+    board.wall = wall
+
+    assert not game_view.validate_player_move(0, 0, tile_type, 0)
+    assert (0, tile_type, 0) not in game_logic.legal_moves(0)
+    assert (0, tile_type, 0) not in game_logic.floor_restricted_moves(0)
@@ -0,0 +1,121 @@
+import functools
+import pytest
+
+from game_engine.src.game_logic import Game_logic, Count_game_logic, Game_viewer
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.models.mcts_model import Mcts_player
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+from game_engine.src.shared_arena import Arena_simulation
+
+@pytest.mark.parametrize(
+    "rollout_rounds",
+    [1, 2]
+)
+@pytest.mark.parametrize(
+    "seed",
+    [i for i in range(3)]
+)
+def test_mcts_plays_full_game(rollout_rounds, seed):
+    game_logic = Game_logic(number_players=2, seed=seed)
+    game_view = Game_viewer(game_logic)
+    mcts_player = Mcts_player(game_view, 0, iterations=30, rollout_rounds=rollout_rounds)
+    players = [mcts_player, Dummy_player(game_view, 1)]
+
+    game_state = Game_state_machine(game_logic, players)
+    while game_state.state != Game_states.GAME_END:
+        zobrist_hash = game_logic.zobrist_hash
+        game_state.next()
+        if game_state.state == Game_states.PLAYER_MOVE and game_state.current_player_index == 0:
+            # The search does not change the real game
+            assert game_logic.zobrist_hash == game_logic.compute_zobrist_hash()
+
+    assert game_logic.zobrist_hash == game_logic.compute_zobrist_hash()
+    assert game_logic.players_boards[0].score > 0
+
+
+def test_mcts_search_stats_and_parallel_workers():
+    game_logic = Game_logic(number_players=3, seed=1)
+    game_logic.fill_factories()
+    game_view = Game_viewer(game_logic)
+
+    for workers in [1, 2]:
+        mcts_player = Mcts_player(game_view, 0, iterations=20, workers=workers)
+        move = mcts_player.player_move()
+        mcts_player.close()
+
+        assert move in game_view.legal_moves(0)
+        assert mcts_player.last_search_stats["iterations"] == 20*workers
+        assert mcts_player.last_search_stats["nodes_per_second"] > 0
+
+
+def test_mcts_workers_stop_with_the_player():
+    game_logic = Game_logic(number_players=2, seed=2)
+    game_logic.fill_factories()
+    mcts_player = Mcts_player(Game_viewer(game_logic), 0, iterations=5, workers=2)
+    mcts_player.player_move()
+    executor = mcts_player.executor
+
+    del mcts_player
+    with pytest.raises(RuntimeError):
+        executor.submit(abs, 1)
+
+
+def test_mcts_reuses_tree():
+    game_logic = Game_logic(number_players=2, seed=3)
+    game_logic.fill_factories()
+    game_view = Game_viewer(game_logic)
+    mcts_player = Mcts_player(game_view, 0, iterations=300)
+
+    move = mcts_player.player_move()
+    game_logic.apply_move(0, *move)
+    opponent_move = next(iter(mcts_player.previous_root.children)).move
+    game_logic.apply_move(1, *opponent_move)
+
+    reused_node = mcts_player.previous_root.find_state(game_logic.zobrist_hash, 2)
+    assert reused_node is not None
+    visits = reused_node.visits
+
+    mcts_player.player_move()
+    assert mcts_player.last_search_stats["iterations"] == 300
+    assert reused_node.visits == visits + 300
+
+
+def empty_bag_into_discards(game_logic):
+    """ The next fill_factories refills the bag from the discard pile with the random generator of the game """
+    game_logic.discarted_tiles = list(game_logic.discarted_tiles) + list(game_logic.bag_tiles)
+    game_logic.bag_tiles = []
+    game_logic.discarted_counts = [20]*5
+    game_logic.bag_counts = [0]*5
+
+
+@pytest.mark.parametrize(
+    "game_logic_class",
+    [Game_logic, Count_game_logic]
+)
+@pytest.mark.parametrize(
+    "empty_bag",
+    [False, True]
+)
+def test_determinizations_refill_differently(game_logic_class, empty_bag):
+    game_logic = game_logic_class(number_players=2, seed=4)
+    if empty_bag:
+        empty_bag_into_discards(game_logic)
+    mcts_player = Mcts_player(Game_viewer(game_logic), 0, seed=1)
+
+    refills = []
+    for _ in range(5):
+        determinized_game = mcts_player.determinized_game()
+        determinized_game.fill_factories()
+        refills.append(determinized_game.factories)
+    game_logic.fill_factories()
+    refills.append(game_logic.factories)
+
+    assert len({str(factories) for factories in refills}) == len(refills)
+
+
+def test_mcts_player_in_arena():
+    # step_arena_games gives each player a numpy Generator of its own
+    players_models = [functools.partial(Mcts_player, iterations=10), Dummy_player]
+    with Arena_simulation(players_models, 2, seed=3, max_workers=1, number_moves=6) as simulation:
+        assert simulation.step() == 2
+        assert simulation.arena.plies.tolist() == [6]*2
@@ -0,0 +1,104 @@
+import warnings
+import numpy as np
+import pytest
+
+from game_engine.src.game_logic import Game_logic, Game_viewer, Move_rejection, WALL_COLUMN, describe_rejection
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+
+
+def get_game(board_backend="numpy", count_rejections=False):
+    game_logic = Game_logic(number_players=2, seed=3, board_backend=board_backend, count_rejections=count_rejections)
+    game_logic.fill_factories()
+    return game_logic
+
+
+@pytest.mark.parametrize("board_backend", ["numpy", "bitboard"])
+def test_rejection_codes(board_backend):
+    game_logic = get_game(board_backend)
+    game_viewer = Game_viewer(game_logic)
+    board = game_logic.players_boards[0]
+
+    missing_tile = next(tile for tile in range(1, 6) if game_logic.factories_counts[0][tile - 1] == 0)
+    tile_type = game_logic.factories[0][0]
+    other_tile = next(tile for tile in range(1, 6) if tile != tile_type)
+
+    assert game_viewer.player_move_rejection(0, game_logic.factories_num, tile_type, 0) == Move_rejection.INVALID_FACTORY
+    assert game_viewer.player_move_rejection(0, -2, tile_type, 0) == Move_rejection.INVALID_FACTORY
+    assert game_viewer.player_move_rejection(0, 0, 6, 0) == Move_rejection.INVALID_TILE
+    assert game_viewer.player_move_rejection(0, 0, missing_tile, 0) == Move_rejection.TILE_NOT_IN_FACTORY
+    assert game_viewer.player_move_rejection(0, -1, tile_type, 0) == Move_rejection.TILE_NOT_IN_FACTORY
+
+    board.pattern_lines[4][0] = other_tile
+    assert game_viewer.player_move_rejection(0, 0, tile_type, 4) == Move_rejection.ROW_HAS_OTHER_TILE
+    wall = board.wall.copy()
+    wall[3, WALL_COLUMN[3][tile_type]] = tile_type
+    board.wall = wall
+    assert game_viewer.player_move_rejection(0, 0, tile_type, 3) == Move_rejection.TILE_ON_WALL_ROW
+    assert game_viewer.player_move_rejection(0, 0, tile_type, 2) == Move_rejection.NONE
+    assert game_viewer.player_move_rejection(0, 0, tile_type, -1) == Move_rejection.NONE
+
+    assert board.laying_tiles_rejection(2, [tile_type, other_tile]) == Move_rejection.MIXED_TILES
+    assert not board.validate_laying_tiles(2, [tile_type, other_tile])
+    assert board.validate_laying_tiles(2, [tile_type])
+
+
+def test_validation_matches_legal_moves():
+    game_logic = get_game()
+    game_viewer = Game_viewer(game_logic)
+
+    legal_moves = set(game_logic.legal_moves(0))
+    for factory_index in range(-1, game_logic.factories_num):
+        for tile_type in range(1, 6):
+            for row_index in range(-1, 5):
+                move = (factory_index, tile_type, row_index)
+                assert game_viewer.validate_player_move(0, *move) == (move in legal_moves)
+
+
+def test_rejection_counts():
+    game_logic = get_game(count_rejections=True)
+    game_viewer = Game_viewer(game_logic)
+    assert Game_viewer(get_game()).get_rejection_counts() is None
+
+    game_viewer.validate_player_move(0, 0, 6, 0)
+    game_viewer.validate_player_move(0, 0, 6, 1)
+    game_viewer.validate_player_move(0, *game_logic.legal_moves(0)[0])
+
+    rejection_counts = game_viewer.get_rejection_counts()
+    assert rejection_counts["INVALID_TILE"] == 2
+    assert rejection_counts["NONE"] == 1
+    assert sum(rejection_counts.values()) == 3
+
+
+def test_describe():
+    game_logic = get_game()
+    game_viewer = Game_viewer(game_logic)
+
+    assert game_viewer.describe_player_move(0, 0, 6, 0) == "Invalid type of tile 6"
+    assert game_viewer.describe_player_move(0, 99, 1, 0) == "Invalid factory num 99"
+    assert game_viewer.describe_player_move(0, *game_logic.legal_moves(0)[0]) == "Valid move"
+    assert "required tile 1" in describe_rejection(Move_rejection.TILE_NOT_IN_FACTORY, tile_type=1)
+
+
+@pytest.mark.parametrize("number_players", [2, 3, 4])
+def test_games_do_not_warn(number_players):
+    game_logic = Game_logic(number_players=number_players, seed=number_players, count_rejections=True)
+    game_viewer = Game_viewer(game_logic)
+    players = [Dummy_player(game_viewer, i) for i in range(number_players)]
+    game_state = Game_state_machine(game_logic, players)
+
+    rng = np.random.default_rng(number_players)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        while game_state.state != Game_states.GAME_END:
+            game_state.next()
+            # Random moves like the ones tried by a model that validates its moves
+            for _ in range(10):
+                game_viewer.validate_player_move(
+                    game_state.current_player_index,
+                    int(rng.integers(-1, game_logic.factories_num)), int(rng.integers(1, 6)), int(rng.integers(-1, 5))
+                )
+
+    rejection_counts = game_viewer.get_rejection_counts()
+    assert rejection_counts["NONE"] > 0
+    assert sum(rejection_counts.values()) > rejection_counts["NONE"]
@@ -1,6 +1,4 @@
 import pytest
-import pandas as pd
-import sys 
 from pathlib import Path
 ROOT = Path(__file__).resolve().parent.parent
 
@@ -10,52 +8,8 @@ ROOT = Path(__file__).resolve().parent.parent
 
 # from models.dummy_model import Dummy_model
 from game_engine.src.models.dummy_model import Dummy_player
-from game_engine.src.game_logic import Game_logic, Game_viewer
+from game_engine.src.game_logic import Game_logic, Count_game_logic, Game_viewer
 from game_engine.src.run_simulation import Game_state_machine, Game_states
-from icecream import ic
-import numpy as np
-from collections import Counter
-import warnings
-warnings.filterwarnings("ignore")
-
-def validate_game_view(game_view: Game_viewer):
-    players_walls = game_view.get_players_wall()
-    players_line_patterns = game_view.get_players_pattern_lines()
-    players_floors = game_view.get_players_floor_lines()
-
-    center_tiles = game_view.get_center_tiles()
-    bag_tiles = game_view.get_bag_tiles()
-    discarted_tiles = game_view.get_discarted_tiles()
-    factories_tiles = game_view.get_factories()
-
-    all_tiles = center_tiles + bag_tiles + discarted_tiles
-
-    for tiles in players_walls:
-        all_tiles += list(tiles[tiles != 0])
-
-    for player_line_patterns in players_line_patterns:
-        for tiles in player_line_patterns:
-            all_tiles += list(tiles[tiles != 0])
-
-    for tiles in players_floors:
-        all_tiles += list(tiles[tiles != 0])
-
-    for tiles in factories_tiles:
-        all_tiles += tiles
-
-    if len(all_tiles) != 100:
-        raise RuntimeError(f"The total number of tiles is not 100, number of tiles: {len(all_tiles)}")
-    
-    all_tiles = np.array(all_tiles)
-
-    for i in range(1,6):
-        tiles_by_type = all_tiles[all_tiles == i]
-        if len(tiles_by_type) != 20:
-            raise RuntimeError(f"The number of tiles of type {i} is not equal to 20, total: {len(tiles_by_type)}")
-
-
-
-
 @pytest.mark.parametrize(
     "num_players",
     [1, 2, 3, 4]
@@ -65,7 +19,7 @@ def validate_game_view(game_view: Game_viewer):
     [i for i in range(100)]
 )
 def test_random_games_dummy_model(num_players, seed):
-    game_logic = Game_logic(number_players=num_players, seed=seed)
+    game_logic = Game_logic(number_players=num_players, seed=seed, check_invariants=True)
     game_view = Game_viewer(game_logic)
     players = []
     for i in range(num_players):
@@ -75,8 +29,70 @@ def test_random_games_dummy_model(num_players, seed):
 
     game_state = Game_state_machine(game_logic, players)
     while game_state.state != Game_states.GAME_END:
-        validate_game_view(game_view)
+        game_logic.check_tile_conservation()
         game_state.next()
 
+        # The slow recount is only done once per round
+        if game_state.state == Game_states.WALL_TILING:
+            game_logic.validate_game_logic()
+
+    game_logic.validate_game_logic()
+
+
+@pytest.mark.parametrize(
+    "game_logic_class",
+    [Game_logic, Count_game_logic]
+)
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+def test_undo_keeps_the_counters(game_logic_class, board_backend):
+    game_logic = game_logic_class(number_players=3, seed=4, board_backend=board_backend, check_invariants=True)
+    game_view = Game_viewer(game_logic)
+    players = [Dummy_player(game_view, i) for i in range(3)]
+
+    for _ in range(6):
+        fill_record = game_logic.apply_fill_factories()
+        move_records = []
+        while not game_logic.is_round_over():
+            player_index = game_logic.side_to_move
+            move = players[player_index].player_move()
+            move_records.append(game_logic.apply_move(player_index, *move))
+        tiling_record = game_logic.apply_wall_tiling()
+        game_logic.validate_game_logic()
+
+        game_logic.undo_wall_tiling(tiling_record)
+        for move_record in reversed(move_records):
+            game_logic.undo_move(move_record)
+        game_logic.undo_fill_factories(fill_record)
+        game_logic.validate_game_logic()
+
+        # Play the round again and keep it
+        game_logic.fill_factories()
+        while not game_logic.is_round_over():
+            player_index = game_logic.side_to_move
+            game_logic.apply_move(player_index, *players[player_index].player_move())
+        game_logic.apply_wall_tiling()
+        if game_logic.game_end:
+            break
+        game_logic.validate_game_logic()
+
+
+def test_lost_tiles_are_detected():
+    game_logic = Game_logic(number_players=2, seed=0, check_invariants=True)
+    game_logic.fill_factories()
+
+    game_logic.bag_tiles.pop()
+    with pytest.raises(RuntimeError):
+        game_logic.validate_game_logic()
+
+    game_logic = Game_logic(number_players=2, seed=0, check_invariants=True)
+    game_logic.bag_counts[0] -= 1
+    with pytest.raises(RuntimeError):
+        game_logic.check_tile_conservation()
+    with pytest.raises(RuntimeError):
+        game_logic.fill_factories()
+
 
     
\ No newline at end of file
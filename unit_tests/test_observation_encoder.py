@@ -0,0 +1,65 @@
+import pytest
+import random
+import numpy as np
+
+from game_engine.src.game_logic import Game_logic, Game_viewer
+from game_engine.src.batch_game_logic import Batch_game_logic
+from game_engine.src.observation_encoder import Observation_encoder
+
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 3, 4]
+)
+@pytest.mark.parametrize(
+    "dtype",
+    [np.float32, np.uint8]
+)
+def test_game_viewer_and_batch_same_observations(num_players, dtype):
+    seeds = [i for i in range(6)]
+    rng = random.Random(0)
+    games = [Game_logic(number_players=num_players, seed=seed) for seed in seeds]
+    for game_logic in games:
+        game_logic.fill_factories()
+    game_viewers = [Game_viewer(game_logic) for game_logic in games]
+    batch = Batch_game_logic(number_players=num_players, seeds=seeds)
+
+    encoder = Observation_encoder(num_players, games[0].factories_num, dtype)
+    out = encoder.new_buffer(len(seeds))
+
+    # Moves of the first round, before any random refill of the factories
+    for _ in range(4):
+        moves = []
+        for game_logic in games:
+            player_index = game_logic.side_to_move
+            move = rng.choice(game_logic.legal_moves(player_index))
+            game_logic.apply_move(player_index, *move)
+            moves.append(move)
+        moves = np.array(moves)
+        batch.apply_moves(moves[:, 0], moves[:, 1], moves[:, 2])
+
+        observations = encoder.encode_batch(game_viewers, out=out)
+        assert observations is out
+        assert np.array_equal(observations, encoder.encode_batch_game_logic(batch))
+
+    observation = encoder.encode(game_viewers[0], player_index=1)
+    assert observation.dtype == dtype
+    assert observation.shape == (encoder.size,)
+
+    walls_slice, _ = encoder.layout["walls"]
+    pattern_lines_slice, shape = encoder.layout["pattern_lines"]
+    pattern_lines = observation[pattern_lines_slice].reshape(shape)
+    board = games[0].players_boards[1]
+    for row, actual_row in enumerate(board.pattern_lines):
+        assert pattern_lines[0, row].sum() == np.count_nonzero(actual_row)
+
+    factories_slice, _ = encoder.layout["factories"]
+    assert observation[factories_slice].sum() == sum(map(sum, games[0].factories_counts))
+
+
+def test_encoder_checks_buffer():
+    encoder = Observation_encoder(2, 5, np.uint8)
+    game_viewer = Game_viewer(Game_logic(number_players=2, seed=1))
+    with pytest.raises(ValueError):
+        encoder.encode(game_viewer, out=np.zeros(encoder.size, dtype=np.float32))
+    with pytest.raises(ValueError):
+        Observation_encoder(2, 5, np.int64)
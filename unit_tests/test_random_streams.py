@@ -0,0 +1,62 @@
+import pytest
+import random
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from game_engine.src.game_logic import Game_logic, Game_viewer, player_seed_sequence
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import Game_state_machine, Game_states, run_simulation
+
+def new_game(seed, num_players):
+    game_logic = Game_logic(number_players=num_players, seed=seed)
+    game_view = Game_viewer(game_logic)
+    players = [Dummy_player(game_view, i) for i in range(num_players)]
+    return Game_state_machine(game_logic, players)
+
+
+def final_scores(game_state):
+    return [int(board.score) for board in game_state.game_logic.players_boards]
+
+
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 3, 4]
+)
+def test_interleaved_games_are_reproducible(num_players):
+    seeds = [0, 1, 2, 3]
+    expected = [run_simulation([Dummy_player]*num_players, seed=seed) for seed in seeds]
+
+    # All the games advance one step at a time in the same process
+    random.seed(1234)
+    np.random.seed(1234)
+    games = [new_game(seed, num_players) for seed in seeds]
+    while any(game.state != Game_states.GAME_END for game in games):
+        for game in games:
+            if game.state != Game_states.GAME_END:
+                game.next()
+                random.random()
+                np.random.random()
+
+    assert [final_scores(game) for game in games] == expected
+
+
+def test_games_in_threads_are_reproducible():
+    seeds = list(range(8))
+    expected = [run_simulation([Dummy_player]*2, seed=seed) for seed in seeds]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda seed: run_simulation([Dummy_player]*2, seed=seed), seeds))
+
+    assert results == expected
+
+
+def test_players_have_independent_streams():
+    game_logic = Game_logic(number_players=4, seed=5)
+    game_view = Game_viewer(game_logic)
+    players = [Dummy_player(game_view, i) for i in range(4)]
+
+    draws = [player.rng.integers(2**32, size=4).tolist() for player in players]
+    assert len({tuple(draw) for draw in draws}) == 4
+
+    same_player = np.random.default_rng(player_seed_sequence(5, 2))
+    assert same_player.integers(2**32, size=4).tolist() == draws[2]
@@ -0,0 +1,72 @@
+import pytest
+import numpy as np
+
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.shared_arena import Arena_simulation, Shared_game_arena, step_arena_games
+from unit_tests.test_undo_move import full_state
+
+
+@pytest.mark.parametrize(
+    "num_players",
+    [1, 2, 3, 4]
+)
+def test_arena_keeps_the_games(num_players):
+    with Shared_game_arena(num_players, 5) as arena:
+        for game_index in range(5):
+            arena.reset(game_index, seed=game_index)
+        step_arena_games(arena.name, [Dummy_player]*num_players, [1, 3], number_moves=30)
+
+        assert arena.plies.tolist() == [0, 30, 0, 30, 0]
+        for game_index in range(5):
+            game_logic = arena.load(game_index)
+            assert game_logic.seed == game_index
+            assert arena.scores[game_index].tolist() == [board.score for board in game_logic.players_boards]
+            game_logic.validate_game_logic()
+
+        # Another arena on the same block sees the same games
+        attached = Shared_game_arena.attach(arena.name)
+        assert (attached.number_players, attached.number_games) == (num_players, 5)
+        assert attached.snapshot(3) == arena.snapshot(3)
+        game_logic = attached.load(3)
+        assert full_state(game_logic) == full_state(arena.load(3))
+
+        step_arena_games(arena.name, [Dummy_player]*num_players, [3])
+        assert attached.game_end[3] and arena.game_end[3]
+        assert attached.scores[3].tolist() == arena.scores[3].tolist()
+        attached.close()
+        name = arena.name
+
+    with pytest.raises(FileNotFoundError):
+        Shared_game_arena.attach(name)
+
+
+def test_same_games_whatever_the_workers():
+    players_models = [Dummy_player, Dummy_player, Dummy_player]
+    results = []
+    for max_workers, chunk_size in ((1, 16), (2, 3)):
+        with Arena_simulation(players_models, 10, seed=5, max_workers=max_workers, number_moves=25, chunk_size=chunk_size) as simulation:
+            scores = simulation.run()
+            assert simulation.arena.game_end.all()
+            results.append((scores, simulation.arena.plies.tolist(), simulation.moves_played))
+
+    assert results[0] == results[1]
+    scores, plies, moves_played = results[0]
+    assert len(scores) == 10 and sum(plies) == moves_played
+
+
+def test_steps_of_the_simulation():
+    with Arena_simulation([Dummy_player]*2, 4, seed=2, max_workers=1, number_moves=10) as simulation:
+        assert simulation.step() == 4
+        assert simulation.arena.plies.tolist() == [10]*4
+
+        simulation.run()
+        assert np.all(simulation.arena.plies > 10)
+        assert simulation.step() == 0
+
+
+def test_arena_errors():
+    with pytest.raises(ValueError):
+        Shared_game_arena(2, 0)
+    with Shared_game_arena(2, 2) as arena:
+        with pytest.raises(IndexError):
+            arena.state(2)
@@ -0,0 +1,98 @@
+import pytest
+import time
+
+from game_engine.src.game_logic import Game_logic, Game_viewer
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import Game_state_machine, Game_states, run_simulation
+from game_engine.src.simulation_thread import Simulation_thread
+
+def new_game(seed, num_players):
+    game_logic = Game_logic(number_players=num_players, seed=seed)
+    game_view = Game_viewer(game_logic)
+    players = [Dummy_player(game_view, i) for i in range(num_players)]
+    return Game_state_machine(game_logic, players)
+
+
+def wait_snapshots(simulation, number, timeout=5.0):
+    snapshots = []
+    end_time = time.perf_counter() + timeout
+    while len(snapshots) < number and time.perf_counter() < end_time:
+        snapshot = simulation.latest_snapshot()
+        if snapshot is not None:
+            snapshots.append(snapshot)
+        time.sleep(0.001)
+    return snapshots
+
+
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 3, 4]
+)
+def test_fast_forward_to_the_end(num_players):
+    simulation = Simulation_thread(new_game(7, num_players), ply_rate=None, max_snapshots=1000)
+    simulation.start()
+    simulation.join(timeout=10)
+    assert not simulation.is_alive()
+
+    snapshots = []
+    while not simulation.snapshots.empty():
+        snapshots.append(simulation.snapshots.get())
+
+    assert snapshots[0].ply == 0
+    assert snapshots[-1].state == Game_states.GAME_END
+    assert snapshots[-1].game_end
+    assert snapshots[-1].get_scores() == run_simulation([Dummy_player]*num_players, seed=7)
+
+    plies = [snapshot.ply for snapshot in snapshots]
+    assert plies == sorted(plies)
+    assert plies[-1] == simulation.ply
+
+    with pytest.raises(ValueError):
+        snapshots[-1].array[0] = 1
+
+
+def test_pause_and_step():
+    simulation = Simulation_thread(new_game(0, 2), paused=True)
+    simulation.start()
+
+    first = wait_snapshots(simulation, 1)
+    assert len(first) == 1 and first[0].ply == 0
+    assert sum(map(len, first[0].get_factories())) == 20
+
+    time.sleep(0.05)
+    assert simulation.latest_snapshot() is None
+
+    simulation.step()
+    simulation.step()
+    snapshots = wait_snapshots(simulation, 1)
+    time.sleep(0.05)
+    latest = simulation.latest_snapshot()
+    if latest is not None:
+        snapshots.append(latest)
+    assert snapshots[-1].ply == 2
+
+    simulation.set_ply_rate(None)
+    simulation.play()
+    simulation.join(timeout=10)
+    assert simulation.game_state.state == Game_states.GAME_END
+
+
+def test_slow_reader_does_not_block_the_game():
+    simulation = Simulation_thread(new_game(1, 4), ply_rate=None, max_snapshots=2)
+    simulation.start()
+    simulation.join(timeout=10)
+
+    assert not simulation.is_alive()
+    assert simulation.snapshots.qsize() == 2
+    assert simulation.latest_snapshot().state == Game_states.GAME_END
+
+
+def test_stop():
+    simulation = Simulation_thread(new_game(2, 2), ply_rate=2.0)
+    simulation.start()
+    wait_snapshots(simulation, 1)
+    simulation.stop()
+    simulation.join(timeout=2)
+
+    assert not simulation.is_alive()
+    assert simulation.game_state.state != Game_states.GAME_END
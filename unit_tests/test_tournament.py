@@ -0,0 +1,35 @@
+import pytest
+
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import run_simulation
+from game_engine.src.tournament import Tournament, get_seats, summarize
+
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 3, 4]
+)
+def test_run_simulation(num_players):
+    scores = run_simulation([Dummy_player]*num_players, seed=3)
+    assert len(scores) == num_players
+    assert scores == run_simulation([Dummy_player]*num_players, seed=3)
+
+
+def test_seat_rotation():
+    assert [get_seats(3, game_index) for game_index in range(4)] == [
+        (0, 1, 2), (1, 2, 0), (2, 0, 1), (0, 1, 2)
+    ]
+    assert get_seats(3, 2, rotate_seats=False) == (0, 1, 2)
+
+
+def test_same_results_whatever_the_workers():
+    players_models = [Dummy_player, Dummy_player, Dummy_player]
+
+    one_worker = Tournament(players_models, 12, seed=5, max_workers=1).run_all()
+    two_workers = Tournament(players_models, 12, seed=5, max_workers=2, chunk_size=5).run_all()
+
+    assert one_worker == two_workers
+    assert [result.game_index for result in one_worker] == list(range(12))
+
+    summary = summarize(one_worker, 3)
+    assert summary["games"] == 12
+    assert sum(summary["wins"]) >= 12
@@ -0,0 +1,78 @@
+import pytest
+
+from game_engine.src.game_logic import Game_logic, Game_viewer
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+from game_engine.src.trajectory_recorder import Trajectory_recorder, Trajectory_reader, Record_kind, RECORD_DTYPE
+
+class Logged_player(Dummy_player):
+    def __init__(self, game_viewer, player_index, moves):
+        super().__init__(game_viewer, player_index)
+        self.moves = moves
+
+    def player_move(self):
+        move = super().player_move()
+        self.moves.append(move)
+        return move
+
+
+def play_recorded_game(recorder, seed, num_players):
+    game_logic = Game_logic(number_players=num_players, seed=seed)
+    game_view = Game_viewer(game_logic)
+    moves = []
+    players = [Logged_player(game_view, i, moves) for i in range(num_players)]
+
+    game_state = Game_state_machine(game_logic, players, recorder=recorder)
+    while game_state.state != Game_states.GAME_END:
+        game_state.next()
+    game_state.next()
+
+    return game_state.game_id, moves, [int(board.score) for board in game_logic.players_boards]
+
+
+def test_record_and_read(tmp_path):
+    path = tmp_path / "games.azt"
+    games = []
+    with Trajectory_recorder(path, chunk_records=64) as recorder:
+        for seed in range(5):
+            games.append((seed,) + play_recorded_game(recorder, seed, 2 + seed % 3))
+
+    # Append only, a second session continues with the next game id
+    with Trajectory_recorder(path, chunk_records=64) as recorder:
+        games.append((10,) + play_recorded_game(recorder, 10, 4))
+
+    reader = Trajectory_reader(path)
+    assert reader.records.dtype == RECORD_DTYPE
+    assert RECORD_DTYPE.itemsize == 16
+    assert len(reader) == reader.chunk_index["records"].sum()
+    assert len(reader.moves()) == sum(len(moves) for _, _, moves, _ in games)
+
+    for game_num, (seed, game_id, moves, scores) in enumerate(games):
+        assert game_id == game_num
+        assert reader.game_seed(game_id) == seed
+        assert reader.game_moves(game_id) == [tuple(int(value) for value in move) for move in moves]
+
+        records = reader.game_records(game_id)
+        assert records["kind"][0] == Record_kind.GAME_START
+        assert records["kind"][-1] == Record_kind.GAME_END
+        assert records["ply"][-1] == len(moves)
+
+        round_scores = records[records["kind"] == Record_kind.ROUND_SCORE]
+        last_round = round_scores["round"].max()
+        final_scores = round_scores[round_scores["round"] == last_round]
+        assert final_scores["value"].tolist() == scores
+
+
+def test_not_a_trajectory_file(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a trajectory file")
+    with pytest.raises(ValueError):
+        Trajectory_reader(path)
+
+
+@pytest.mark.parametrize("seed", [2**31, 2**32 + 5, -2**31 - 1])
+def test_seed_out_of_range(tmp_path, seed):
+    with Trajectory_recorder(tmp_path / "games.trj") as recorder:
+        with pytest.raises(ValueError):
+            recorder.start_game(seed, 2)
+        assert recorder.next_game_id == 0
@@ -0,0 +1,92 @@
+import pytest
+import random
+
+from game_engine.src.game_logic import Game_logic, Count_game_logic
+
+def full_state(game_logic: Game_logic):
+    boards = []
+    for board in game_logic.players_boards:
+        boards.append((
+            int(board.score),
+            board.init_player,
+            board.wall.tolist(),
+            [row.tolist() for row in board.pattern_lines],
+            board.floor_line.tolist(),
+            list(board.wall_rows_colours),
+            list(board.rows_allowed_colours),
+        ))
+
+    return (
+        [list(factory) for factory in game_logic.factories],
+        list(game_logic.center_tiles),
+        list(game_logic.bag_tiles),
+        list(game_logic.discarted_tiles),
+        [list(counts) for counts in game_logic.factories_counts],
+        list(game_logic.center_counts),
+        game_logic.game_end,
+        boards,
+    )
+
+
+@pytest.mark.parametrize(
+    "game_logic_class",
+    [Game_logic, Count_game_logic]
+)
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 4]
+)
+@pytest.mark.parametrize(
+    "seed",
+    [i for i in range(5)]
+)
+def test_undo_restores_the_state(game_logic_class, board_backend, num_players, seed):
+    rng = random.Random(seed)
+    game_logic = game_logic_class(number_players=num_players, seed=seed, board_backend=board_backend)
+    game_logic.fill_factories()
+    player_index = 0
+
+    while not game_logic.game_end:
+        state = full_state(game_logic)
+        legal_moves = game_logic.legal_moves(player_index)
+
+        for move in legal_moves:
+            undo_record = game_logic.apply_move(player_index, *move)
+            game_logic.undo_move(undo_record)
+            assert full_state(game_logic) == state
+
+        # Several moves in a row, undone in reverse order
+        undo_records = []
+        search_player_index = player_index
+        for _ in range(3):
+            moves = game_logic.legal_moves(search_player_index)
+            if not moves:
+                break
+            undo_records.append(game_logic.apply_move(search_player_index, *rng.choice(moves)))
+            search_player_index = (search_player_index + 1) % num_players
+        for undo_record in reversed(undo_records):
+            game_logic.undo_move(undo_record)
+        assert full_state(game_logic) == state
+        assert game_logic.legal_moves(player_index) == legal_moves
+
+        game_logic.apply_move(player_index, *rng.choice(legal_moves))
+        player_index = (player_index + 1) % num_players
+
+        round_end = not any(game_logic.center_counts) and not any(map(any, game_logic.factories_counts))
+        if round_end:
+            state = full_state(game_logic)
+            undo_record = game_logic.apply_wall_tiling()
+            tiled_state = full_state(game_logic)
+            game_logic.undo_wall_tiling(undo_record)
+            assert full_state(game_logic) == state
+
+            game_logic.apply_wall_tiling()
+            assert full_state(game_logic) == tiled_state
+
+            player_index = 0
+            if not game_logic.game_end:
+                game_logic.fill_factories()
@@ -0,0 +1,93 @@
+import pytest
+
+from game_engine.src.game_logic import Game_logic, Count_game_logic, Game_viewer
+from game_engine.src.models.dummy_model import Dummy_player
+from game_engine.src.run_simulation import Game_state_machine, Game_states
+from game_engine.src.transposition_table import Transposition_table, Replacement_policy, Bound
+
+@pytest.mark.parametrize(
+    "game_logic_class",
+    [Game_logic, Count_game_logic]
+)
+@pytest.mark.parametrize(
+    "board_backend",
+    ["numpy", "bitboard"]
+)
+@pytest.mark.parametrize(
+    "num_players",
+    [2, 3, 4]
+)
+@pytest.mark.parametrize(
+    "seed",
+    [i for i in range(5)]
+)
+def test_incremental_hash_matches_full_hash(game_logic_class, board_backend, num_players, seed):
+    game_logic = game_logic_class(number_players=num_players, seed=seed, board_backend=board_backend)
+    game_view = Game_viewer(game_logic)
+    players = [Dummy_player(game_view, i) for i in range(num_players)]
+
+    game_state = Game_state_machine(game_logic, players)
+    while game_state.state != Game_states.GAME_END:
+        game_state.next()
+        assert game_logic.zobrist_hash == game_logic.compute_zobrist_hash()
+
+        if game_state.state == Game_states.PLAYER_MOVE:
+            zobrist_hash = game_logic.zobrist_hash
+            player_index = game_logic.side_to_move
+            for move in game_logic.legal_moves(player_index):
+                undo_record = game_logic.apply_move(player_index, *move)
+                assert game_logic.zobrist_hash == game_logic.compute_zobrist_hash()
+                assert game_logic.zobrist_hash != zobrist_hash
+                game_logic.undo_move(undo_record)
+                assert game_logic.zobrist_hash == zobrist_hash
+
+
+def test_transposition_same_hash():
+    first_game = Game_logic(number_players=2, seed=7)
+    second_game = Game_logic(number_players=2, seed=7)
+    first_game.fill_factories()
+    second_game.fill_factories()
+
+    factories = first_game.factories
+    first_moves = [(0, 0, factories[0][0], 4), (1, 1, factories[1][0], 4), (0, 2, factories[2][0], 3)]
+    second_moves = [(0, 2, factories[2][0], 3), (1, 1, factories[1][0], 4), (0, 0, factories[0][0], 4)]
+
+    for move in first_moves:
+        first_game.apply_move(*move)
+    for move in second_moves:
+        second_game.apply_move(*move)
+
+    assert first_game.same_state(second_game)
+    assert first_game.zobrist_hash == first_game.compute_zobrist_hash()
+
+    second_game.apply_move(1, -1, second_game.center_tiles[0], -1)
+    assert not first_game.same_state(second_game)
+
+
+@pytest.mark.parametrize(
+    "replacement_policy",
+    list(Replacement_policy)
+)
+def test_transposition_table(replacement_policy):
+    table = Transposition_table(size=5, replacement_policy=replacement_policy)
+    assert table.size == 8
+
+    table.store(3, depth=4, value=1.5, bound=Bound.LOWER, move=(0, 1, 2))
+    assert table.lookup(3) == (3, 4, 1.5, Bound.LOWER, (0, 1, 2))
+    assert table.lookup(11) is None
+
+    # Same slot, shallower search of another state
+    table.store(11, depth=1, value=0.0)
+    if replacement_policy == Replacement_policy.DEPTH_PREFERRED:
+        assert table.lookup(11) is None
+        assert table.lookup(3) is not None
+    elif replacement_policy == Replacement_policy.ALWAYS_REPLACE:
+        assert table.lookup(11) is not None
+        assert table.lookup(3) is None
+        assert table.overwrites == 1
+    else:
+        assert table.lookup(11) is not None
+        assert table.lookup(3) is not None
+
+    table.clear()
+    assert len(table) == 0